@@ -0,0 +1,143 @@
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination that keys on every column of the ordering instead of
+    only the first one.
+
+    The ordering must end with a unique column (usually "id"), so each
+    position identifies exactly one row. Pages are then fetched with a
+    lexicographic keyset filter that an index on the ordering columns can
+    serve directly: no COUNT(*), and no OFFSET scan past duplicate values.
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(ordering, self._decode_position(current_position))
+            )
+
+        # Fetch one extra row to find out whether there is a following page
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                self.page[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.next_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.previous_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(str(instance[field_name]))
+            else:
+                values.append(str(getattr(instance, field_name)))
+        return json.dumps(values)
+
+    def _decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _keyset_filter(self, ordering, values):
+        return keyset_filter(ordering, values)
+
+
+def keyset_filter(ordering, values):
+    """
+    Rows strictly after `values` in `ordering`:
+    (a > x) OR (a = x AND b > y) OR ...
+    with the leading column bounded first so an index range scan applies.
+    """
+    lookups = [
+        (order.lstrip("-"), "lt" if order.startswith("-") else "gt")
+        for order in ordering
+    ]
+
+    leading_attr, leading_op = lookups[0]
+    condition = Q(**{f"{leading_attr}__{leading_op}": values[0]})
+    prefix = Q(**{leading_attr: values[0]})
+    for (attr, op), value in zip(lookups[1:], values[1:]):
+        condition |= prefix & Q(**{f"{attr}__{op}": value})
+        prefix &= Q(**{attr: value})
+
+    bound_op = "lte" if leading_op == "lt" else "gte"
+    bound = Q(**{f"{leading_attr}__{bound_op}": values[0]})
+    return bound & condition
+
+
+def _reverse_ordering(ordering):
+    return tuple(
+        order[1:] if order.startswith("-") else f"-{order}" for order in ordering
+    )
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # installed apps
     "rest_framework",
     "rest_framework_simplejwt",
@@ -69,6 +71,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+TEST_RUNNER = "config.test_runner.TestRunner"
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -154,6 +158,64 @@ SIMPLE_JWT = {
 REDIS_HOST = os.environ.get("REDIS_HOST")
 REDIS_PORT = os.environ.get("REDIS_PORT")
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/1",
+    }
+}
+
+MAX_SEARCH_RADIUS_KM = float(os.environ.get("MAX_SEARCH_RADIUS_KM", 50))
+MAX_SEARCH_WINDOW = timedelta(days=int(os.environ.get("MAX_SEARCH_WINDOW_DAYS", 14)))
+MAX_AVAILABILITY_CHECK_ITEMS = int(os.environ.get("MAX_AVAILABILITY_CHECK_ITEMS", 300))
+MAX_BULK_FIELDS = int(os.environ.get("MAX_BULK_FIELDS", 500))
+MAX_CALENDAR_WINDOW = timedelta(
+    days=int(os.environ.get("MAX_CALENDAR_WINDOW_DAYS", 31))
+)
+AVAILABLE_FIELDS_CACHE_TIMEOUT = int(
+    os.environ.get("AVAILABLE_FIELDS_CACHE_TIMEOUT", 60)
+)
+# Proximity searches share cached candidates within cells of this many
+# decimals of a degree (about 110 m for 3)
+AVAILABLE_FIELDS_CACHE_COORDINATE_DECIMALS = 3
+# Seconds without events after which live availability streams send a comment
+LIVE_HEARTBEAT_SECONDS = int(os.environ.get("LIVE_HEARTBEAT_SECONDS", 15))
+FIELD_TILE_CACHE_TIMEOUT = int(os.environ.get("FIELD_TILE_CACHE_TIMEOUT", 600))
+FIELD_FACETS_CACHE_TIMEOUT = int(os.environ.get("FIELD_FACETS_CACHE_TIMEOUT", 60))
+# How far ahead next_available_start looks for a free slot
+NEXT_AVAILABLE_HORIZON = timedelta(
+    days=int(os.environ.get("NEXT_AVAILABLE_HORIZON_DAYS", 7))
+)
+# Most occurrences a booking series can have
+MAX_SERIES_OCCURRENCES = int(os.environ.get("MAX_SERIES_OCCURRENCES", 52))
+# How long a slot hold reserves a slot while its user confirms the booking
+SLOT_HOLD_SECONDS = int(os.environ.get("SLOT_HOLD_SECONDS", 300))
+# Most holds a user can have at once, and can place in an hour. Fewer than
+# 3600 / SLOT_HOLD_SECONDS an hour, so that no slot can be held for good.
+SLOT_HOLD_MAX_ACTIVE = int(os.environ.get("SLOT_HOLD_MAX_ACTIVE", 3))
+SLOT_HOLDS_PER_HOUR = int(os.environ.get("SLOT_HOLDS_PER_HOUR", 10))
+# How long booking responses are kept for retries with the same
+# Idempotency-Key, and how long a retry waits for a request still running
+IDEMPOTENCY_KEY_TTL_SECONDS = int(
+    os.environ.get("IDEMPOTENCY_KEY_TTL_SECONDS", 24 * 60 * 60)
+)
+IDEMPOTENCY_WAIT_SECONDS = int(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", 10))
+# Delta sync: how long deletes are remembered, after which clients that
+# have not synced since start over, and how far cursors trail the clock
+SYNC_TOMBSTONE_RETENTION = timedelta(
+    days=int(os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", 90))
+)
+SYNC_CURSOR_LAG_SECONDS = int(os.environ.get("SYNC_CURSOR_LAG_SECONDS", 30))
+# Most rows of each collection served by one page of the delta sync
+SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", 1000))
+# Upper bounds of the hourly_rate buckets in the facet counts
+FIELD_PRICE_BUCKETS = [
+    int(bound)
+    for bound in os.environ.get(
+        "FIELD_PRICE_BUCKETS", "50000,100000,200000,400000"
+    ).split(",")
+]
+
 ACTIVATION_CODE_EXPIRY = os.environ.get("ACTIVATION_CODE_EXPIRY")
 SMS_CLIENT_CLASS = "users.api_clients.eskiz_sms_client.EskizSmsClient"
 
@@ -0,0 +1,13 @@
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Leaves out the tests tagged "slow", which seed catalogue-sized data,
+    unless tags are given: run them with `manage.py test --tag slow`.
+    """
+
+    def __init__(self, *args, tags=None, exclude_tags=None, **kwargs):
+        if not tags:
+            exclude_tags = [*(exclude_tags or []), "slow"]
+        super().__init__(*args, tags=tags, exclude_tags=exclude_tags, **kwargs)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Booking, FieldImage, FootballField
+from .models import Booking, FieldBlackout, FieldImage, FootballField
 
 
 class FieldImageInline(admin.TabularInline):
@@ -19,3 +19,9 @@ class FootballFieldAdmin(admin.ModelAdmin):
 class BookingAdmin(admin.ModelAdmin):
     list_display = ["field", "user", "start_time", "end_time", "created_at"]
     list_filter = ["field", "start_time"]
+
+
+@admin.register(FieldBlackout)
+class FieldBlackoutAdmin(admin.ModelAdmin):
+    list_display = ["field", "start_time", "end_time", "repeat_every", "reason"]
+    list_filter = ["field", "start_time"]
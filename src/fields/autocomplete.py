@@ -0,0 +1,240 @@
+import redis
+from django.conf import settings
+
+from location.models import City, District, Region
+
+from .models import FootballField
+from .search import normalize_search_text
+
+redis_instance = redis.StrictRedis(
+    host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0, decode_responses=True
+)
+
+KEY_PREFIX = "autocomplete"
+# A rebuild writes into this namespace and renames it over KEY_PREFIX once
+# done, so the index is never empty while it runs
+REBUILD_PREFIX = f"{KEY_PREFIX}:next"
+# Set while a rebuild runs, so that saves and deletes reach both namespaces
+REBUILDING_KEY = f"{KEY_PREFIX}:rebuilding"
+REBUILD_LOCK_KEY = f"{KEY_PREFIX}:rebuild_lock"
+REBUILD_TIMEOUT = 3600
+MAX_PREFIX_LENGTH = 15
+
+# Replace the entry ARGV[1] of a namespace if it is still ARGV[2] ("" when
+# there is none): remove ARGV[2] from the first ARGV[5] prefix keys after
+# the entries hash KEYS[1] and add ARGV[3] to the rest, with score ARGV[4].
+# An empty ARGV[3] removes the entry, leaving "" behind when ARGV[6] is 1 so
+# that a rebuild does not add it back. Returns 0 when the entry changed
+# since it was read, and the caller reads it again.
+REPLACE_SCRIPT = redis_instance.register_script(
+    """
+local previous = redis.call('HGET', KEYS[1], ARGV[1]) or ''
+if previous ~= ARGV[2] then
+    return 0
+end
+local removed = tonumber(ARGV[5])
+for i = 2, removed + 1 do
+    redis.call('ZREM', KEYS[i], previous)
+end
+if ARGV[3] == '' then
+    if ARGV[6] == '1' then
+        redis.call('HSET', KEYS[1], ARGV[1], '')
+    else
+        redis.call('HDEL', KEYS[1], ARGV[1])
+    end
+    return 1
+end
+for i = removed + 2, #KEYS do
+    redis.call('ZADD', KEYS[i], ARGV[4], ARGV[3])
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+return 1
+"""
+)
+
+# Add the entry ARGV[1] as member ARGV[2] with score ARGV[3] to the prefix
+# keys after the entries hash KEYS[1], unless a save or delete during the
+# rebuild got there first.
+ADD_IF_ABSENT_SCRIPT = redis_instance.register_script(
+    """
+if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+for i = 2, #KEYS do
+    redis.call('ZADD', KEYS[i], ARGV[3], ARGV[2])
+end
+return 1
+"""
+)
+
+# Autocomplete entry kind for each indexed model
+KINDS = {
+    Region: "region",
+    City: "city",
+    District: "district",
+    FootballField: "field",
+}
+
+
+def prefix_key(prefix, namespace=KEY_PREFIX):
+    return f"{namespace}:prefix:{prefix}"
+
+
+def entries_key(namespace=KEY_PREFIX):
+    """Maps "<kind>:<id>" to the member currently indexed for that object."""
+    return f"{namespace}:entries"
+
+
+def entry_prefixes(name):
+    """
+    Prefixes under which a name is indexed: every prefix of the name starting
+    at each of its words, so "Paxtakor Arena" completes both "pax" and "are".
+    """
+    words = normalize_search_text(name).split()
+    prefixes = set()
+    for i in range(len(words)):
+        phrase = " ".join(words[i:])
+        for length in range(1, min(len(phrase), MAX_PREFIX_LENGTH) + 1):
+            prefixes.add(phrase[:length])
+    return prefixes
+
+
+def _member(kind, pk, name):
+    return f"{kind}:{pk}:{name}"
+
+
+def _parse_member(member):
+    kind, pk, name = member.split(":", 2)
+    return {"type": kind, "id": int(pk), "name": name}
+
+
+def _prefix_keys(member, namespace):
+    name = member.split(":", 2)[2]
+    return [prefix_key(prefix, namespace) for prefix in entry_prefixes(name)]
+
+
+def _replace(namespace, kind, pk, name):
+    entry = f"{kind}:{pk}"
+    member = "" if name is None else _member(kind, pk, name)
+    added = _prefix_keys(member, namespace) if member else []
+    while True:
+        previous = redis_instance.hget(entries_key(namespace), entry) or ""
+        removed = _prefix_keys(previous, namespace) if previous else []
+        if REPLACE_SCRIPT(
+            keys=[entries_key(namespace), *removed, *added],
+            args=[
+                entry,
+                previous,
+                member,
+                # Shorter names are closer matches for the same prefix
+                len(name or ""),
+                len(removed),
+                int(namespace == REBUILD_PREFIX),
+            ],
+        ):
+            return
+
+
+def _namespaces():
+    if redis_instance.exists(REBUILDING_KEY):
+        return [KEY_PREFIX, REBUILD_PREFIX]
+    return [KEY_PREFIX]
+
+
+def index_entry(kind, pk, name):
+    """Add or replace the autocomplete entry of one object."""
+    for namespace in _namespaces():
+        _replace(namespace, kind, pk, name)
+
+
+def remove_entry(kind, pk):
+    for namespace in _namespaces():
+        _replace(namespace, kind, pk, None)
+
+
+def complete(query, limit=10):
+    """Return up to `limit` entries whose name has a word starting with query."""
+    text = normalize_search_text(query)
+    if not text:
+        return []
+
+    prefix = text[:MAX_PREFIX_LENGTH]
+    if len(text) <= MAX_PREFIX_LENGTH:
+        members = redis_instance.zrange(prefix_key(prefix), 0, limit - 1)
+        return [_parse_member(member) for member in members]
+
+    # Only the first MAX_PREFIX_LENGTH characters are indexed, so longer
+    # queries are checked against the full names here
+    results = []
+    for member in redis_instance.zrange(prefix_key(prefix), 0, -1):
+        entry = _parse_member(member)
+        name = normalize_search_text(entry["name"])
+        words = name.split()
+        if any(" ".join(words[i:]).startswith(text) for i in range(len(words))):
+            results.append(entry)
+            if len(results) == limit:
+                break
+    return results
+
+
+def _unlink_namespace(namespace):
+    pipe = redis_instance.pipeline(transaction=False)
+    for key in redis_instance.scan_iter(match=f"{namespace}:*", count=1000):
+        pipe.unlink(key)
+    pipe.execute()
+
+
+def _swap_in(pipe):
+    """Rename the rebuilt namespace over the live one in one transaction."""
+    live = set(pipe.scan_iter(match=prefix_key("*"), count=1000))
+    rebuilt = list(pipe.scan_iter(match=prefix_key("*", REBUILD_PREFIX), count=1000))
+    has_entries = pipe.exists(entries_key(REBUILD_PREFIX))
+    pipe.multi()
+    for key in rebuilt:
+        renamed = key.replace(REBUILD_PREFIX, KEY_PREFIX, 1)
+        pipe.rename(key, renamed)
+        live.discard(renamed)
+    for key in live:
+        pipe.unlink(key)
+    if has_entries:
+        pipe.rename(entries_key(REBUILD_PREFIX), entries_key())
+    else:
+        pipe.unlink(entries_key())
+    pipe.delete(REBUILDING_KEY)
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Rebuild the whole index from the database. The current index keeps
+    serving until the rebuilt one replaces it.
+    """
+    with redis_instance.lock(REBUILD_LOCK_KEY, timeout=REBUILD_TIMEOUT):
+        _unlink_namespace(REBUILD_PREFIX)
+        redis_instance.set(REBUILDING_KEY, 1, ex=REBUILD_TIMEOUT)
+
+        pipe = redis_instance.pipeline(transaction=False)
+        count = 0
+        for model, kind in KINDS.items():
+            for pk, name in model.objects.values_list("pk", "name").iterator(
+                chunk_size=batch_size
+            ):
+                member = _member(kind, pk, name)
+                ADD_IF_ABSENT_SCRIPT(
+                    keys=[
+                        entries_key(REBUILD_PREFIX),
+                        *_prefix_keys(member, REBUILD_PREFIX),
+                    ],
+                    args=[f"{kind}:{pk}", member, len(name)],
+                    client=pipe,
+                )
+                count += 1
+                if count % batch_size == 0:
+                    pipe.execute()
+        pipe.execute()
+
+        # Saves and deletes write both namespaces until the swap, and any
+        # of them retries it
+        redis_instance.transaction(
+            _swap_in, entries_key(), entries_key(REBUILD_PREFIX), REBUILDING_KEY
+        )
+    return count
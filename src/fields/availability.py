@@ -0,0 +1,376 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+from . import holds
+from .geo import distance_expression
+from .models import (
+    BLACKOUT_MESSAGE,
+    Booking,
+    FieldBlackout,
+    FootballField,
+    check_booking_times,
+)
+
+# Alternatives offered when a requested booking overlaps another one
+ALTERNATIVES_ON_SAME_FIELD = 3
+ALTERNATIVE_FIELDS = 5
+
+
+# Columns needed to walk a field's booking grid
+GRID_FIELDS = [
+    "id",
+    "opening_time",
+    "closing_time",
+    "weekly_hours",
+    "hours_mask",
+    "min_booking_duration",
+]
+
+
+def working_hours(field, day):
+    """
+    Return the aware opening and closing datetimes of the field on a date.
+    On a day the field is closed both are the start of the day.
+    """
+    hours = field.hours_on(day.weekday())
+    if hours is None:
+        midnight = timezone.make_aware(datetime.combine(day, time.min))
+        return midnight, midnight
+    return (
+        timezone.make_aware(datetime.combine(day, hours[0])),
+        timezone.make_aware(datetime.combine(day, hours[1])),
+    )
+
+
+def align_up(moment, origin, step):
+    """Return the first point of the grid origin + k * step at or after moment."""
+    if moment <= origin:
+        return origin
+    steps = -(-(moment - origin) // step)
+    return origin + steps * step
+
+
+def align_down(moment, origin, step):
+    """Return the last point of the grid origin + k * step at or before moment."""
+    return origin + (moment - origin) // step * step
+
+
+def load_busy_intervals(field_ids, start, end):
+    """
+    Fetch the intervals of the given fields that cannot be booked and
+    overlap [start, end): their bookings and the occurrences of their
+    blackouts, in one query each. Grouped by field id and sorted by start
+    time, with overlapping intervals merged.
+    """
+    bookings = Booking.objects.filter(
+        field_id__in=field_ids, period__overlap=(start, end)
+    ).values_list("field_id", "start_time", "end_time")
+    intervals = defaultdict(list)
+    for field_id, booking_start, booking_end in bookings:
+        intervals[field_id].append((booking_start, booking_end))
+    blackouts = (
+        FieldBlackout.objects.filter(field_id__in=field_ids)
+        .overlapping(start, end)
+        .only("field_id", "start_time", "end_time", "repeat_every", "repeat_until")
+    )
+    for blackout in blackouts:
+        intervals[blackout.field_id] += blackout.occurrences(start, end)
+
+    return defaultdict(
+        list,
+        {
+            field_id: merge_intervals(field_intervals)
+            for field_id, field_intervals in intervals.items()
+        },
+    )
+
+
+def merge_intervals(intervals):
+    """Sort (start, end) intervals by start and merge those that overlap."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start < merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def earliest_fit(field, busy, duration, window_start, window_end):
+    """
+    Return the earliest start inside [window_start, window_end) at which the
+    field is free for `duration`, or None.
+
+    Starts are aligned to the field's booking grid (opening_time plus
+    multiples of min_booking_duration), bookings stay within a single day's
+    working hours, and `busy` must be sorted by start time.
+    """
+    step = field.min_booking_duration
+    if duration < step or duration % step:
+        return None
+
+    day = timezone.localtime(window_start).date()
+    last_day = timezone.localtime(window_end).date()
+    i = 0
+    while day <= last_day:
+        opening, closing = working_hours(field, day)
+        latest_end = min(closing, window_end)
+        start = align_up(max(window_start, opening), opening, step)
+        while start + duration <= latest_end:
+            end = start + duration
+            # Bookings are sorted by start, so once the ones finishing before
+            # `start` are skipped, only busy[i] can overlap [start, end)
+            while i < len(busy) and busy[i][1] <= start:
+                i += 1
+            if i == len(busy) or busy[i][0] >= end:
+                return start
+            start = align_up(busy[i][1], opening, step)
+        day += timedelta(days=1)
+    return None
+
+
+def free_intervals(field, busy, window_start, window_end):
+    """
+    Return the free (start, end) intervals of the field inside
+    [window_start, window_end), aligned to its booking grid and at least one
+    min_booking_duration long.
+
+    A single sweep over `busy`, which must be sorted by start time: each
+    day's working hours are walked from the opening, and every booking cuts
+    the free run short at the grid point before its start and resumes it at
+    the grid point after its end.
+    """
+    step = field.min_booking_duration
+    free = []
+    day = timezone.localtime(window_start).date()
+    last_day = timezone.localtime(window_end).date()
+    i = 0
+    while day <= last_day:
+        opening, closing = working_hours(field, day)
+        day_end = min(closing, window_end)
+        cursor = align_up(max(window_start, opening), opening, step)
+        while i < len(busy) and busy[i][0] < day_end:
+            booking_start, booking_end = busy[i]
+            i += 1
+            if booking_end <= cursor:
+                continue
+            run_end = align_down(min(booking_start, day_end), opening, step)
+            if run_end - cursor >= step:
+                free.append((cursor, run_end))
+            cursor = max(cursor, align_up(booking_end, opening, step))
+        run_end = align_down(day_end, opening, step) if day_end > opening else cursor
+        if run_end - cursor >= step:
+            free.append((cursor, run_end))
+        day += timedelta(days=1)
+    return free
+
+
+def refresh_next_available(field_ids):
+    """
+    Recompute next_available_start of the given fields with one bookings
+    query, and save the values that changed. Returns how many changed.
+    """
+    now = timezone.now()
+    horizon_end = now + settings.NEXT_AVAILABLE_HORIZON
+    fields = list(
+        FootballField.objects.filter(pk__in=field_ids).only(
+            *GRID_FIELDS, "next_available_start"
+        )
+    )
+    busy = load_busy_intervals([field.id for field in fields], now, horizon_end)
+
+    changed = []
+    for field in fields:
+        start = earliest_fit(
+            field, busy[field.id], field.min_booking_duration, now, horizon_end
+        )
+        if start != field.next_available_start:
+            field.next_available_start = start
+            changed.append(field)
+    FootballField.objects.bulk_update(changed, ["next_available_start"])
+    return len(changed)
+
+
+def check_availability(items):
+    """
+    Check a batch of (field_id, start_time, end_time) candidates against the
+    booking rules, in three queries whatever the batch size: the fields, the
+    blackouts overlapping the candidates' span and the bookings overlapping
+    any of the candidates.
+
+    Returns one {"available", "code", "reason"} verdict per item, in order.
+    Candidates are checked against existing bookings only, not each other.
+    """
+    fields = FootballField.objects.only(*GRID_FIELDS).in_bulk(
+        {field_id for field_id, _, _ in items}
+    )
+
+    verdicts = []
+    candidates = []
+    for field_id, start_time, end_time in items:
+        field = fields.get(field_id)
+        if field is None:
+            verdicts.append(_verdict("not_found", "Football field not found."))
+            continue
+        try:
+            check_booking_times(field, start_time, end_time)
+        except ValidationError as e:
+            verdicts.append(_verdict(e.code, e.messages[0]))
+            continue
+        verdicts.append(None)
+        candidates.append((field_id, start_time, end_time))
+
+    blackouts = defaultdict(list)
+    busy = defaultdict(list)
+    if candidates:
+        for blackout in FieldBlackout.objects.filter(
+            field_id__in={field_id for field_id, _, _ in candidates}
+        ).overlapping(
+            min(start_time for _, start_time, _ in candidates),
+            max(end_time for _, _, end_time in candidates),
+        ):
+            blackouts[blackout.field_id].append(blackout)
+
+        overlapping = reduce(
+            or_,
+            (
+                Q(field_id=field_id, period__overlap=(start_time, end_time))
+                for field_id, start_time, end_time in candidates
+            ),
+        )
+        for field_id, booking_start, booking_end in Booking.objects.filter(
+            overlapping
+        ).values_list("field_id", "start_time", "end_time"):
+            busy[field_id].append((booking_start, booking_end))
+
+    for i, (field_id, start_time, end_time) in enumerate(items):
+        if verdicts[i] is not None:
+            continue
+        if any(
+            blackout.overlaps(start_time, end_time) for blackout in blackouts[field_id]
+        ):
+            verdicts[i] = _verdict("blackout", BLACKOUT_MESSAGE)
+        elif any(
+            booking_start < end_time and booking_end > start_time
+            for booking_start, booking_end in busy[field_id]
+        ):
+            verdicts[i] = _verdict(
+                "overlap", "This field is already booked for the given time."
+            )
+        else:
+            verdicts[i] = {"available": True, "code": None, "reason": None}
+    return verdicts
+
+
+def _verdict(code, reason):
+    return {"available": False, "code": code, "reason": reason}
+
+
+def day_bounds(moment):
+    """Return the aware start and end of the local day containing moment."""
+    day_start = timezone.make_aware(
+        datetime.combine(timezone.localdate(moment), datetime.min.time())
+    )
+    return day_start, day_start + timedelta(days=1)
+
+
+# Days between the occurrences of a booking series
+SERIES_FREQUENCIES = {"daily": 1, "weekly": 7}
+
+
+def series_occurrences(start_time, end_time, frequency, limit, until=None):
+    """
+    Return up to `limit` (start, end) occurrences of a booking series: the
+    first one, then one a day or a week later each time at the same local
+    time, stopping before the first occurrence that starts at or after until.
+    """
+    local_start = timezone.localtime(start_time)
+    duration = end_time - start_time
+    step = timedelta(days=SERIES_FREQUENCIES[frequency])
+    day = local_start.date()
+    occurrences = []
+    while len(occurrences) < limit:
+        start = timezone.make_aware(datetime.combine(day, local_start.time()))
+        if until is not None and start >= until:
+            break
+        occurrences.append((start, start + duration))
+        day += step
+    return occurrences
+
+
+def nearest_starts(field, busy, requested_start, duration, limit):
+    """
+    Return up to `limit` grid starts on the requested day at which the field
+    is free for `duration`, nearest to requested_start first.
+    """
+    step = field.min_booking_duration
+    if duration < step or duration % step:
+        return []
+    day_start, day_end = day_bounds(requested_start)
+    starts = []
+    for run_start, run_end in free_intervals(
+        field, busy, max(day_start, timezone.now()), day_end
+    ):
+        start = run_start
+        while start + duration <= run_end:
+            starts.append(start)
+            start += step
+    starts.sort(key=lambda start: (abs(start - requested_start), start))
+    return starts[:limit]
+
+
+def suggest_alternatives(field, start_time, end_time, user_id):
+    """
+    Free slots of the same length as a conflicting request, nearest in time,
+    on the same field and on the closest other fields of its district.
+
+    The ALTERNATIVE_FIELDS closest fields come from one query. Then the busy
+    intervals of all of them on the requested day come from the bookings
+    and blackouts queries of load_busy_intervals(), and the holds of other
+    users than user_id from one Redis read, so that every suggestion can be
+    booked by the user.
+    """
+    duration = end_time - start_time
+    nearby = list(
+        FootballField.objects.filter(district_id=field.district_id)
+        .exclude(pk=field.pk)
+        .only(*GRID_FIELDS, "name")
+        .annotate(distance=distance_expression(field.latitude, field.longitude))
+        .order_by("distance", "id")[:ALTERNATIVE_FIELDS]
+    )
+    field_ids = [field.id, *(other.id for other in nearby)]
+    day_start, day_end = day_bounds(start_time)
+    busy = load_busy_intervals(field_ids, day_start, day_end)
+    for field_id, held in holds.held_intervals(field_ids, user_id).items():
+        busy[field_id] = merge_intervals(busy[field_id] + held)
+
+    same_field = [
+        {"field_id": field.id, "start": start, "end": start + duration}
+        for start in nearest_starts(
+            field, busy[field.id], start_time, duration, ALTERNATIVES_ON_SAME_FIELD
+        )
+    ]
+    nearby_fields = []
+    for other in nearby:
+        starts = nearest_starts(other, busy[other.id], start_time, duration, 1)
+        if starts:
+            nearby_fields.append(
+                {
+                    "field_id": other.id,
+                    "field_name": other.name,
+                    "distance": other.distance,
+                    "start": starts[0],
+                    "end": starts[0] + duration,
+                }
+            )
+    nearby_fields.sort(
+        key=lambda slot: (abs(slot["start"] - start_time), slot["distance"])
+    )
+    return {"same_field": same_field, "nearby_fields": nearby_fields}
@@ -0,0 +1,73 @@
+import logging
+from functools import partial
+
+import redis
+from django.db import transaction
+from django.utils import timezone
+
+from . import result_cache, slot_index
+from .availability import refresh_next_available
+from .hours import weekly_mask
+from .models import FieldBlackout, FootballField
+
+logger = logging.getLogger(__name__)
+
+# Columns an owner can set on many fields at once
+BULK_UPDATE_FIELDS = ["hourly_rate", "opening_time", "closing_time", "weekly_hours"]
+HOURS_FIELDS = {"opening_time", "closing_time", "weekly_hours"}
+
+
+def apply_to_fields(fields, changes, blackouts, batch_size=1000):
+    """
+    Set the `changes` columns on every field with one bulk_update, and add
+    every blackout to every field with one bulk_create, in one transaction.
+    Returns the created blackouts.
+
+    bulk_update() and bulk_create() skip the post_save signals, so the
+    availability that depends on the opening hours and the blackouts is
+    refreshed here once the changes commit.
+    """
+    columns = [*changes, "updated_at"]
+    hours_changed = bool(HOURS_FIELDS & set(changes))
+    if hours_changed:
+        columns.append("hours_mask")
+    now = timezone.now()
+    for field in fields:
+        for name, value in changes.items():
+            setattr(field, name, value)
+        field.updated_at = now
+        if hours_changed:
+            field.hours_mask = weekly_mask(
+                field.opening_time, field.closing_time, field.weekly_hours
+            )
+    with transaction.atomic():
+        if changes:
+            FootballField.objects.bulk_update(fields, columns, batch_size=batch_size)
+        created = FieldBlackout.objects.bulk_create(
+            [
+                FieldBlackout(field=field, **data)
+                for field in fields
+                for data in blackouts
+            ],
+            batch_size=batch_size,
+        )
+        transaction.on_commit(
+            partial(
+                result_cache.invalidate_fields, [field.district_id for field in fields]
+            )
+        )
+        field_ids = [field.pk for field in fields]
+        if hours_changed or created:
+            transaction.on_commit(partial(refresh_next_available, field_ids))
+        if hours_changed:
+            transaction.on_commit(partial(_refresh_slot_index, field_ids))
+    return created
+
+
+def _refresh_slot_index(field_ids):
+    try:
+        for field_id in field_ids:
+            slot_index.refresh_field(field_id)
+    except redis.RedisError:
+        # The index is rebuilt by the rebuild_slot_index command
+        logger.exception("Could not update the slot index")
@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+# Fields open at each of these times of day are counted in the open_at facet
+OPEN_AT_TIMES = ["07:00", "12:00", "18:00", "22:00"]
+
+# Query parameters that do not narrow the result set
+NON_FILTER_PARAMS = {"facets", "cursor", "page_size"}
+
+
+def price_bucket_labels():
+    bounds = settings.FIELD_PRICE_BUCKETS
+    labels = [f"0-{bounds[0]}"]
+    labels += [f"{low}-{high}" for low, high in zip(bounds, bounds[1:])]
+    labels.append(f"{bounds[-1]}+")
+    return labels
+
+
+def price_bucket_expression():
+    bounds = settings.FIELD_PRICE_BUCKETS
+    labels = price_bucket_labels()
+    return Case(
+        *[
+            When(hourly_rate__lt=bound, then=Value(label))
+            for bound, label in zip(bounds, labels)
+        ],
+        default=Value(labels[-1]),
+        output_field=CharField(),
+    )
+
+
+def facet_counts(queryset):
+    """
+    Count the fields of the queryset per district, city, hourly_rate bucket
+    and opening time, with a single GROUP BY district and price bucket.
+    """
+    open_at = {
+        f"open_{i}": Count(
+            "id", filter=Q(opening_time__lte=moment, closing_time__gt=moment)
+        )
+        for i, moment in enumerate(OPEN_AT_TIMES)
+    }
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket_expression())
+        .values(
+            "district_id",
+            "district__name",
+            "district__city_id",
+            "district__city__name",
+            "price_bucket",
+        )
+        .annotate(count=Count("id"), **open_at)
+    )
+
+    districts = {}
+    cities = {}
+    price_buckets = dict.fromkeys(price_bucket_labels(), 0)
+    open_at_counts = defaultdict(int)
+    for row in rows:
+        district = districts.setdefault(
+            row["district_id"],
+            {"id": row["district_id"], "name": row["district__name"], "count": 0},
+        )
+        district["count"] += row["count"]
+        city = cities.setdefault(
+            row["district__city_id"],
+            {
+                "id": row["district__city_id"],
+                "name": row["district__city__name"],
+                "count": 0,
+            },
+        )
+        city["count"] += row["count"]
+        price_buckets[row["price_bucket"]] += row["count"]
+        for i, moment in enumerate(OPEN_AT_TIMES):
+            open_at_counts[moment] += row[f"open_{i}"]
+
+    return {
+        "districts": sorted(districts.values(), key=lambda d: -d["count"]),
+        "cities": sorted(cities.values(), key=lambda c: -c["count"]),
+        "price_buckets": [
+            {"range": label, "count": count} for label, count in price_buckets.items()
+        ],
+        "open_at": [
+            {"time": moment, "count": open_at_counts[moment]}
+            for moment in OPEN_AT_TIMES
+        ],
+    }
+
+
+class FacetedListMixin:
+    """
+    Adds facet counts of the filtered queryset to list responses when the
+    request has ?facets=true. Facets of unfiltered requests (at most a
+    district_id) are cached, since most users open the list that way.
+    """
+
+    facets_param = "facets"
+    cacheable_facet_params = {"district_id"}
+
+    def paginate_queryset(self, queryset):
+        self._facet_queryset = queryset
+        return super().paginate_queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get(self.facets_param) in ("1", "true"):
+            response.data["facets"] = self.get_facets(self._facet_queryset)
+        return response
+
+    def get_facets(self, queryset):
+        cache_key = self.get_facets_cache_key()
+        if cache_key is None:
+            return facet_counts(queryset)
+        facets = cache.get(cache_key)
+        if facets is None:
+            facets = facet_counts(queryset)
+            cache.set(cache_key, facets, settings.FIELD_FACETS_CACHE_TIMEOUT)
+        return facets
+
+    def get_facets_cache_key(self):
+        params = self.request.query_params
+        if set(params) - NON_FILTER_PARAMS - self.cacheable_facet_params:
+            return None
+        filters = ",".join(
+            f"{name}={params[name]}"
+            for name in sorted(self.cacheable_facet_params)
+            if name in params
+        )
+        return f"field_facets:{self.get_facets_cache_scope()}:{filters}"
+
+    def get_facets_cache_scope(self):
+        """Distinguishes views, or users, that see different querysets."""
+        return type(self).__name__
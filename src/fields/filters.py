@@ -0,0 +1,39 @@
+import django_filters
+from rest_framework.filters import BaseFilterBackend
+
+from .models import FootballField
+from .search import search_fields
+
+
+class FieldSearchFilter(BaseFilterBackend):
+    """
+    Fuzzy, Latin/Cyrillic insensitive search over the field name, address,
+    district and city, ranked by relevance.
+    """
+
+    search_param = "q"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        return search_fields(queryset, query)
+
+
+class AvailableFieldFilter(django_filters.FilterSet):
+    """
+    Column filters of the available fields search. The district and price
+    range are served by the (district, hourly_rate) and (hourly_rate) indexes.
+    """
+
+    district_id = django_filters.NumberFilter(field_name="district_id")
+    min_price = django_filters.NumberFilter(field_name="hourly_rate", lookup_expr="gte")
+    max_price = django_filters.NumberFilter(field_name="hourly_rate", lookup_expr="lte")
+    open_at = django_filters.TimeFilter(method="filter_open_at")
+
+    class Meta:
+        model = FootballField
+        fields = ["name", "address", "district_id", "min_price", "max_price"]
+
+    def filter_open_at(self, queryset, name, value):
+        return queryset.filter(opening_time__lte=value, closing_time__gt=value)
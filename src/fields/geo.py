@@ -0,0 +1,159 @@
+import math
+
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import ACos, Cos, Least, Sin
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Return the (min_lat, max_lat, min_lon, max_lon) box in radians that
+    contains every point within radius_km of the given location.
+
+    min_lon > max_lon means the box wraps around the antimeridian.
+    Near the poles the box spans every longitude.
+    """
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    angular_radius = radius_km / EARTH_RADIUS_KM
+
+    min_lat = lat - angular_radius
+    max_lat = lat + angular_radius
+
+    if min_lat > -math.pi / 2 and max_lat < math.pi / 2:
+        delta_lon = math.asin(math.sin(angular_radius) / math.cos(lat))
+        min_lon = lon - delta_lon
+        max_lon = lon + delta_lon
+        if min_lon < -math.pi:
+            min_lon += 2 * math.pi
+        if max_lon > math.pi:
+            max_lon -= 2 * math.pi
+    else:
+        min_lat = max(min_lat, -math.pi / 2)
+        max_lat = min(max_lat, math.pi / 2)
+        min_lon = -math.pi
+        max_lon = math.pi
+
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def bounding_box_q(latitude, longitude, radius_km):
+    """
+    Q object restricting lat_rad/lon_rad to the bounding box of the circle,
+    so the filter can be answered from the coordinate index.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    q = Q(lat_rad__range=(min_lat, max_lat))
+    if min_lon > max_lon:
+        q &= Q(lon_rad__gte=min_lon) | Q(lon_rad__lte=max_lon)
+    else:
+        q &= Q(lon_rad__range=(min_lon, max_lon))
+    return q
+
+
+def distance_expression(latitude, longitude):
+    """
+    Great-circle distance in kilometres from the given location, computed
+    on the precomputed radian columns. The trigonometry of the query point
+    is evaluated once here instead of per row.
+    """
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+
+    return ExpressionWrapper(
+        ACos(
+            # Rounding can push the cosine slightly above 1 for identical points
+            Least(
+                Sin(F("lat_rad")) * Value(math.sin(lat))
+                + Cos(F("lat_rad"))
+                * Value(math.cos(lat))
+                * Cos(F("lon_rad") - Value(lon)),
+                Value(1.0),
+            )
+        )
+        * Value(EARTH_RADIUS_KM),
+        output_field=FloatField(),
+    )
+
+
+def filter_nearby(queryset, latitude, longitude, radius_km=None):
+    """
+    Annotate the queryset with `distance` and, when radius_km is given,
+    keep only the rows inside the radius. The bounding box is applied
+    first so only rows inside it get the exact distance calculation.
+    """
+    if radius_km is not None:
+        queryset = queryset.filter(bounding_box_q(latitude, longitude, radius_km))
+
+    queryset = queryset.annotate(distance=distance_expression(latitude, longitude))
+
+    if radius_km is not None:
+        queryset = queryset.filter(distance__lte=radius_km)
+
+    return queryset
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 12
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a location as a base32 geohash of the given length."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    latitude = float(latitude)
+    longitude = float(longitude)
+
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, starting with longitude
+        value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits <<= 1
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_width(precision):
+    """Width in degrees of longitude of a geohash cell of the given length."""
+    return 360.0 / 2 ** math.ceil(5 * precision / 2)
+
+
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+
+def tile_bounds(z, x, y):
+    """
+    Return the (min_lat, max_lat, min_lon, max_lon) of a Web Mercator
+    (slippy map) tile in degrees.
+    """
+    n = 2**z
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def tile_for_point(latitude, longitude, z):
+    """Return the (x, y) of the zoom z tile containing the location."""
+    n = 2**z
+    latitude = max(min(float(latitude), MAX_MERCATOR_LATITUDE), -MAX_MERCATOR_LATITUDE)
+    lat = math.radians(latitude)
+    x = int((float(longitude) + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
@@ -0,0 +1,327 @@
+import logging
+import time
+import uuid
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+from . import result_cache
+from .locks import spanned_days
+
+logger = logging.getLogger(__name__)
+
+redis_instance = redis.StrictRedis(
+    host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+)
+
+# A hold reserves [start, end) of a field for one user while they confirm a
+# booking. Each field has a sorted set of its holds scored by when they
+# expire, with members "hold_id:user_id:start_ms:end_ms". Each day has a
+# sorted set scoring the fields held that day by the expiry of their latest
+# hold, and each user one of their hold ids scored by expiry.
+KEY_PREFIX = "holds"
+
+HELD_MESSAGE = "This field is held by another user for the given time."
+
+# Drop the expired holds of the field and of the user, then add the hold
+# unless another user's hold overlaps it or the user is over a limit.
+# Returns {1, expires_ms}, {0, expires_ms} of the conflicting hold, or when
+# the user has SLOT_HOLD_MAX_ACTIVE holds active {-1, ms until the earliest
+# one expires}, or SLOT_HOLDS_PER_HOUR placed {-2, ms until the count
+# resets}. Redis runs scripts one at a time, so two users racing for a slot
+# cannot both get it, nor one user go over a limit.
+PLACE_SCRIPT = redis_instance.register_script(
+    """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+local start_ms, end_ms = tonumber(ARGV[3]), tonumber(ARGV[4])
+for _, member in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    local _, user_id, held_start, held_end =
+        string.match(member, '^([^:]+):([^:]+):([^:]+):([^:]+)$')
+    if user_id ~= ARGV[2]
+        and tonumber(held_start) < end_ms and tonumber(held_end) > start_ms then
+        return {0, tonumber(redis.call('ZSCORE', KEYS[1], member))}
+    end
+end
+if redis.call('ZCARD', KEYS[3]) >= tonumber(ARGV[7]) then
+    local earliest = redis.call('ZRANGE', KEYS[3], 0, 0, 'WITHSCORES')[2]
+    return {-1, tonumber(earliest) - now}
+end
+if tonumber(redis.call('GET', KEYS[4]) or '0') >= tonumber(ARGV[8]) then
+    return {-2, redis.call('PTTL', KEYS[4])}
+end
+if redis.call('INCR', KEYS[4]) == 1 then
+    redis.call('PEXPIRE', KEYS[4], 3600000)
+end
+local ttl = tonumber(ARGV[5])
+local expires = now + ttl
+local member = ARGV[1] .. ':' .. ARGV[2] .. ':' .. ARGV[3] .. ':' .. ARGV[4]
+redis.call('ZADD', KEYS[1], expires, member)
+redis.call('PEXPIREAT', KEYS[1], expires)
+redis.call('SET', KEYS[2], member, 'PX', ttl)
+redis.call('ZADD', KEYS[3], expires, ARGV[1])
+redis.call('PEXPIREAT', KEYS[3], expires)
+for i = 5, #KEYS do
+    redis.call('ZADD', KEYS[i], 'GT', expires, ARGV[6])
+    redis.call('PEXPIREAT', KEYS[i], expires)
+end
+return {1, expires}
+"""
+)
+
+# Remove a hold if it belongs to the user. Returns its member, 0 when there
+# is no such hold or -1 when it is someone else's.
+RELEASE_SCRIPT = redis_instance.register_script(
+    """
+local member = redis.call('GET', KEYS[2])
+if not member then
+    return 0
+end
+local hold_id, user_id = string.match(member, '^([^:]+):([^:]+):')
+if user_id ~= ARGV[1] then
+    return -1
+end
+redis.call('ZREM', KEYS[1], member)
+redis.call('DEL', KEYS[2])
+redis.call('ZREM', KEYS[3], hold_id)
+return member
+"""
+)
+
+
+class HoldNotFound(Exception):
+    pass
+
+
+class HoldForbidden(Exception):
+    pass
+
+
+class HoldLimitReached(Exception):
+    """The user holds or placed too many slots, for retry_after seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def field_key(field_id):
+    return f"{KEY_PREFIX}:field:{field_id}"
+
+
+def hold_key(hold_id):
+    return f"{KEY_PREFIX}:hold:{hold_id}"
+
+
+def user_key(user_id):
+    return f"{KEY_PREFIX}:user:{user_id}"
+
+
+def user_placed_key(user_id):
+    return f"{KEY_PREFIX}:user:{user_id}:placed"
+
+
+def day_fields_key(day):
+    return f"{KEY_PREFIX}:fields:{day.isoformat()}"
+
+
+def _ms(moment):
+    return int(moment.timestamp() * 1000)
+
+
+def _from_ms(value):
+    return timezone.localtime(
+        datetime.fromtimestamp(int(value) / 1000, tz=dt_timezone.utc)
+    )
+
+
+def _parse(member):
+    hold_id, user_id, start_ms, end_ms = member.decode().split(":")
+    return hold_id, int(user_id), int(start_ms), int(end_ms)
+
+
+def place_hold(field_id, user_id, start_time, end_time):
+    """
+    Hold [start_time, end_time) of the field for the user for
+    SLOT_HOLD_SECONDS. Returns the hold, or None when another user's hold
+    overlaps it. A user's own holds never get in their way. Raises
+    HoldLimitReached when the user holds SLOT_HOLD_MAX_ACTIVE slots already,
+    or placed SLOT_HOLDS_PER_HOUR holds within the hour.
+    """
+    # The id carries the field, so releasing a hold knows its field's key
+    hold_id = f"{field_id}-{uuid.uuid4().hex}"
+    placed, ms = PLACE_SCRIPT(
+        keys=[
+            field_key(field_id),
+            hold_key(hold_id),
+            user_key(user_id),
+            user_placed_key(user_id),
+            *(day_fields_key(day) for day in spanned_days(start_time, end_time)),
+        ],
+        args=[
+            hold_id,
+            user_id,
+            _ms(start_time),
+            _ms(end_time),
+            settings.SLOT_HOLD_SECONDS * 1000,
+            field_id,
+            settings.SLOT_HOLD_MAX_ACTIVE,
+            settings.SLOT_HOLDS_PER_HOUR,
+        ],
+    )
+    if placed == -1:
+        raise HoldLimitReached(
+            f"You can hold at most {settings.SLOT_HOLD_MAX_ACTIVE} slots at once.",
+            -(-ms // 1000),
+        )
+    if placed == -2:
+        raise HoldLimitReached(
+            f"You can place at most {settings.SLOT_HOLDS_PER_HOUR} holds an hour.",
+            -(-ms // 1000),
+        )
+    if not placed:
+        return None
+    result_cache.invalidate_days([timezone.localdate(start_time)])
+    return {
+        "id": hold_id,
+        "field": field_id,
+        "start_time": start_time,
+        "end_time": end_time,
+        "expires_at": _from_ms(ms),
+    }
+
+
+def release_hold(hold_id, user_id):
+    """Release one of the user's holds before it expires."""
+    field_id = hold_id.split("-", 1)[0]
+    if not field_id.isdigit():
+        raise HoldNotFound
+    member = RELEASE_SCRIPT(
+        keys=[field_key(field_id), hold_key(hold_id), user_key(user_id)],
+        args=[user_id],
+    )
+    if member == 0:
+        raise HoldNotFound
+    if member == -1:
+        raise HoldForbidden
+    result_cache.invalidate_days([timezone.localdate(_from_ms(_parse(member)[2]))])
+
+
+def _active_holds(field_ids):
+    now_ms = int(time.time() * 1000)
+    pipe = redis_instance.pipeline(transaction=False)
+    for field_id in field_ids:
+        pipe.zrangebyscore(field_key(field_id), f"({now_ms}", "+inf")
+    return zip(field_ids, pipe.execute())
+
+
+def is_held(field_id, start_time, end_time, exclude_user_id=None):
+    """
+    Whether a hold of another user than exclude_user_id overlaps. Holds only
+    settle races early, so when Redis is down nothing counts as held.
+    """
+    return held_spans(field_id, [(start_time, end_time)], exclude_user_id)[0]
+
+
+def held_spans(field_id, spans, exclude_user_id=None):
+    """is_held() of each (start_time, end_time) span, in one read."""
+    try:
+        members = next(iter(_active_holds([field_id])))[1]
+    except redis.RedisError:
+        logger.exception("Could not read the slot holds")
+        return [False] * len(spans)
+    others = [
+        (held_start, held_end)
+        for _, user_id, held_start, held_end in map(_parse, members)
+        if user_id != exclude_user_id
+    ]
+    return [
+        any(
+            held_start < _ms(end_time) and held_end > _ms(start_time)
+            for held_start, held_end in others
+        )
+        for start_time, end_time in spans
+    ]
+
+
+def held_intervals(field_ids, exclude_user_id=None):
+    """
+    The (start_time, end_time) of the holds of other users than
+    exclude_user_id on each of the fields, in one read. Empty when Redis is
+    down, as in is_held().
+    """
+    try:
+        holds = list(_active_holds(list(field_ids)))
+    except redis.RedisError:
+        logger.exception("Could not read the slot holds")
+        return {}
+    intervals = {}
+    for field_id, members in holds:
+        for _, user_id, held_start, held_end in map(_parse, members):
+            if user_id != exclude_user_id:
+                intervals.setdefault(field_id, []).append(
+                    (_from_ms(held_start), _from_ms(held_end))
+                )
+    return intervals
+
+
+def held_field_ids(start_time, end_time):
+    """
+    The ids of the fields with a hold overlapping [start_time, end_time).
+    Only the fields held on the days the interval touches are read.
+    """
+    now_ms = int(time.time() * 1000)
+    start_ms, end_ms = _ms(start_time), _ms(end_time)
+    try:
+        pipe = redis_instance.pipeline(transaction=False)
+        for day in spanned_days(start_time, end_time):
+            pipe.zrangebyscore(day_fields_key(day), f"({now_ms}", "+inf")
+            pipe.zremrangebyscore(day_fields_key(day), "-inf", now_ms)
+        field_ids = sorted(
+            {int(field_id) for held in pipe.execute()[::2] for field_id in held}
+        )
+        holds = list(_active_holds(field_ids))
+    except redis.RedisError:
+        logger.exception("Could not read the slot holds")
+        return set()
+    held = set()
+    for field_id, members in holds:
+        for member in members:
+            _, _, held_start, held_end = _parse(member)
+            if held_start < end_ms and held_end > start_ms:
+                held.add(field_id)
+                break
+    return held
+
+
+def release_user_holds(field_id, user_id, start_time, end_time):
+    """Release the user's holds overlapping a booking they just made."""
+    start_ms, end_ms = _ms(start_time), _ms(end_time)
+    try:
+        for _, members in _active_holds([field_id]):
+            for member in members:
+                hold_id, held_user_id, held_start, held_end = _parse(member)
+                if (
+                    held_user_id == user_id
+                    and held_start < end_ms
+                    and held_end > start_ms
+                ):
+                    try:
+                        release_hold(hold_id, user_id)
+                    except HoldNotFound:
+                        pass
+    except redis.RedisError:
+        # The holds expire on their own
+        logger.exception("Could not release the slot holds")
+
+
+def clear_holds():
+    pipe = redis_instance.pipeline(transaction=False)
+    for key in redis_instance.scan_iter(match=f"{KEY_PREFIX}:*", count=1000):
+        pipe.delete(key)
+    pipe.execute()
@@ -0,0 +1,139 @@
+from datetime import time
+
+from django.core.exceptions import ValidationError
+from django.db.models import BigIntegerField, ExpressionWrapper, F
+from django.utils import timezone
+
+# Opening hours are kept as a bitmask of HOURS_SLOT_MINUTES slots per
+# weekday, bit i set when the field is open for the whole of slot i. A day
+# has 48 slots, so each weekday fits in one bigint.
+HOURS_SLOT_MINUTES = 30
+
+
+def parse_weekly_hours(weekly_hours):
+    """
+    Return {weekday: (opening, closing) or None} from the stored JSON, where
+    weekdays are "0" (Monday) to "6" mapped to ["HH:MM", "HH:MM"] or to
+    null when the field is closed that day.
+    """
+    return {
+        int(weekday): (
+            None
+            if hours is None
+            else (time.fromisoformat(hours[0]), time.fromisoformat(hours[1]))
+        )
+        for weekday, hours in (weekly_hours or {}).items()
+    }
+
+
+def day_hours(opening_time, closing_time, weekly_hours, weekday):
+    """Opening and closing times on a weekday, or None when closed."""
+    hours = parse_weekly_hours(weekly_hours)
+    return hours.get(weekday, (opening_time, closing_time))
+
+
+def check_slot_time(value):
+    """Opening hours must lie on the slot grid of the mask."""
+    if value.minute % HOURS_SLOT_MINUTES or value.second or value.microsecond:
+        raise ValidationError(
+            f"Opening hours must be multiples of {HOURS_SLOT_MINUTES} minutes.",
+            code="hours",
+        )
+
+
+def check_hours_order(opening_time, closing_time):
+    if opening_time >= closing_time:
+        raise ValidationError("Opening time must be before closing time.", code="hours")
+
+
+def check_hours(opening_time, closing_time):
+    check_slot_time(opening_time)
+    check_slot_time(closing_time)
+    check_hours_order(opening_time, closing_time)
+
+
+def check_weekly_hours(weekly_hours):
+    if not isinstance(weekly_hours, dict):
+        raise ValidationError("Weekly hours must be an object.", code="hours")
+    for weekday, hours in weekly_hours.items():
+        if weekday not in {str(day) for day in range(7)}:
+            raise ValidationError(
+                "Weekdays must be 0 (Monday) to 6 (Sunday).", code="hours"
+            )
+        if hours is None:
+            continue
+        try:
+            opening_time, closing_time = (time.fromisoformat(value) for value in hours)
+        except (TypeError, ValueError):
+            raise ValidationError(
+                'Hours must be null or ["HH:MM", "HH:MM"].', code="hours"
+            )
+        check_hours(opening_time, closing_time)
+
+
+def slot_bits(first, last):
+    """Mask of the slots first to last - 1."""
+    if last <= first:
+        return 0
+    return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def weekly_mask(opening_time, closing_time, weekly_hours):
+    """The seven day masks of a field, Monday first."""
+    hours = parse_weekly_hours(weekly_hours)
+    masks = []
+    for weekday in range(7):
+        day = hours.get(weekday, (opening_time, closing_time))
+        if day is None:
+            masks.append(0)
+            continue
+        # Only slots entirely within the opening hours are open
+        first = -(-_minutes(day[0]) // HOURS_SLOT_MINUTES)
+        last = _minutes(day[1]) // HOURS_SLOT_MINUTES
+        masks.append(slot_bits(first, last))
+    return masks
+
+
+def span_bits(start, end):
+    """
+    Return (weekday, mask) of the slots that [start, end) touches, or None
+    when it does not fall within a single local day.
+    """
+    start = timezone.localtime(start)
+    end = timezone.localtime(end)
+    end_minutes = _minutes(end) + (1 if end.second or end.microsecond else 0)
+    if end.date() != start.date():
+        # The span may only end at the midnight that closes its day
+        if end.time() != time.min or (end.date() - start.date()).days != 1:
+            return None
+        end_minutes = 24 * 60
+    first = _minutes(start) // HOURS_SLOT_MINUTES
+    last = -(-end_minutes // HOURS_SLOT_MINUTES)
+    return start.weekday(), slot_bits(first, last)
+
+
+def is_open(field, start, end):
+    """Whether the field is open during the whole of [start, end)."""
+    span = span_bits(start, end)
+    if span is None:
+        return False
+    weekday, bits = span
+    return field.hours_mask[weekday] & bits == bits
+
+
+def open_during(queryset, start, end):
+    """Narrow a FootballField queryset to the fields open during [start, end)."""
+    span = span_bits(start, end)
+    if span is None:
+        return queryset.none()
+    weekday, bits = span
+    # Masks past slot 31 overflow an integer, so the result is a bigint
+    return queryset.alias(
+        open_bits=ExpressionWrapper(
+            F(f"hours_mask__{weekday}").bitand(bits), BigIntegerField()
+        )
+    ).filter(open_bits=bits)
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+redis_instance = redis.StrictRedis(
+    host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+)
+
+KEY_PREFIX = "idempotency"
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# A request still pending after this long is taken to have died with its
+# worker, and its key can be used again
+PENDING_SECONDS = 60
+POLL_SECONDS = 0.05
+
+
+def _key(user_id, idempotency_key):
+    digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+    return f"{KEY_PREFIX}:{user_id}:{digest}"
+
+
+def _fingerprint(data):
+    # Of the parsed body, so retries that encode it differently still match
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    encoded = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _wait_for_result(key, fingerprint):
+    """
+    Return the stored entry of a key once its request finished, or the
+    pending one after IDEMPOTENCY_WAIT_SECONDS. None when the key is gone.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        entry = redis_instance.get(key)
+        if entry is None:
+            # The first request failed, and released the key for this one
+            return None
+        entry = json.loads(entry)
+        if entry["state"] == "done" or entry["fingerprint"] != fingerprint:
+            return entry
+        if time.monotonic() >= deadline:
+            return entry
+        time.sleep(POLL_SECONDS)
+
+
+class IdempotentPostMixin:
+    """
+    Honours an Idempotency-Key header on POST. The first request with a key
+    runs and its response is stored in Redis for IDEMPOTENCY_KEY_TTL_SECONDS.
+    Retries with the same key get the stored response back, with an
+    Idempotent-Replayed header, without running the request again. Retries
+    that arrive while the first request runs wait for its response.
+
+    Keys are per user. Reusing a key with a different body is rejected.
+    Server errors are not stored, so they can be retried with the same key.
+    """
+
+    def post(self, request, *args, **kwargs):
+        idempotency_key = request.headers.get(HEADER)
+        # Anonymous requests are turned away by the permissions anyway
+        if not idempotency_key or not request.user.is_authenticated:
+            return super().post(request, *args, **kwargs)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        key = _key(request.user.pk, idempotency_key)
+        fingerprint = _fingerprint(request.data)
+        pending = json.dumps({"state": "pending", "fingerprint": fingerprint})
+        try:
+            acquired = redis_instance.set(key, pending, nx=True, ex=PENDING_SECONDS)
+            entry = None if acquired else _wait_for_result(key, fingerprint)
+        except redis.RedisError:
+            # Without Redis requests run as if they had no key
+            logger.exception("Could not read the idempotency keys")
+            return super().post(request, *args, **kwargs)
+
+        if not acquired:
+            if entry is None:
+                # The first request failed, so this one runs in its place
+                return self.post(request, *args, **kwargs)
+            if entry["fingerprint"] != fingerprint:
+                return Response(
+                    {"detail": f"This {HEADER} was used with a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if entry["state"] != "done":
+                return Response(
+                    {"detail": f"A request with this {HEADER} is still in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return Response(
+                entry["data"],
+                status=entry["status"],
+                headers={REPLAYED_HEADER: "true"},
+            )
+
+        response = None
+        try:
+            response = super().post(request, *args, **kwargs)
+        finally:
+            self._store(key, fingerprint, response)
+        return response
+
+    def _store(self, key, fingerprint, response):
+        try:
+            if response is None or response.status_code >= 500:
+                redis_instance.delete(key)
+                return
+            entry = {
+                "state": "done",
+                "fingerprint": fingerprint,
+                "status": response.status_code,
+                "data": response.data,
+            }
+            redis_instance.set(
+                key,
+                json.dumps(entry, cls=DjangoJSONEncoder),
+                ex=settings.IDEMPOTENCY_KEY_TTL_SECONDS,
+            )
+        except redis.RedisError:
+            # A retry runs the request again, and meets its booking
+            logger.exception("Could not store an idempotent response")
@@ -0,0 +1,101 @@
+import json
+import logging
+import time
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+from .serializers import FreeSlotSerializer
+
+logger = logging.getLogger(__name__)
+
+redis_instance = redis.StrictRedis(
+    host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+)
+
+CHANNEL_PREFIX = "availability"
+# Sent first, so clients reconnect after this many milliseconds
+RETRY_MILLISECONDS = 3000
+
+
+def field_channel(field_id):
+    return f"{CHANNEL_PREFIX}:field:{field_id}"
+
+
+def district_channel(district_id):
+    return f"{CHANNEL_PREFIX}:district:{district_id}"
+
+
+def booking_delta(event, field, start_time, end_time):
+    """
+    The slots of the field's booking grid that a booking took ("booked") or
+    gave back ("released"). Bookings last a multiple of min_booking_duration,
+    so the slots split the booking in min_booking_duration steps.
+    """
+    step = field.min_booking_duration
+    slots = []
+    start = start_time
+    while start < end_time:
+        slots.append((start, min(start + step, end_time)))
+        start += step
+    return {
+        "event": event,
+        "field_id": field.id,
+        "district_id": field.district_id,
+        "slots": FreeSlotSerializer.serialize_many(slots),
+    }
+
+
+def publish_delta(delta):
+    """Publish a delta to the subscribers of its field and of its district."""
+    message = json.dumps(delta)
+    try:
+        pipe = redis_instance.pipeline(transaction=False)
+        pipe.publish(field_channel(delta["field_id"]), message)
+        pipe.publish(district_channel(delta["district_id"]), message)
+        pipe.execute()
+    except redis.RedisError:
+        # Subscribers miss this delta, and catch up on their next reload
+        logger.exception("Could not publish an availability delta")
+
+
+def format_event(message):
+    """Format a published delta as a Server-Sent Event."""
+    delta = json.loads(message)
+    return f"event: {delta.pop('event')}\ndata: {json.dumps(delta)}\n\n"
+
+
+async def stream_deltas(channels):
+    """
+    Yield the deltas published on the channels as Server-Sent Events, with
+    a comment line after each LIVE_HEARTBEAT_SECONDS without one, so that
+    proxies keep the connection open. Runs until the client disconnects,
+    which cancels the generator.
+    """
+    client = redis.asyncio.Redis(
+        host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+    )
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(*channels)
+        # Subscribed before the first byte, so nothing published after the
+        # client sees the response is missed
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        heartbeat = settings.LIVE_HEARTBEAT_SECONDS
+        last_sent = time.monotonic()
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=heartbeat
+            )
+            if message is not None:
+                yield format_event(message["data"])
+            elif time.monotonic() - last_sent >= heartbeat:
+                yield ": keepalive\n\n"
+            else:
+                # A subscribe confirmation, which is not sent on
+                continue
+            last_sent = time.monotonic()
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
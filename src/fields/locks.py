@@ -0,0 +1,96 @@
+import logging
+import time
+from datetime import timedelta
+from functools import partial
+
+import redis
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "booking_locks"
+STATS = ["acquired", "contended", "wait_ms"]
+
+# Advisory lock keys are field_id << DAY_BITS | the day's ordinal, which is
+# below 2 ** 20 until the year 2870
+DAY_BITS = 20
+
+
+def lock_key(field_id, day):
+    return field_id << DAY_BITS | day.toordinal()
+
+
+def spanned_days(start, end):
+    """The local days [start, end) touches."""
+    day = timezone.localdate(start)
+    last_day = timezone.localdate(end - timedelta(microseconds=1))
+    days = []
+    while day <= last_day:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def lock_field_days(spans):
+    """
+    Take the transaction-level advisory locks of every (field, day) that the
+    (field_id, start, end) spans touch, waiting for transactions holding any
+    of them. Must run in a transaction, which releases them when it ends.
+
+    Bookings of one field on one day are made one at a time, while other
+    days and other fields go ahead in parallel. The locks are taken in key
+    order, so transactions locking several days cannot deadlock.
+
+    The counts of the locks and of the waits are recorded once the
+    transaction commits, so Redis is not called while the locks are held.
+    """
+    keys = sorted(
+        {
+            lock_key(field_id, day)
+            for field_id, start, end in spans
+            for day in spanned_days(start, end)
+        }
+    )
+    contended = 0
+    waited = 0.0
+    with connection.cursor() as cursor:
+        for key in keys:
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [key])
+            if cursor.fetchone()[0]:
+                continue
+            contended += 1
+            started = time.monotonic()
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+            waited += time.monotonic() - started
+    transaction.on_commit(partial(record, len(keys), contended, waited))
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key, delta)
+
+
+def record(acquired, contended, waited):
+    try:
+        _incr(f"{KEY_PREFIX}:stats:acquired", acquired)
+        if contended:
+            _incr(f"{KEY_PREFIX}:stats:contended", contended)
+            _incr(f"{KEY_PREFIX}:stats:wait_ms", round(waited * 1000))
+    except redis.RedisError:
+        # Only the statistics are lost
+        logger.exception("Could not record the booking lock statistics")
+
+
+def get_stats():
+    keys = {name: f"{KEY_PREFIX}:stats:{name}" for name in STATS}
+    values = cache.get_many(keys.values())
+    return {name: values.get(key, 0) for name, key in keys.items()}
+
+
+def reset_stats():
+    cache.delete_many([f"{KEY_PREFIX}:stats:{name}" for name in STATS])
@@ -0,0 +1,182 @@
+import random
+import statistics
+import time
+from datetime import time as dt_time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from fields.models import FootballField
+from location.models import City, District, Region
+
+User = get_user_model()
+
+# Seeded fields are spread around Tashkent
+CENTER_LATITUDE = 41.311081
+CENTER_LONGITUDE = 69.240562
+SPREAD_DEGREES = 1.5
+
+DISTRICT_NAMES = [
+    "Chilonzor",
+    "Yunusobod",
+    "Mirzo Ulug‘bek",
+    "Olmazor",
+    "Shayxontohur",
+    "Uchtepa",
+    "Yakkasaroy",
+    "Mirobod",
+    "Sergeli",
+    "Bektemir",
+    "Yashnobod",
+    "Yangihayot",
+]
+SYLLABLES = [
+    "bo",
+    "yod",
+    "kor",
+    "chi",
+    "lon",
+    "zor",
+    "mi",
+    "ro",
+    "bod",
+    "sa",
+    "roy",
+    "ta",
+    "shi",
+    "gul",
+    "nur",
+    "ol",
+    "ma",
+    "tep",
+    "qa",
+    "ra",
+]
+FIELD_KINDS = ["Arena", "Stadion", "Sport", "Futbol", "Park", "Мини-футбол", "Спорт"]
+FIELD_NAMES = [
+    "Bunyodkor",
+    "Пахтакор",
+    "Chilonzor Arena",
+    "Юнусобод Стадион",
+    "Olmazor Sport",
+    "Mirobod Futbol",
+    "Сергели Спорт",
+    "Yakkasaroy Park",
+    "Navro‘z",
+    "Ғалаба",
+]
+STREETS = [
+    "Amir Temur ko‘chasi",
+    "Бобур кўчаси",
+    "Mustaqillik shoh ko‘chasi",
+    "Навоий кўчаси",
+    "Shota Rustaveli",
+    "Фарғона йўли",
+]
+
+
+class BenchmarkCommand(BaseCommand):
+    """
+    Base class for benchmark commands. Each size is seeded and measured
+    inside a transaction that is rolled back, so the database is left as
+    it was.
+    """
+
+    default_sizes = [10_000, 100_000]
+    repeat = 20
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=self.default_sizes,
+            help="Number of football fields to seed for each run",
+        )
+        parser.add_argument("--repeat", type=int, default=self.repeat)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        for size in options["sizes"]:
+            random.seed(options["seed"])
+            with transaction.atomic():
+                self.stdout.write(f"Seeding {size} fields...")
+                context = self.seed(size)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{size} fields"))
+                self.run_benchmark(size, context)
+                transaction.set_rollback(True)
+
+    def seed(self, size):
+        owner = User.objects.create_user(
+            phone_number="+998900000000",
+            first_name="Benchmark",
+            last_name="Owner",
+            password=None,
+            role="owner",
+        )
+        region = Region.objects.create(name="Benchmark Region")
+        city = City.objects.create(name="Benchmark City", region=region)
+        districts = District.objects.bulk_create(
+            District(name=name, city=city) for name in DISTRICT_NAMES
+        )
+        fields = []
+        for i in range(size):
+            latitude = Decimal(
+                f"{CENTER_LATITUDE + random.uniform(-SPREAD_DEGREES, SPREAD_DEGREES):.6f}"
+            )
+            longitude = Decimal(
+                f"{CENTER_LONGITUDE + random.uniform(-SPREAD_DEGREES, SPREAD_DEGREES):.6f}"
+            )
+            fields.append(
+                self.build_field(
+                    i, owner, random.choice(districts), latitude, longitude
+                )
+            )
+        FootballField.objects.bulk_create(fields, batch_size=5_000)
+        return {"owner": owner, "districts": districts}
+
+    def build_field(self, i, owner, district, latitude, longitude):
+        field = FootballField(
+            owner=owner,
+            name=self.field_name(i),
+            address=f"{random.choice(STREETS)} {i}",
+            district=district,
+            contact="+998900000000",
+            hourly_rate=Decimal(random.randrange(50, 500) * 1000),
+            opening_time=dt_time(random.choice([6, 7, 8, 9]), 0),
+            closing_time=dt_time(random.choice([21, 22, 23]), 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=latitude,
+            longitude=longitude,
+        )
+        # bulk_create() skips save(), so derived columns are filled in here
+        field.refresh_derived_fields()
+        return field
+
+    def field_name(self, i):
+        # Mostly unique made-up names, with a few well-known ones repeated
+        if random.random() < 0.02:
+            return f"{random.choice(FIELD_NAMES)} {i}"
+        word = "".join(random.choices(SYLLABLES, k=random.randint(2, 4)))
+        return f"{word.capitalize()} {random.choice(FIELD_KINDS)}"
+
+    def run_benchmark(self, size, context):
+        raise NotImplementedError
+
+    def measure(self, label, func):
+        func()  # warm up
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"  {label:<40} median {statistics.median(timings):8.2f} ms"
+            f"   p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.2f} ms"
+        )
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from fields.models import FootballField
+from location.boundaries import get_district_index
+from location.models import District
+
+
+class Command(BaseCommand):
+    help = (
+        "Set the district of every football field to the district whose "
+        "boundary contains its location. Fields outside every boundary are "
+        "left as they are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many fields would change",
+        )
+
+    def handle(self, *args, **options):
+        index = get_district_index()
+        if not len(index):
+            self.stdout.write("No district boundaries are loaded.")
+            return
+        districts = District.objects.select_related("city").in_bulk()
+        batch_size = options["batch_size"]
+
+        checked = changed = 0
+        batch = []
+        fields = (
+            FootballField.objects.only(
+                "id", "name", "address", "district_id", "latitude", "longitude"
+            )
+            .order_by("pk")
+            .iterator(chunk_size=batch_size)
+        )
+        with transaction.atomic():
+            for field in fields:
+                checked += 1
+                district_id = index.lookup(field.latitude, field.longitude)
+                if district_id is None or district_id == field.district_id:
+                    continue
+                changed += 1
+                if options["dry_run"]:
+                    continue
+                field.district = districts[district_id]
+                # The district and city names are part of the search document
+                field.search_document = field.build_search_document()
+                # bulk_update() skips auto_now, and the delta sync needs it
+                field.updated_at = timezone.now()
+                batch.append(field)
+                if len(batch) == batch_size:
+                    FootballField.objects.bulk_update(
+                        batch, ["district", "search_document", "updated_at"]
+                    )
+                    batch = []
+            if batch:
+                FootballField.objects.bulk_update(
+                    batch, ["district", "search_document", "updated_at"]
+                )
+
+        verb = "would move" if options["dry_run"] else "moved"
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} fields, {verb} {changed}.")
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from fields.result_cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = "Show the hit and miss counts of the available fields result cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counts after showing them"
+        )
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        total = sum(stats.values())
+        ratio = stats["hit"] / total if total else 0.0
+        self.stdout.write(
+            f"hits: {stats['hit']}  misses: {stats['miss']}  "
+            f"early recomputes: {stats['early']}  hit ratio: {ratio:.1%}"
+        )
+        if options["reset"]:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Reset the counts."))
@@ -0,0 +1,86 @@
+import random
+import time
+from io import StringIO
+
+from django.core.management import call_command
+
+from location.boundaries import DistrictIndex, get_district_index
+from location.models import District
+
+from ._benchmark import (
+    CENTER_LATITUDE,
+    CENTER_LONGITUDE,
+    SPREAD_DEGREES,
+    BenchmarkCommand,
+)
+
+GRID_COLUMNS = 4
+GRID_ROWS = 3
+# Points per side of every seeded boundary, for realistic polygon sizes
+POINTS_PER_SIDE = 50
+LOOKUPS = 10_000
+
+
+def rectangle(min_lon, min_lat, max_lon, max_lat):
+    steps = [i / POINTS_PER_SIDE for i in range(POINTS_PER_SIDE)]
+    ring = (
+        [[min_lon + (max_lon - min_lon) * t, min_lat] for t in steps]
+        + [[max_lon, min_lat + (max_lat - min_lat) * t] for t in steps]
+        + [[max_lon - (max_lon - min_lon) * t, max_lat] for t in steps]
+        + [[min_lon, max_lat - (max_lat - min_lat) * t] for t in steps]
+    )
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Measure district lookups by point-in-polygon against seeded district "
+        "boundaries, and the bulk reassignment of every field."
+    )
+
+    default_sizes = [100_000]
+
+    def run_benchmark(self, size, context):
+        # The seeded area is split into a grid of districts
+        width = 2 * SPREAD_DEGREES / GRID_COLUMNS
+        height = 2 * SPREAD_DEGREES / GRID_ROWS
+        districts = context["districts"]
+        for i, district in enumerate(districts):
+            column, row = i % GRID_COLUMNS, i // GRID_COLUMNS
+            min_lon = CENTER_LONGITUDE - SPREAD_DEGREES + column * width
+            min_lat = CENTER_LATITUDE - SPREAD_DEGREES + row * height
+            district.boundary = rectangle(
+                min_lon, min_lat, min_lon + width, min_lat + height
+            )
+        District.objects.bulk_update(districts, ["boundary"])
+
+        boundaries = [(district.id, district.boundary) for district in districts]
+        self.measure("build index", lambda: DistrictIndex(boundaries))
+
+        index = DistrictIndex(boundaries)
+        points = [
+            (
+                CENTER_LATITUDE + random.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+                CENTER_LONGITUDE + random.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+            )
+            for _ in range(LOOKUPS)
+        ]
+
+        def lookups():
+            for latitude, longitude in points:
+                index.lookup(latitude, longitude)
+
+        self.measure(f"{LOOKUPS} lookups", lookups)
+        start = time.perf_counter()
+        lookups()
+        rate = LOOKUPS / (time.perf_counter() - start)
+        self.stdout.write(f"  {'lookups per second':<40} {rate:11.0f}")
+
+        get_district_index()
+        self.repeat, repeat = 1, self.repeat
+        self.measure(
+            "assign_districts --dry-run",
+            lambda: call_command("assign_districts", dry_run=True, stdout=StringIO()),
+        )
+        self.repeat = repeat
@@ -0,0 +1,87 @@
+import random
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from fields.matrix import availability_matrix, district_availability, encode_rows
+from fields.models import Booking, FootballField
+
+from ._benchmark import BenchmarkCommand
+
+SLOT = timedelta(minutes=15)
+SLOT_COUNT = 96
+BOOKINGS_PER_FIELD = 6
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Measure the fields x slots availability grid of one district with "
+        "500 fields and 96 slots, against one ORM query per slot."
+    )
+
+    default_sizes = [500]
+
+    def run_benchmark(self, size, context):
+        district = context["districts"][0]
+        FootballField.objects.update(district=district)
+
+        day = timezone.localdate() + timedelta(days=1)
+        day_start = timezone.make_aware(datetime.combine(day, time.min))
+        bookings = []
+        for field in FootballField.objects.all():
+            for hour in random.sample(range(8, 21), BOOKINGS_PER_FIELD):
+                start = day_start + timedelta(hours=hour)
+                bookings.append(
+                    Booking(
+                        field=field,
+                        user=context["owner"],
+                        start_time=start,
+                        end_time=start + timedelta(hours=1),
+                    )
+                )
+        Booking.objects.bulk_create(bookings, batch_size=5_000)
+        self.stdout.write(f"  {len(bookings)} bookings on {day}")
+
+        fields = list(
+            FootballField.objects.filter(district=district).values_list(
+                "id", "opening_time", "closing_time", "name"
+            )
+        )
+        rows = list(
+            Booking.objects.filter(field__district=district).values_list(
+                "field_id", "start_time", "end_time"
+            )
+        )
+
+        def compute():
+            return encode_rows(
+                availability_matrix(fields, rows, day_start, SLOT, SLOT_COUNT)
+            )
+
+        def per_slot_queries():
+            # What the overview did before: one availability query per column
+            for j in range(SLOT_COUNT):
+                start = day_start + j * SLOT
+                end = start + SLOT
+                overlapping = Booking.objects.filter(
+                    field=OuterRef("pk"), start_time__lt=end, end_time__gt=start
+                )
+                list(
+                    FootballField.objects.filter(
+                        district=district,
+                        opening_time__lte=start.time(),
+                        closing_time__gte=end.time(),
+                    )
+                    .exclude(Exists(overlapping))
+                    .values_list("id", flat=True)
+                )
+
+        self.measure(f"matrix only ({size} x {SLOT_COUNT})", compute)
+        self.measure(
+            "two queries + matrix",
+            lambda: district_availability(district.id, day, SLOT),
+        )
+        self.repeat, repeat = 3, self.repeat
+        self.measure(f"{SLOT_COUNT} ORM queries", per_slot_queries)
+        self.repeat = repeat
@@ -0,0 +1,51 @@
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import ACos, Cos, Radians, Sin
+
+from fields.geo import filter_nearby
+from fields.models import FootballField
+
+from ._benchmark import CENTER_LATITUDE, CENTER_LONGITUDE, BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Compare the full-table haversine sort with the bounding-box "
+        "prefiltered distance search used by available-fields."
+    )
+
+    radius_km = 5
+
+    def run_benchmark(self, size, context):
+        latitude, longitude = CENTER_LATITUDE, CENTER_LONGITUDE
+
+        def full_scan():
+            # The distance search as it was before the bounding-box prefilter
+            distance = ExpressionWrapper(
+                ACos(
+                    Sin(Radians(F("latitude"))) * Sin(Radians(latitude))
+                    + Cos(Radians(F("latitude")))
+                    * Cos(Radians(latitude))
+                    * Cos(Radians(F("longitude")) - Radians(longitude))
+                )
+                * 6371,
+                output_field=FloatField(),
+            )
+            queryset = FootballField.objects.annotate(distance=distance).filter(
+                distance__lte=self.radius_km
+            )
+            return list(queryset.order_by("distance").values_list("id", flat=True))
+
+        def bounding_box():
+            queryset = filter_nearby(
+                FootballField.objects.all(),
+                latitude,
+                longitude,
+                radius_km=self.radius_km,
+            )
+            return list(queryset.order_by("distance").values_list("id", flat=True))
+
+        matches = len(bounding_box())
+        assert matches == len(full_scan())
+        self.stdout.write(f"  {matches} fields within {self.radius_km} km")
+        self.measure("full-table haversine", full_scan)
+        self.measure("bounding box + haversine", bounding_box)
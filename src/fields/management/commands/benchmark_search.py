@@ -0,0 +1,48 @@
+from django.db.models import Q
+
+from fields.models import FootballField
+from fields.search import search_fields
+
+from ._benchmark import BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Measure the latency of the fuzzy field search (?q=) against a seeded "
+        "catalogue, compared with unindexed icontains matching."
+    )
+
+    default_sizes = [100_000]
+    queries = [
+        "chilonzor",
+        "Чилонзор",
+        "bunyodkor",
+        "Пахтакор",
+        "navroz",
+        "amir temur",
+        # Typos only the trigram fallback can match
+        "bunyodkr",
+        "chilanzor arena",
+    ]
+
+    def run_benchmark(self, size, context):
+        for query in self.queries:
+
+            def icontains(query=query):
+                queryset = FootballField.objects.filter(
+                    Q(name__icontains=query) | Q(address__icontains=query)
+                )
+                return list(queryset.order_by("-created_at", "-id")[:50])
+
+            def fuzzy(query=query):
+                queryset = search_fields(FootballField.objects.all(), query)
+                return list(queryset.order_by("-rank", "id")[:50])
+
+            self.stdout.write(f"  q={query!r}: {len(fuzzy())} results on page one")
+            self.measure("icontains on name/address", icontains)
+            self.measure("trigram + full-text search", fuzzy)
+
+        for query in ["bunyodkor", "bunyodkr"]:
+            queryset = search_fields(FootballField.objects.all(), query)
+            self.stdout.write(f"  EXPLAIN q={query!r}")
+            self.stdout.write(queryset.order_by("-rank", "id")[:50].explain())
@@ -0,0 +1,73 @@
+import random
+from datetime import datetime
+from datetime import time as dt_time
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from fields.models import Booking
+from fields.views import FieldSlotsView
+
+from ._benchmark import BenchmarkCommand
+
+HISTORY_DAYS = 180
+CALENDAR_DAYS = 30
+BOOKED_SHARE = 0.5
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Measure the free-slot calendar of one busy field over a 30-day window, "
+        "with half of its slots booked for the past six months and the month ahead."
+    )
+
+    default_sizes = [10_000]
+
+    def run_benchmark(self, size, context):
+        field = context["owner"].fields.first()
+        field.opening_time = dt_time(6, 0)
+        field.closing_time = dt_time(23, 0)
+        field.min_booking_duration = timedelta(minutes=30)
+        field.save()
+
+        today = timezone.localdate()
+        step = field.min_booking_duration
+        bookings = []
+        for offset in range(-HISTORY_DAYS, CALENDAR_DAYS + 1):
+            day = today + timedelta(days=offset)
+            start = timezone.make_aware(datetime.combine(day, field.opening_time))
+            closing = timezone.make_aware(datetime.combine(day, field.closing_time))
+            while start + step <= closing:
+                if random.random() < BOOKED_SHARE:
+                    bookings.append(
+                        Booking(
+                            field=field,
+                            user=context["owner"],
+                            start_time=start,
+                            end_time=start + step,
+                        )
+                    )
+                start += step
+        # bulk_create() skips Booking.clean(), which rejects past bookings
+        Booking.objects.bulk_create(bookings, batch_size=5_000)
+        self.stdout.write(f"  {len(bookings)} bookings on field {field.id}")
+
+        start = timezone.now()
+        factory = APIRequestFactory()
+        view = FieldSlotsView.as_view()
+
+        def calendar():
+            request = factory.get(
+                f"/fields/fields/{field.id}/slots/",
+                {
+                    "from": start.isoformat(),
+                    "to": (start + timedelta(days=CALENDAR_DAYS)).isoformat(),
+                },
+            )
+            response = view(request, pk=field.id)
+            response.render()
+            return response
+
+        self.stdout.write(f"  {len(calendar().data)} free intervals")
+        self.measure(f"{CALENDAR_DAYS}-day slot calendar", calendar)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from fields.locks import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Show how often booking creation waited for a (field, day) lock and "
+        "for how long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counts after showing them"
+        )
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        contended = stats["contended"]
+        share = contended / stats["acquired"] if stats["acquired"] else 0.0
+        average = stats["wait_ms"] / contended if contended else 0.0
+        self.stdout.write(
+            f"locks: {stats['acquired']}  waited for: {contended} ({share:.1%})  "
+            f"total wait: {stats['wait_ms']} ms  average wait: {average:.1f} ms"
+        )
+        if options["reset"]:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Reset the counts."))
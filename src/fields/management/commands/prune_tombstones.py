@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from fields.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the delta sync tombstones older than SYNC_TOMBSTONE_RETENTION. "
+        "Clients that last synced before then get a full sync instead."
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones."))
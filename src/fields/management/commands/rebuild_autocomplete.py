@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from fields.autocomplete import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Redis autocomplete index of fields, regions, cities and districts."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} names."))
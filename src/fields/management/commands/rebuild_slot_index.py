@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from fields.slot_index import clear_index, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Redis bitmaps of booked slots per field and day from the "
+        "database. Run it daily so the indexed range keeps moving forward."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.MAX_SEARCH_WINDOW.days,
+            help="Number of days after today to index",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Drop the index instead, so availability is read from the database",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            clear_index()
+            self.stdout.write(self.style.SUCCESS("Cleared the slot index."))
+            return
+        count = rebuild_index(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} field days."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from fields.availability import refresh_next_available
+from fields.models import FootballField
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll next_available_start forward as time passes. Run it every few "
+        "minutes: it recomputes fields whose next free slot has started and "
+        "fields that had no free slot within the horizon."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--all", action="store_true", help="Recompute every football field"
+        )
+
+    def handle(self, *args, **options):
+        queryset = FootballField.objects.all()
+        if not options["all"]:
+            queryset = queryset.filter(
+                Q(next_available_start__lte=timezone.now())
+                | Q(next_available_start__isnull=True)
+            )
+        ids = queryset.order_by("pk").values_list("pk", flat=True)
+
+        batch_size = options["batch_size"]
+        checked = changed = 0
+        batch = []
+        for pk in ids.iterator(chunk_size=batch_size):
+            batch.append(pk)
+            if len(batch) == batch_size:
+                changed += refresh_next_available(batch)
+                checked += len(batch)
+                batch = []
+        if batch:
+            changed += refresh_next_available(batch)
+            checked += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} fields, updated {changed}.")
+        )
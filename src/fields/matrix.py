@@ -0,0 +1,97 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from .availability import load_busy_intervals
+from .models import FootballField
+
+FREE = ord("1")
+TAKEN = ord("0")
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def availability_matrix(fields, bookings, day_start, slot, slot_count):
+    """
+    Compute the fields x slots boolean matrix of free slots, where slot j
+    covers [day_start + j * slot, day_start + (j + 1) * slot).
+
+    `fields` is a list of (id, opening, closing, ...) times and `bookings` a
+    list of (field_id, start_time, end_time). A slot is free when it lies
+    within the field's working hours and no booking overlaps it.
+    """
+    slot_seconds = int(slot.total_seconds())
+    slot_starts = np.arange(slot_count, dtype=np.int64) * slot_seconds
+    slot_ends = slot_starts + slot_seconds
+
+    # Opening hours: one comparison of every slot against every field
+    opening = np.array([_seconds(f[1]) for f in fields], dtype=np.int64)[:, None]
+    closing = np.array([_seconds(f[2]) for f in fields], dtype=np.int64)[:, None]
+    open_slots = (slot_starts >= opening) & (slot_ends <= closing)
+
+    if not bookings:
+        return open_slots
+
+    # Bookings: +1 at the first slot each one overlaps and -1 after the last,
+    # so a running sum along each row counts the bookings covering a slot
+    rows = {field[0]: row for row, field in enumerate(fields)}
+    booking_rows = np.array([rows[b[0]] for b in bookings], dtype=np.int64)
+    starts = np.array(
+        [(b[1] - day_start).total_seconds() for b in bookings], dtype=np.int64
+    )
+    ends = np.array(
+        [(b[2] - day_start).total_seconds() for b in bookings], dtype=np.int64
+    )
+    first = np.clip(starts // slot_seconds, 0, slot_count)
+    last = np.clip(-(-ends // slot_seconds), 0, slot_count)
+
+    coverage = np.zeros((len(fields), slot_count + 1), dtype=np.int32)
+    np.add.at(coverage, (booking_rows, first), 1)
+    np.add.at(coverage, (booking_rows, last), -1)
+    booked = np.cumsum(coverage, axis=1)[:, :slot_count] > 0
+    return open_slots & ~booked
+
+
+def encode_rows(matrix):
+    """Encode each row of a boolean matrix as a string of 1 (free) and 0."""
+    chars = np.where(matrix, FREE, TAKEN).astype(np.uint8)
+    return [row.tobytes().decode("ascii") for row in chars]
+
+
+def district_availability(district_id, day, slot):
+    """
+    Free slots of every field of a district on a day, in three queries: the
+    fields, then the bookings and the blackouts overlapping the day.
+    """
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+    day_end = day_start + timedelta(days=1)
+    slot_count = int(timedelta(days=1) / slot)
+
+    fields = [
+        (field.id, *(field.hours_on(day.weekday()) or (time.min, time.min)), field.name)
+        for field in FootballField.objects.filter(district_id=district_id)
+        .order_by("name", "id")
+        .only("id", "opening_time", "closing_time", "weekly_hours", "name")
+    ]
+    busy = load_busy_intervals([field[0] for field in fields], day_start, day_end)
+    bookings = [
+        (field_id, start, end)
+        for field_id, intervals in busy.items()
+        for start, end in intervals
+    ]
+
+    rows = encode_rows(
+        availability_matrix(fields, bookings, day_start, slot, slot_count)
+    )
+    return {
+        "date": day.isoformat(),
+        "slot_minutes": int(slot.total_seconds() // 60),
+        "slots": slot_count,
+        "fields": [
+            {"id": field[0], "name": field[3], "free": row}
+            for field, row in zip(fields, rows)
+        ],
+    }
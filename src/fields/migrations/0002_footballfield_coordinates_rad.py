@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:05
+
+from django.db import migrations, models
+from django.db.models.functions import Radians
+
+
+def populate_coordinates_rad(apps, schema_editor):
+    FootballField = apps.get_model("fields", "FootballField")
+    FootballField.objects.update(
+        lat_rad=Radians("latitude"), lon_rad=Radians("longitude")
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="footballfield",
+            name="lat_rad",
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="footballfield",
+            name="lon_rad",
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.RunPython(populate_coordinates_rad, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=models.Index(
+                fields=["lat_rad", "lon_rad"], name="field_coords_rad_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+from fields.geo import geohash_encode
+
+
+def populate_geohash(apps, schema_editor):
+    FootballField = apps.get_model("fields", "FootballField")
+    fields = list(FootballField.objects.only("id", "latitude", "longitude"))
+    for field in fields:
+        field.geohash = geohash_encode(field.latitude, field.longitude)
+    FootballField.objects.bulk_update(fields, ["geohash"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0002_footballfield_coordinates_rad"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="footballfield",
+            name="geohash",
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=models.Index(
+                fields=["geohash"],
+                name="field_geohash_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
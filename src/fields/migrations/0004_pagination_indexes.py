@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0003_footballfield_geohash"),
+        ("location", "0002_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(fields=["start_time", "id"], name="booking_start_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["user", "start_time", "id"], name="booking_user_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["field", "start_time", "id"], name="booking_field_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=models.Index(fields=["created_at", "id"], name="field_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=models.Index(
+                fields=["owner", "created_at", "id"], name="field_owner_created_idx"
+            ),
+        ),
+    ]
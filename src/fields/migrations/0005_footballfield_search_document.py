@@ -0,0 +1,67 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from fields.search import normalize_search_text
+
+
+def populate_search_document(apps, schema_editor):
+    FootballField = apps.get_model("fields", "FootballField")
+    fields = list(FootballField.objects.select_related("district__city"))
+    for field in fields:
+        field.search_document = normalize_search_text(
+            " ".join(
+                [
+                    field.name,
+                    field.address,
+                    field.district.name,
+                    field.district.city.name,
+                ]
+            )
+        )
+    FootballField.objects.bulk_update(fields, ["search_document"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0004_pagination_indexes"),
+        ("location", "0002_pagination_indexes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="footballfield",
+            name="search_document",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(populate_search_document, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="footballfield",
+            name="search_vector",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.contrib.postgres.search.SearchVector(
+                    "search_document", config="simple"
+                ),
+                output_field=django.contrib.postgres.search.SearchVectorField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_document"],
+                name="field_search_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="field_search_fts_idx"
+            ),
+        ),
+    ]
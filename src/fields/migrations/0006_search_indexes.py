@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0005_footballfield_search_document"),
+        ("location", "0002_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=models.Index(fields=["hourly_rate", "id"], name="field_price_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=models.Index(
+                fields=["district", "hourly_rate", "id"],
+                name="field_district_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=models.Index(
+                fields=["district", "created_at", "id"],
+                name="field_district_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0006_search_indexes"),
+        ("location", "0003_district_boundary"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="footballfield",
+            name="next_available_start",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="footballfield",
+            index=models.Index(
+                fields=["next_available_start", "id"], name="field_next_available_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0007_footballfield_next_available_start"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FieldBlackout",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start_time", models.DateTimeField()),
+                ("end_time", models.DateTimeField()),
+                ("repeat_every", models.DurationField(blank=True, null=True)),
+                ("repeat_until", models.DateTimeField(blank=True, null=True)),
+                ("reason", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "field",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="blackouts",
+                        to="fields.footballfield",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["field", "start_time", "end_time"],
+                        name="blackout_field_start_idx",
+                    )
+                ],
+            },
+        ),
+    ]
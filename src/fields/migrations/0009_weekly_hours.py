@@ -0,0 +1,74 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:02
+
+from datetime import time
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+from fields.hours import HOURS_SLOT_MINUTES, weekly_mask
+
+
+def _grid_time(value, round_up):
+    minutes = value.hour * 60 + value.minute
+    if round_up and (minutes % HOURS_SLOT_MINUTES or value.second or value.microsecond):
+        minutes += HOURS_SLOT_MINUTES
+    minutes = min(minutes - minutes % HOURS_SLOT_MINUTES, 24 * 60 - HOURS_SLOT_MINUTES)
+    return time(minutes // 60, minutes % 60)
+
+
+def populate_hours_mask(apps, schema_editor):
+    # Opening hours must now lie on the slot grid. Off-grid hours are
+    # narrowed to the whole slots within them, which is what the mask
+    # enforces, and every field changed is reported
+    FootballField = apps.get_model("fields", "FootballField")
+    fields = list(
+        FootballField.objects.only("id", "opening_time", "closing_time", "weekly_hours")
+    )
+    for field in fields:
+        opening_time = _grid_time(field.opening_time, round_up=True)
+        closing_time = _grid_time(field.closing_time, round_up=False)
+        if (opening_time, closing_time) != (field.opening_time, field.closing_time):
+            if opening_time < closing_time:
+                print(
+                    f"\n  Field {field.pk}: opening hours {field.opening_time}-"
+                    f"{field.closing_time} narrowed to {opening_time}-{closing_time}",
+                    end="",
+                )
+                field.opening_time, field.closing_time = opening_time, closing_time
+            else:
+                print(
+                    f"\n  Field {field.pk}: opening hours {field.opening_time}-"
+                    f"{field.closing_time} hold no whole slot and cannot be booked",
+                    end="",
+                )
+        field.hours_mask = weekly_mask(
+            field.opening_time, field.closing_time, field.weekly_hours
+        )
+    FootballField.objects.bulk_update(
+        fields, ["opening_time", "closing_time", "hours_mask"], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0008_fieldblackout"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="footballfield",
+            name="hours_mask",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.BigIntegerField(),
+                default=list,
+                editable=False,
+                size=7,
+            ),
+        ),
+        migrations.AddField(
+            model_name="footballfield",
+            name="weekly_hours",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(populate_hours_mask, migrations.RunPython.noop),
+    ]
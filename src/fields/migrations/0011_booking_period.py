@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:28
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.conf import settings
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fields", "0010_sync_tracking"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # GiST support for the equality on field_id in the exclusion constraint
+        BtreeGistExtension(),
+        migrations.AlterUniqueTogether(
+            name="booking",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="booking",
+            name="period",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Func(
+                    models.F("start_time"), models.F("end_time"), function="TSTZRANGE"
+                ),
+                output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField(),
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="booking",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                expressions=[("field", "="), ("period", "&&")],
+                name="booking_no_overlap",
+            ),
+        ),
+    ]
@@ -1,14 +1,33 @@
-from datetime import datetime
+import math
 
 from _decimal import Decimal
 from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import (
+    ArrayField,
+    DateTimeRangeField,
+    RangeOperators,
+)
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Func, Q, Value
+from django.db.models.functions import Extract, Floor
 from django.utils import timezone
 
 from location.models import District
 
+from .geo import GEOHASH_PRECISION, geohash_encode
+from .hours import day_hours, is_open, weekly_mask
+from .search import SEARCH_CONFIG, normalize_search_text
+
+# SQLSTATE of exclusion_violation
+EXCLUSION_VIOLATION = "23P01"
+
+BLACKOUT_MESSAGE = "This field is closed for maintenance at the given time."
+
 
 class FootballField(models.Model):
     owner = models.ForeignKey(
@@ -24,8 +43,13 @@ class FootballField(models.Model):
     description = models.TextField(blank=True)
     opening_time = models.TimeField()
     closing_time = models.TimeField()
+    # Hours that differ from opening_time and closing_time on some weekdays,
+    # e.g. {"5": ["10:00", "23:00"], "6": null} for Saturdays and closed Sundays
+    weekly_hours = models.JSONField(default=dict, blank=True)
     min_booking_duration = models.DurationField(default=timezone.timedelta(hours=1))
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set on every save; bulk_update() callers set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
     latitude = models.DecimalField(
         max_digits=9,
         decimal_places=6,
@@ -46,16 +70,106 @@ class FootballField(models.Model):
         null=False,
         blank=False,
     )
+    # Float copies of the coordinates in radians, used by the distance search
+    lat_rad = models.FloatField(default=0.0, editable=False)
+    lon_rad = models.FloatField(default=0.0, editable=False)
+    geohash = models.CharField(max_length=GEOHASH_PRECISION, blank=True, editable=False)
+    # Normalised name, address, district and city used by the text search
+    search_document = models.TextField(blank=True, editable=False)
+    search_vector = models.GeneratedField(
+        expression=SearchVector("search_document", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    # Open slots of each weekday, see fields.hours
+    hours_mask = ArrayField(
+        models.BigIntegerField(), size=7, default=list, editable=False
+    )
+    # Earliest free min_booking_duration slot within NEXT_AVAILABLE_HORIZON,
+    # kept up to date by signals and the refresh_next_available command
+    next_available_start = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["lat_rad", "lon_rad"], name="field_coords_rad_idx"),
+            # Pattern ops let geohash prefix lookups (LIKE 'abc%') use the index
+            models.Index(
+                fields=["geohash"],
+                name="field_geohash_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            # Keyset pagination orderings
+            models.Index(fields=["created_at", "id"], name="field_created_idx"),
+            models.Index(
+                fields=["owner", "created_at", "id"], name="field_owner_created_idx"
+            ),
+            # Search filters and sort keys, with the district leading since it
+            # is the most selective filter people combine with the others
+            models.Index(fields=["hourly_rate", "id"], name="field_price_idx"),
+            models.Index(
+                fields=["district", "hourly_rate", "id"],
+                name="field_district_price_idx",
+            ),
+            models.Index(
+                fields=["district", "created_at", "id"],
+                name="field_district_created_idx",
+            ),
+            models.Index(
+                fields=["next_available_start", "id"], name="field_next_available_idx"
+            ),
+            # Delta sync, see fields.sync
+            models.Index(fields=["updated_at"], name="field_updated_idx"),
+            GinIndex(
+                fields=["search_document"],
+                name="field_search_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(fields=["search_vector"], name="field_search_fts_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        super().save(*args, **kwargs)
+
+    def refresh_derived_fields(self):
+        """
+        Recompute the columns derived from other fields. save() calls this;
+        call it directly before bulk_create() or bulk_update().
+        """
+        self.lat_rad = math.radians(self.latitude)
+        self.lon_rad = math.radians(self.longitude)
+        self.geohash = geohash_encode(self.latitude, self.longitude)
+        self.search_document = self.build_search_document()
+        self.hours_mask = weekly_mask(
+            self.opening_time, self.closing_time, self.weekly_hours
+        )
+
+    def hours_on(self, weekday):
+        """Opening and closing times on a weekday (0 is Monday), or None."""
+        return day_hours(
+            self.opening_time, self.closing_time, self.weekly_hours, weekday
+        )
+
+    def build_search_document(self):
+        return normalize_search_text(
+            " ".join(
+                [self.name, self.address, self.district.name, self.district.city.name]
+            )
+        )
+
 
 class FieldImage(models.Model):
     field = models.ForeignKey(
         FootballField, on_delete=models.CASCADE, related_name="images"
     )
     image = models.ImageField(upload_to="field_images/")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["updated_at"], name="image_updated_idx")]
 
     def __str__(self):
         return f"Image for {self.field.name}"
@@ -70,65 +184,246 @@ class Booking(models.Model):
     )
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
+    # [start_time, end_time), which the overlap constraint and the overlap
+    # lookups (period__overlap=(start, end)) use through its GiST index
+    period = models.GeneratedField(
+        expression=Func(F("start_time"), F("end_time"), function="TSTZRANGE"),
+        output_field=DateTimeRangeField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.field.name} booked by {self.user.phone_number}"
 
     class Meta:
-        unique_together = ("field", "start_time", "end_time")
+        constraints = [
+            # Bookings of a field never overlap. The database enforces it, so
+            # concurrent bookings of a field need no lock to be checked.
+            ExclusionConstraint(
+                name="booking_no_overlap",
+                expressions=[
+                    ("field", RangeOperators.EQUAL),
+                    ("period", RangeOperators.OVERLAPS),
+                ],
+                index_type="GIST",
+            ),
+        ]
+        indexes = [
+            # Keyset pagination orderings
+            models.Index(fields=["start_time", "id"], name="booking_start_idx"),
+            models.Index(
+                fields=["user", "start_time", "id"], name="booking_user_start_idx"
+            ),
+            models.Index(
+                fields=["field", "start_time", "id"], name="booking_field_start_idx"
+            ),
+        ]
 
     def clean(self):
-        if self.start_time <= timezone.now():
-            raise ValidationError("Start time must be in the future.")
-
-        if self.end_time <= self.start_time:
-            raise ValidationError("End time must be after start time.")
+        check_booking_times(self.field, self.start_time, self.end_time)
+        check_blackouts(self.field, self.start_time, self.end_time)
 
-        booking_duration = self.end_time - self.start_time
-
-        # Check that booking duration is at least the minimum booking duration
-        if booking_duration < self.field.min_booking_duration:
-            min_duration_minutes = int(
-                self.field.min_booking_duration.total_seconds() // 60
-            )
+    def save(self, *args, **kwargs):
+        self.clean()
+        try:
+            # A savepoint, so that a conflict leaves the caller's transaction
+            # usable
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError as e:
+            if getattr(e.__cause__, "pgcode", None) != EXCLUSION_VIOLATION:
+                raise
             raise ValidationError(
-                f"Booking duration must be at least {min_duration_minutes} minutes."
+                "This field is already booked for the given time.", code="overlap"
             )
 
-        # Check that booking duration is a multiple of min_booking_duration
-        booking_duration_seconds = int(booking_duration.total_seconds())
-        min_duration_seconds = int(self.field.min_booking_duration.total_seconds())
 
-        if booking_duration_seconds % min_duration_seconds != 0:
-            min_duration_minutes = int(min_duration_seconds // 60)
-            raise ValidationError(
-                f"Booking duration must be a multiple of the minimum booking duration ({min_duration_minutes} minutes)."
+class FieldBlackoutQuerySet(models.QuerySet):
+    def overlapping(self, start, end):
+        """
+        Blackouts with an occurrence overlapping [start, end).
+
+        For a recurring blackout that began before start, only two of its
+        occurrences can overlap: the last one starting at or before start,
+        computed in SQL, and the one after it.
+        """
+        elapsed = Extract(
+            ExpressionWrapper(Value(start) - F("start_time"), DurationField()),
+            "epoch",
+        )
+        previous = F("start_time") + F("repeat_every") * Floor(
+            elapsed / Extract("repeat_every", "epoch")
+        )
+        following = previous + F("repeat_every")
+        duration = F("end_time") - F("start_time")
+        return self.alias(
+            previous_start=ExpressionWrapper(previous, models.DateTimeField()),
+            previous_end=ExpressionWrapper(previous + duration, models.DateTimeField()),
+            following_start=ExpressionWrapper(following, models.DateTimeField()),
+        ).filter(
+            Q(end_time__gt=start) & Q(start_time__lt=end)
+            | Q(repeat_every__isnull=False, start_time__lt=start)
+            & (
+                Q(previous_end__gt=start)
+                & (
+                    Q(repeat_until__isnull=True)
+                    | Q(repeat_until__gt=F("previous_start"))
+                )
+                | Q(following_start__lt=end)
+                & (
+                    Q(repeat_until__isnull=True)
+                    | Q(repeat_until__gt=F("following_start"))
+                )
             )
+        )
+
+
+class FieldBlackout(models.Model):
+    """
+    An interval during which a field cannot be booked, e.g. for maintenance.
+    A recurring blackout repeats every repeat_every from its first occurrence
+    [start_time, end_time), with no occurrence starting at or after
+    repeat_until.
+    """
+
+    field = models.ForeignKey(
+        FootballField, on_delete=models.CASCADE, related_name="blackouts"
+    )
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    repeat_every = models.DurationField(null=True, blank=True)
+    repeat_until = models.DateTimeField(null=True, blank=True)
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FieldBlackoutQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["field", "start_time", "end_time"],
+                name="blackout_field_start_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.field.name} closed from {self.start_time} to {self.end_time}"
+
+    def clean(self):
+        check_blackout_times(
+            self.start_time, self.end_time, self.repeat_every, self.repeat_until
+        )
 
-        # Ensure booking times are within the field's working hours
-        field_opening_datetime = timezone.make_aware(
-            datetime.combine(self.start_time.date(), self.field.opening_time)
+    def overlaps(self, start, end):
+        """Whether an occurrence overlaps [start, end), as in overlapping()."""
+        if self.end_time > start and self.start_time < end:
+            return True
+        if self.repeat_every is None or self.start_time >= start:
+            return False
+        duration = self.end_time - self.start_time
+        previous = self.start_time + (
+            (start - self.start_time) // self.repeat_every * self.repeat_every
         )
-        field_closing_datetime = timezone.make_aware(
-            datetime.combine(self.start_time.date(), self.field.closing_time)
+        return any(
+            occurrence < end
+            and occurrence + duration > start
+            and (self.repeat_until is None or occurrence < self.repeat_until)
+            for occurrence in (previous, previous + self.repeat_every)
         )
 
-        if not (
-            field_opening_datetime <= self.start_time < field_closing_datetime
-        ) or not (field_opening_datetime < self.end_time <= field_closing_datetime):
-            raise ValidationError(
-                "Booking times must be within the field's working hours."
-            )
+    def occurrences(self, start, end):
+        """The (start, end) occurrences overlapping [start, end), in order."""
+        if self.repeat_every is None:
+            if self.overlaps(start, end):
+                return [(self.start_time, self.end_time)]
+            return []
+        duration = self.end_time - self.start_time
+        occurrence = self.start_time
+        if occurrence < start:
+            # The last occurrence starting at or before start, as in overlaps()
+            occurrence += (start - occurrence) // self.repeat_every * self.repeat_every
+        found = []
+        while occurrence < end and (
+            self.repeat_until is None or occurrence < self.repeat_until
+        ):
+            if occurrence + duration > start:
+                found.append((occurrence, occurrence + duration))
+            occurrence += self.repeat_every
+        return found
 
-        # Check for overlapping bookings
-        overlapping_bookings = Booking.objects.filter(
-            field=self.field, start_time__lt=self.end_time, end_time__gt=self.start_time
-        ).exclude(pk=self.pk)
 
-        if overlapping_bookings.exists():
-            raise ValidationError("This field is already booked for the given time.")
+def check_blackout_times(start_time, end_time, repeat_every, repeat_until):
+    if end_time <= start_time:
+        raise ValidationError("End time must be after start time.", code="order")
+    if repeat_every is not None and repeat_every < end_time - start_time:
+        raise ValidationError(
+            "A blackout cannot repeat more often than it lasts.", code="repeat"
+        )
+    if repeat_until is not None and repeat_until <= start_time:
+        raise ValidationError(
+            "Repeat until must be after the start time.", code="repeat"
+        )
 
-    def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+
+def check_blackouts(field, start_time, end_time):
+    blackouts = FieldBlackout.objects.filter(field=field)
+    if blackouts.overlapping(start_time, end_time).exists():
+        raise ValidationError(BLACKOUT_MESSAGE, code="blackout")
+
+
+def check_booking_times(field, start_time, end_time):
+    """
+    Validate a booking's times against the field's rules, short of checking
+    for overlapping bookings. Raises ValidationError with a code per rule.
+    """
+    if start_time <= timezone.now():
+        raise ValidationError("Start time must be in the future.", code="past")
+
+    if end_time <= start_time:
+        raise ValidationError("End time must be after start time.", code="order")
+
+    booking_duration = end_time - start_time
+
+    # Check that booking duration is at least the minimum booking duration
+    if booking_duration < field.min_booking_duration:
+        min_duration_minutes = int(field.min_booking_duration.total_seconds() // 60)
+        raise ValidationError(
+            f"Booking duration must be at least {min_duration_minutes} minutes.",
+            code="duration",
+        )
+
+    # Check that booking duration is a multiple of min_booking_duration
+    booking_duration_seconds = int(booking_duration.total_seconds())
+    min_duration_seconds = int(field.min_booking_duration.total_seconds())
+
+    if booking_duration_seconds % min_duration_seconds != 0:
+        min_duration_minutes = int(min_duration_seconds // 60)
+        raise ValidationError(
+            f"Booking duration must be a multiple of the minimum booking duration ({min_duration_minutes} minutes).",
+            code="duration",
+        )
+
+    # Ensure booking times are within the field's working hours
+    if not is_open(field, start_time, end_time):
+        raise ValidationError(
+            "Booking times must be within the field's working hours.",
+            code="working_hours",
+        )
+
+
+class Tombstone(models.Model):
+    """
+    A deleted row of a model the delta sync serves, kept so that clients
+    that synced before the delete learn about it. See fields.sync.
+    """
+
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["deleted_at"], name="tombstone_deleted_idx")]
+
+    def __str__(self):
+        return f"Deleted {self.model} {self.object_id}"
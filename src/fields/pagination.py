@@ -0,0 +1,40 @@
+from config.pagination import KeysetCursorPagination
+
+# Values of ?ordering= and the keyset ordering each one maps to. Every
+# ordering ends with id and has a matching composite index.
+FIELD_ORDERINGS = {
+    "price": ("hourly_rate", "id"),
+    "-price": ("-hourly_rate", "-id"),
+    "created_at": ("created_at", "id"),
+    "-created_at": ("-created_at", "-id"),
+    "distance": ("distance", "id"),
+    "soonest": ("next_available_start", "id"),
+}
+
+
+class FootballFieldCursorPagination(KeysetCursorPagination):
+    ordering = ("-created_at", "-id")
+    ordering_param = "ordering"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.get_ordering(request, queryset, view)[0] == "next_available_start":
+            # Keyset comparisons cannot step over NULLs, and a field without
+            # a free slot within the horizon is not available soon anyway
+            queryset = queryset.filter(next_available_start__isnull=False)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        annotations = queryset.query.annotations
+        requested = FIELD_ORDERINGS.get(request.query_params.get(self.ordering_param))
+        if requested and (requested[0] != "distance" or "distance" in annotations):
+            return requested
+        # Text searches are ranked by relevance, proximity searches by distance
+        if "rank" in annotations:
+            return ("-rank", "id")
+        if "distance" in annotations:
+            return ("distance", "id")
+        return super().get_ordering(request, queryset, view)
+
+
+class BookingCursorPagination(KeysetCursorPagination):
+    ordering = ("start_time", "id")
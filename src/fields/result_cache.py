@@ -0,0 +1,342 @@
+import hashlib
+import logging
+import math
+import random
+import time
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+from urllib.parse import urlencode
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from django.utils import dateparse, timezone
+from rest_framework.response import Response
+
+from .geo import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "available_fields"
+# Above this many days a window touches, results are not cached
+MAX_CACHED_DAYS = 31
+# Larger values recompute earlier before an entry expires
+EARLY_EXPIRY_BETA = 1.0
+# On a miss one reader recomputes an entry while the others wait for it, for
+# at most WAIT_SECONDS, after which they compute it themselves
+RECOMPUTE_LOCK_SECONDS = 10
+WAIT_SECONDS = 2.0
+WAIT_INTERVAL_SECONDS = 0.05
+# Proximity searches cache at most this many candidate fields
+MAX_CACHED_CANDIDATES = 2000
+OUTCOMES = ["hit", "miss", "early"]
+
+
+def _parse_datetime(value):
+    try:
+        moment = dateparse.parse_datetime(value)
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.get_current_timezone())
+    return moment
+
+
+def _normalize_number(value):
+    try:
+        return str(float(value))
+    except ValueError:
+        return value
+
+
+def _normalize_time(value):
+    moment = _parse_datetime(value)
+    if moment is None:
+        return value
+    return moment.astimezone(dt_timezone.utc).isoformat()
+
+
+PROXIMITY_PARAMS = {"latitude", "longitude", "radius_km"}
+# Parameters that only shape the page of results, not which fields match
+PAGE_PARAMS = {"ordering", "cursor", "page_size", "facets"}
+
+NORMALIZERS = {
+    "latitude": _normalize_number,
+    "longitude": _normalize_number,
+    "radius_km": _normalize_number,
+    "start_time": _normalize_time,
+    "end_time": _normalize_time,
+}
+
+
+def normalize_query(params):
+    """
+    Rewrite search parameters so that queries the view reads the same way
+    become the same one: parameters sorted, only the value the view reads
+    kept, blanks dropped, numbers in one notation and times in UTC. Values
+    are never rounded, so a cache entry always holds the exact results of
+    every query sharing it.
+    """
+    pairs = []
+    for name in sorted(params):
+        # The view and its filters read the last value of each parameter
+        value = params.get(name)
+        if value:
+            pairs.append((name, NORMALIZERS.get(name, str)(value)))
+    return QueryDict(urlencode(pairs))
+
+
+def _generation_key(scope):
+    return f"{KEY_PREFIX}:generation:{scope}"
+
+
+def _query_scopes(params):
+    """
+    The generations a query's results depend on: the fields it can list,
+    which is one district when it filters on one, and the days its time
+    window touches. Returns None when the query should not be cached.
+    """
+    district_id = params.get("district_id", "")
+    scopes = [f"district:{district_id}" if district_id.isdigit() else "fields"]
+
+    start = _parse_datetime(params.get("start_time", ""))
+    end = _parse_datetime(params.get("end_time", ""))
+    if start is not None and end is not None and start < end:
+        day = timezone.localdate(start)
+        last_day = timezone.localdate(end - timedelta(microseconds=1))
+        if (last_day - day).days >= MAX_CACHED_DAYS:
+            return None
+        while day <= last_day:
+            scopes.append(f"day:{day.isoformat()}")
+            day += timedelta(days=1)
+    return scopes
+
+
+def result_cache_key(params):
+    scopes = _query_scopes(params)
+    if scopes is None:
+        return None
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Start from the clock, so that a generation that was evicted
+            # never comes back with a value older entries were stored under
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    digest = hashlib.sha1(
+        "|".join(
+            [params.urlencode(), *(str(generations[key]) for key in keys)]
+        ).encode()
+    ).hexdigest()
+    return f"{KEY_PREFIX}:result:{digest}"
+
+
+def candidates_key(params, latitude, longitude, radius_km):
+    """
+    Return (key, search area) for the fields a proximity query matches
+    before its distance is applied, or (None, None) when they are not
+    cached.
+
+    The area is the query's radius widened around its location rounded to
+    AVAILABLE_FIELDS_CACHE_COORDINATE_DECIMALS, so its fields include those
+    of every query whose location rounds the same way, and queries metres
+    apart share them. Without a radius the distance filters nothing and the
+    location is left out. Either way the exact distance and radius are
+    applied to the candidates afterwards.
+    """
+    decimals = settings.AVAILABLE_FIELDS_CACHE_COORDINATE_DECIMALS
+    pairs = [
+        (name, value)
+        for name, value in params.items()
+        if name not in PROXIMITY_PARAMS | PAGE_PARAMS
+    ]
+    if radius_km is None:
+        area = (latitude, longitude, None)
+    else:
+        # Both points lie within half a step of the rounded location on each
+        # axis, so they are at most one step of latitude apart
+        slack_km = EARTH_RADIUS_KM * math.radians(10**-decimals)
+        area = (
+            round(latitude, decimals),
+            round(longitude, decimals),
+            radius_km + slack_km,
+        )
+        pairs += [
+            ("latitude", _normalize_number(area[0])),
+            ("longitude", _normalize_number(area[1])),
+            ("radius_km", _normalize_number(radius_km)),
+        ]
+    key = result_cache_key(QueryDict(urlencode(sorted(pairs + [("candidates", 1)]))))
+    if key is None:
+        return None, None
+    return key, area
+
+
+def _bump(scopes):
+    try:
+        for scope in scopes:
+            key = _generation_key(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, time.time_ns(), None)
+    except redis.RedisError:
+        # Writes run this after committing, so it must not fail them. The
+        # stale entries expire after AVAILABLE_FIELDS_CACHE_TIMEOUT
+        logger.exception("Could not invalidate cached available fields")
+
+
+def invalidate_fields(district_ids):
+    """After fields of these districts changed, e.g. price or location."""
+    _bump(["fields", *(f"district:{pk}" for pk in set(district_ids) if pk)])
+
+
+def invalidate_days(days):
+    """After bookings on these days changed."""
+    _bump([f"day:{day.isoformat()}" for day in set(days)])
+
+
+def record(outcome):
+    key = f"{KEY_PREFIX}:stats:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_stats():
+    keys = {outcome: f"{KEY_PREFIX}:stats:{outcome}" for outcome in OUTCOMES}
+    values = cache.get_many(keys.values())
+    return {outcome: values.get(key, 0) for outcome, key in keys.items()}
+
+
+def reset_stats():
+    cache.delete_many([f"{KEY_PREFIX}:stats:{outcome}" for outcome in OUTCOMES])
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL_SECONDS)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def fetch(key, compute, timeout):
+    """
+    Return (value, outcome) for a cache key, computing and storing the value
+    on a miss.
+
+    Entries are recomputed shortly before they expire, with a probability
+    that grows as expiry nears and with how long the value took to compute
+    (probabilistic early expiry). One of many concurrent readers of a hot
+    entry recomputes it while the others keep being served, instead of all
+    of them missing at the same moment.
+
+    Writes miss every reader at once by bumping a generation, so on a miss
+    only the reader that takes the recompute lock computes the value, and
+    the others wait for it.
+    """
+    entry = cache.get(key)
+    outcome = "miss"
+    lock_key = None
+    if entry is not None:
+        value, compute_time, expires_at = entry
+        early = compute_time * EARLY_EXPIRY_BETA * -math.log(1.0 - random.random())
+        if time.time() + early < expires_at:
+            record("hit")
+            return value, "hit"
+        outcome = "early"
+    elif cache.add(f"{key}:lock", 1, RECOMPUTE_LOCK_SECONDS):
+        lock_key = f"{key}:lock"
+    else:
+        entry = _wait_for(key)
+        if entry is not None:
+            record("hit")
+            return entry[0], "hit"
+
+    record(outcome)
+    try:
+        started = time.monotonic()
+        value = compute()
+        compute_time = time.monotonic() - started
+        cache.set(key, (value, compute_time, time.time() + timeout), timeout)
+    finally:
+        if lock_key is not None:
+            cache.delete(lock_key)
+    return value, outcome
+
+
+class CachedListMixin:
+    """
+    Caches list responses in Redis per normalised query, see normalize_query.
+    The response has an X-Cache header telling whether it came from the cache.
+    Entries are keyed on generations that writes bump, see invalidate_fields
+    and invalidate_days, so they go stale only where the data changed.
+
+    Proximity searches also cache their candidates, see candidates_key: the
+    view's get_queryset calls cached_candidate_ids and filters on the ids
+    returned, and builds the candidates itself within candidate_area.
+    """
+
+    # The search area get_queryset uses while computing candidates
+    candidate_area = None
+
+    def cached_candidate_ids(self, latitude, longitude, radius_km):
+        """
+        The ids of the fields matching every filter of the request but the
+        distance, or None when they are not cached.
+        """
+        params = normalize_query(self.request.query_params)
+
+        def compute():
+            self.candidate_area = area
+            try:
+                queryset = self.filter_queryset(self.get_queryset())
+                ids = list(
+                    queryset.values_list("pk", flat=True)[: MAX_CACHED_CANDIDATES + 1]
+                )
+            finally:
+                self.candidate_area = None
+            # Too many to be worth caching; the view runs the exact query
+            return ids if len(ids) <= MAX_CACHED_CANDIDATES else None
+
+        try:
+            key, area = candidates_key(params, latitude, longitude, radius_km)
+            if key is None:
+                return None
+            ids, _ = fetch(key, compute, settings.AVAILABLE_FIELDS_CACHE_TIMEOUT)
+        except redis.RedisError:
+            logger.exception("Could not use the available fields cache")
+            return None
+        return ids
+
+    def list(self, request, *args, **kwargs):
+        try:
+            key = result_cache_key(normalize_query(request.query_params))
+        except redis.RedisError:
+            logger.exception("Could not use the available fields cache")
+            key = None
+        if key is None:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            data, outcome = fetch(
+                key,
+                lambda: super(CachedListMixin, self)
+                .list(request, *args, **kwargs)
+                .data,
+                settings.AVAILABLE_FIELDS_CACHE_TIMEOUT,
+            )
+        except redis.RedisError:
+            # Without the cache the results are computed for every request
+            logger.exception("Could not use the available fields cache")
+            return super().list(request, *args, **kwargs)
+        response = Response(data)
+        response["X-Cache"] = "HIT" if outcome == "hit" else "MISS"
+        return response
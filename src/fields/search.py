@@ -0,0 +1,101 @@
+import re
+import unicodedata
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db.models import F
+
+# Uzbek Cyrillic to the official Latin alphabet
+CYRILLIC_TO_LATIN = {
+    "а": "a",
+    "б": "b",
+    "в": "v",
+    "г": "g",
+    "д": "d",
+    "е": "e",
+    "ё": "yo",
+    "ж": "j",
+    "з": "z",
+    "и": "i",
+    "й": "y",
+    "к": "k",
+    "л": "l",
+    "м": "m",
+    "н": "n",
+    "о": "o",
+    "п": "p",
+    "р": "r",
+    "с": "s",
+    "т": "t",
+    "у": "u",
+    "ф": "f",
+    "х": "x",
+    "ц": "ts",
+    "ч": "ch",
+    "ш": "sh",
+    "щ": "sh",
+    "ъ": "",
+    "ы": "i",
+    "ь": "",
+    "э": "e",
+    "ю": "yu",
+    "я": "ya",
+    "ў": "o",
+    "қ": "q",
+    "ғ": "g",
+    "ҳ": "h",
+}
+
+APOSTROPHES = re.compile(r"['`´‘’ʻʼ]")
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+# Spellings people use interchangeably for the same sound
+PHONETIC_FOLDS = [("kh", "h"), ("x", "h")]
+
+SEARCH_CONFIG = "simple"
+
+
+def normalize_search_text(text):
+    """
+    Fold text to lowercase ASCII Uzbek Latin so that Cyrillic and Latin
+    spellings of the same name compare equal: "Ўзбекистон", "O‘zbekiston"
+    and "Ozbekiston" all become "ozbekiston", and "Пахтакор", "Paxtakor"
+    and "Pakhtakor" all become "pahtakor".
+    """
+    text = "".join(CYRILLIC_TO_LATIN.get(char, char) for char in text.lower())
+    text = APOSTROPHES.sub("", text)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    for spelling, folded in PHONETIC_FOLDS:
+        text = text.replace(spelling, folded)
+    return NON_ALPHANUMERIC.sub(" ", text).strip()
+
+
+def search_fields(queryset, query):
+    """
+    Filter the queryset to fields matching `query` on the normalised search
+    document and annotate each with a relevance `rank`.
+
+    Every query word is first matched as a word prefix through the
+    full-text index. Only when that finds nothing does the search fall back
+    to typo-tolerant trigram word similarity, which is much more expensive
+    to rank.
+    """
+    text = normalize_search_text(query)
+    if not text:
+        return queryset.none()
+
+    ts_query = SearchQuery(
+        " & ".join(f"{word}:*" for word in text.split()),
+        config=SEARCH_CONFIG,
+        search_type="raw",
+    )
+    matches = queryset.filter(search_vector=ts_query)
+    if matches.exists():
+        return matches.annotate(rank=SearchRank(F("search_vector"), ts_query))
+
+    return queryset.filter(search_document__trigram_word_similar=text).annotate(
+        rank=TrigramWordSimilarity(text, "search_document")
+    )
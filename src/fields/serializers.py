@@ -1,12 +1,28 @@
-from datetime import datetime
+from decimal import Decimal
 
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
+from location.boundaries import resolve_district_id
 from location.models import District
 from location.serializers import DistrictSerializer
 
-from .models import Booking, FieldImage, FootballField
+from . import holds
+from .availability import SERIES_FREQUENCIES, series_occurrences
+from .bulk import BULK_UPDATE_FIELDS
+from .hours import check_hours_order, check_slot_time, check_weekly_hours
+from .models import (
+    Booking,
+    FieldBlackout,
+    FieldImage,
+    FootballField,
+    check_blackout_times,
+    check_blackouts,
+    check_booking_times,
+)
 
 
 class FieldImageSerializer(serializers.ModelSerializer):
@@ -20,7 +36,12 @@ class FootballFieldSerializer(serializers.ModelSerializer):
     owner = serializers.CharField(source="owner.phone_number", read_only=True)
     district = DistrictSerializer(read_only=True)
     district_id = serializers.PrimaryKeyRelatedField(
-        queryset=District.objects.all(), source="district", write_only=True
+        queryset=District.objects.all(),
+        source="district",
+        write_only=True,
+        required=False,
+        help_text="Required outside every district boundary. Inside one, it "
+        "may be left out and must otherwise be that district.",
     )
 
     class Meta:
@@ -37,13 +58,59 @@ class FootballFieldSerializer(serializers.ModelSerializer):
             "description",
             "opening_time",
             "closing_time",
+            "weekly_hours",
             "min_booking_duration",
             "latitude",
             "longitude",
             "images",
+            "next_available_start",
             "created_at",
         ]
-        read_only_fields = ["owner", "created_at"]
+        read_only_fields = ["owner", "next_available_start", "created_at"]
+
+    def validate(self, attrs):
+        # The district is taken from the boundary containing the location
+        # when there is one; district_id is only used outside every boundary
+        if self.instance is None or {"latitude", "longitude", "district"} & set(attrs):
+            latitude = attrs.get("latitude", getattr(self.instance, "latitude", None))
+            longitude = attrs.get(
+                "longitude", getattr(self.instance, "longitude", None)
+            )
+            district_id = resolve_district_id(latitude, longitude)
+            if district_id is not None:
+                if "district" in attrs and attrs["district"].pk != district_id:
+                    raise serializers.ValidationError(
+                        {
+                            "district_id": "The location lies in district "
+                            f"{district_id}, not {attrs['district'].pk}."
+                        }
+                    )
+                attrs["district"] = District.objects.get(pk=district_id)
+
+        if self.instance is None and "district" not in attrs:
+            raise serializers.ValidationError(
+                {"district_id": "The location is outside every known district."}
+            )
+
+        try:
+            # Only the hours being written must lie on the slot grid, so
+            # fields saved before it existed can still be edited
+            for name in ("opening_time", "closing_time"):
+                if name in attrs:
+                    check_slot_time(attrs[name])
+            if "opening_time" in attrs or "closing_time" in attrs:
+                check_hours_order(
+                    attrs.get(
+                        "opening_time", getattr(self.instance, "opening_time", None)
+                    ),
+                    attrs.get(
+                        "closing_time", getattr(self.instance, "closing_time", None)
+                    ),
+                )
+            check_weekly_hours(attrs.get("weekly_hours", {}))
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return attrs
 
     def create(self, validated_data):
         images_data = self.context["request"].FILES.getlist("images")
@@ -69,6 +136,121 @@ class FootballFieldSerializer(serializers.ModelSerializer):
         return instance
 
 
+class FieldImageSyncSerializer(serializers.ModelSerializer):
+    field_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = FieldImage
+        fields = ["id", "field_id", "image", "updated_at"]
+
+
+class FieldSyncSerializer(serializers.ModelSerializer):
+    """
+    A field as the delta sync serves it: flat, with its district and images
+    synced separately. next_available_start moves with the clock, so it is
+    left out rather than making every field change every few minutes.
+    """
+
+    district_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = FootballField
+        fields = [
+            "id",
+            "name",
+            "address",
+            "district_id",
+            "contact",
+            "hourly_rate",
+            "description",
+            "opening_time",
+            "closing_time",
+            "weekly_hours",
+            "min_booking_duration",
+            "latitude",
+            "longitude",
+            "created_at",
+            "updated_at",
+        ]
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    updated_since = serializers.DateTimeField(required=False)
+    page = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.SYNC_PAGE_SIZE, required=False
+    )
+
+
+class FieldBlackoutSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FieldBlackout
+        fields = [
+            "id",
+            "field",
+            "start_time",
+            "end_time",
+            "repeat_every",
+            "repeat_until",
+            "reason",
+            "created_at",
+        ]
+        read_only_fields = ["field", "created_at"]
+
+    def validate(self, data):
+        try:
+            check_blackout_times(
+                data["start_time"],
+                data["end_time"],
+                data.get("repeat_every"),
+                data.get("repeat_until"),
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return data
+
+
+class FieldBulkUpdateSerializer(serializers.Serializer):
+    field_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.MAX_BULK_FIELDS,
+    )
+    hourly_rate = serializers.DecimalField(
+        max_digits=8, decimal_places=2, min_value=Decimal("0"), required=False
+    )
+    opening_time = serializers.TimeField(required=False)
+    closing_time = serializers.TimeField(required=False)
+    weekly_hours = serializers.JSONField(required=False)
+    blackouts = FieldBlackoutSerializer(many=True, required=False)
+
+    def validate(self, data):
+        if not data.get("blackouts") and not set(BULK_UPDATE_FIELDS) & set(data):
+            raise serializers.ValidationError("There is nothing to change.")
+        try:
+            # The order of the hours is checked on each field by the view
+            for name in ("opening_time", "closing_time"):
+                if name in data:
+                    check_slot_time(data[name])
+            check_weekly_hours(data.get("weekly_hours", {}))
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return data
+
+
+class AlternativeSlotSerializer(serializers.Serializer):
+    field_id = serializers.IntegerField()
+    field_name = serializers.CharField(required=False)
+    distance = serializers.FloatField(required=False)
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class AlternativesSerializer(serializers.Serializer):
+    same_field = AlternativeSlotSerializer(many=True)
+    nearby_fields = AlternativeSlotSerializer(many=True)
+
+
 class BookingSerializer(serializers.ModelSerializer):
     user = serializers.CharField(source="user.phone_number", read_only=True)
     field_name = serializers.CharField(source="field.name", read_only=True)
@@ -86,57 +268,229 @@ class BookingSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["user", "created_at"]
 
+    # Set by create() when the booking overlapped another, so that the view
+    # suggests free slots once the transaction has released the locks
+    conflict = False
+
     def validate(self, data):
         start_time = data["start_time"]
         end_time = data["end_time"]
         field = data["field"]
 
-        if start_time <= timezone.now():
-            raise serializers.ValidationError("Start time must be in the future.")
+        try:
+            check_booking_times(field, start_time, end_time)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        # Another user's hold settles the race for the slot in Redis, before
+        # the booking takes a lock. The user's own holds are theirs to book.
+        if holds.is_held(
+            field.id, start_time, end_time, self.context["request"].user.pk
+        ):
+            raise serializers.ValidationError(holds.HELD_MESSAGE)
+        # Blackouts are checked by Booking.clean() and overlaps by the
+        # booking_no_overlap constraint when saving, see create()
+        return data
 
-        if end_time <= start_time:
-            raise serializers.ValidationError("End time must be after start time.")
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as e:
+            self.conflict = e.code == "overlap"
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: e.messages}
+            )
 
-        booking_duration = end_time - start_time
 
-        if booking_duration < field.min_booking_duration:
-            min_duration_minutes = int(field.min_booking_duration.total_seconds() // 60)
+class BookingSeriesSerializer(serializers.Serializer):
+    field = serializers.PrimaryKeyRelatedField(queryset=FootballField.objects.all())
+    start_time = serializers.DateTimeField(help_text="Start of the first occurrence")
+    end_time = serializers.DateTimeField(help_text="End of the first occurrence")
+    frequency = serializers.ChoiceField(choices=list(SERIES_FREQUENCIES))
+    count = serializers.IntegerField(
+        min_value=1, max_value=settings.MAX_SERIES_OCCURRENCES, required=False
+    )
+    until = serializers.DateTimeField(required=False)
+    mode = serializers.ChoiceField(
+        choices=["all_or_nothing", "skip_conflicts"], default="all_or_nothing"
+    )
+
+    def validate(self, data):
+        if data["end_time"] <= data["start_time"]:
+            raise serializers.ValidationError("End time must be after start time.")
+        if ("count" in data) == ("until" in data):
+            raise serializers.ValidationError("Give either a count or an until date.")
+
+        limit = settings.MAX_SERIES_OCCURRENCES
+        occurrences = series_occurrences(
+            data["start_time"],
+            data["end_time"],
+            data["frequency"],
+            data.get("count", limit + 1),
+            data.get("until"),
+        )
+        if not occurrences:
+            raise serializers.ValidationError("Until must be after the start time.")
+        if len(occurrences) > limit:
             raise serializers.ValidationError(
-                f"Booking duration must be at least {min_duration_minutes} minutes."
+                f"A series can have at most {limit} occurrences."
             )
+        data["occurrences"] = occurrences
+        return data
 
-        booking_duration_seconds = booking_duration.total_seconds()
-        min_duration_seconds = field.min_booking_duration.total_seconds()
 
-        if booking_duration_seconds % min_duration_seconds != 0:
-            min_duration_minutes = int(min_duration_seconds // 60)
+class BookingConflictSerializer(serializers.Serializer):
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    code = serializers.CharField()
+    reason = serializers.CharField()
+
+
+class SlotHoldSerializer(serializers.Serializer):
+    id = serializers.CharField(read_only=True)
+    field = serializers.PrimaryKeyRelatedField(queryset=FootballField.objects.all())
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    expires_at = serializers.DateTimeField(read_only=True)
+
+    def validate(self, data):
+        field, start_time, end_time = (
+            data["field"],
+            data["start_time"],
+            data["end_time"],
+        )
+        try:
+            check_booking_times(field, start_time, end_time)
+            check_blackouts(field, start_time, end_time)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        if Booking.objects.filter(
+            field=field, period__overlap=(start_time, end_time)
+        ).exists():
             raise serializers.ValidationError(
-                f"Booking duration must be a multiple of the minimum booking duration ({min_duration_minutes} minutes)."
+                "This field is already booked for the given time."
             )
+        return data
 
-        # Ensure booking times are within the field's working hours
-        field_opening_datetime = timezone.make_aware(
-            datetime.combine(start_time.date(), field.opening_time)
-        )
-        field_closing_datetime = timezone.make_aware(
-            datetime.combine(start_time.date(), field.closing_time)
-        )
 
-        if not (field_opening_datetime <= start_time < field_closing_datetime) or not (
-            field_opening_datetime < end_time <= field_closing_datetime
-        ):
+class EarliestFitQuerySerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(min_value=0.1)
+    duration = serializers.DurationField()
+    window_start = serializers.DateTimeField()
+    window_end = serializers.DateTimeField()
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate(self, data):
+        if data["window_end"] <= data["window_start"]:
+            raise serializers.ValidationError("Window end must be after window start.")
+        if data["window_end"] - data["window_start"] > settings.MAX_SEARCH_WINDOW:
+            max_days = settings.MAX_SEARCH_WINDOW.days
             raise serializers.ValidationError(
-                "Booking times must be within the field's working hours."
+                f"Search window cannot be longer than {max_days} days."
             )
+        if data["duration"] <= timezone.timedelta(0):
+            raise serializers.ValidationError("Duration must be positive.")
+        data["radius_km"] = min(data["radius_km"], settings.MAX_SEARCH_RADIUS_KM)
+        return data
 
-        # Check for overlapping bookings
-        overlapping_bookings = Booking.objects.filter(
-            field=field, start_time__lt=end_time, end_time__gt=start_time
-        )
 
-        if overlapping_bookings.exists():
+class EarliestFitFieldSerializer(FootballFieldSerializer):
+    distance = serializers.FloatField(read_only=True)
+    earliest_start = serializers.DateTimeField(read_only=True)
+    earliest_end = serializers.DateTimeField(read_only=True)
+
+    class Meta(FootballFieldSerializer.Meta):
+        fields = FootballFieldSerializer.Meta.fields + [
+            "distance",
+            "earliest_start",
+            "earliest_end",
+        ]
+
+
+class SlotCalendarQuerySerializer(serializers.Serializer):
+    # "from" is a keyword, so the field is declared as from_ and renamed
+    from_ = serializers.DateTimeField(required=False)
+    to = serializers.DateTimeField(required=False)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = fields.pop("from_")
+        return fields
+
+    def validate(self, data):
+        start = max(data.get("from", timezone.now()), timezone.now())
+        end = data.get("to", start + timezone.timedelta(days=7))
+        if end <= start:
+            raise serializers.ValidationError("to must be after from.")
+        if end - start > settings.MAX_CALENDAR_WINDOW:
+            max_days = settings.MAX_CALENDAR_WINDOW.days
             raise serializers.ValidationError(
-                "This field is already booked for the given time."
+                f"The window cannot be longer than {max_days} days."
             )
+        return {"from": start, "to": end}
+
+
+class FreeSlotSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+    @staticmethod
+    def serialize_many(slots):
+        """
+        Same output as FreeSlotSerializer(slots, many=True).data for aware
+        (start, end) pairs in the current time zone, without the per-value
+        field machinery, which dominates the calendar's response time.
+        """
+        return [
+            {"start": _isoformat(start), "end": _isoformat(end)} for start, end in slots
+        ]
+
+
+def _isoformat(value):
+    # DateTimeField's ISO 8601 output, which spells UTC as Z
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+class LiveAvailabilityQuerySerializer(serializers.Serializer):
+    field_id = serializers.IntegerField(required=False)
+    district_id = serializers.IntegerField(required=False)
 
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError(
+                "Subscribe to a field_id or a district_id."
+            )
         return data
+
+
+class AvailabilityMatrixQuerySerializer(serializers.Serializer):
+    district_id = serializers.IntegerField()
+    date = serializers.DateField()
+    slot_minutes = serializers.ChoiceField(choices=[15, 30, 60], default=15)
+
+
+class AvailabilityCheckItemSerializer(serializers.Serializer):
+    field_id = serializers.IntegerField()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+
+
+class AvailabilityCheckSerializer(serializers.Serializer):
+    items = AvailabilityCheckItemSerializer(
+        many=True, allow_empty=False, max_length=settings.MAX_AVAILABILITY_CHECK_ITEMS
+    )
+
+
+class AvailabilityVerdictSerializer(AvailabilityCheckItemSerializer):
+    available = serializers.BooleanField()
+    code = serializers.CharField(allow_null=True)
+    reason = serializers.CharField(allow_null=True)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=10)
@@ -0,0 +1,145 @@
+import logging
+from bisect import bisect_right
+from functools import partial
+
+import redis
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import holds, live, result_cache, slot_index
+from .availability import refresh_next_available
+from .locks import lock_field_days
+from .models import (
+    BLACKOUT_MESSAGE,
+    EXCLUSION_VIOLATION,
+    Booking,
+    FieldBlackout,
+    check_booking_times,
+)
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_MESSAGE = "This field is already booked for the given time."
+
+
+def _conflict(occurrence, code, reason):
+    return {
+        "start_time": occurrence[0],
+        "end_time": occurrence[1],
+        "code": code,
+        "reason": reason,
+    }
+
+
+def _check_rules(field, user_id, occurrences):
+    """
+    The conflict of each occurrence with the booking rules, blackouts and
+    other users' holds, or None. One blackouts query and one holds read for
+    the whole series.
+    """
+    first_start, last_end = occurrences[0][0], occurrences[-1][1]
+    blackouts = list(
+        FieldBlackout.objects.filter(field=field).overlapping(first_start, last_end)
+    )
+    held = holds.held_spans(field.id, occurrences, user_id)
+
+    conflicts = []
+    for occurrence, is_held in zip(occurrences, held):
+        try:
+            check_booking_times(field, *occurrence)
+        except ValidationError as e:
+            conflicts.append(_conflict(occurrence, e.code, e.messages[0]))
+            continue
+        if any(blackout.overlaps(*occurrence) for blackout in blackouts):
+            conflicts.append(_conflict(occurrence, "blackout", BLACKOUT_MESSAGE))
+        elif is_held:
+            conflicts.append(_conflict(occurrence, "held", holds.HELD_MESSAGE))
+        else:
+            conflicts.append(None)
+    return conflicts
+
+
+def _find_overlaps(field, occurrences, conflicts):
+    """
+    Mark the occurrences that overlap a booking, from one range query over
+    the whole series. Bookings of a field do not overlap each other, so
+    sorted by start their ends are sorted too, and a bisection finds the
+    only booking that can overlap each occurrence.
+    """
+    busy = list(
+        Booking.objects.filter(
+            field=field, period__overlap=(occurrences[0][0], occurrences[-1][1])
+        )
+        .order_by("start_time")
+        .values_list("start_time", "end_time")
+    )
+    ends = [end for _, end in busy]
+    for i, (start, end) in enumerate(occurrences):
+        if conflicts[i] is not None:
+            continue
+        j = bisect_right(ends, start)
+        if j < len(busy) and busy[j][0] < end:
+            conflicts[i] = _conflict(occurrences[i], "overlap", OVERLAP_MESSAGE)
+
+
+def create_series(field, user, occurrences, skip_conflicts):
+    """
+    Book every occurrence for the user with one bulk_create in one
+    transaction. Returns (bookings, conflicts), conflicts listing the
+    occurrences that could not be booked and why. With skip_conflicts the
+    others are booked anyway, otherwise a single conflict books nothing.
+
+    The series takes the (field, day) locks of all its days, in the same
+    order as single bookings, and checks for overlaps under them.
+    bulk_create() sends no signals, so what the booking signals do is done
+    here once the transaction commits.
+    """
+    conflicts = _check_rules(field, user.pk, occurrences)
+    with transaction.atomic():
+        lock_field_days([(field.id, start, end) for start, end in occurrences])
+        _find_overlaps(field, occurrences, conflicts)
+
+        free = [
+            occurrence
+            for occurrence, conflict in zip(occurrences, conflicts)
+            if conflict is None
+        ]
+        conflicts = [conflict for conflict in conflicts if conflict is not None]
+        if not free or (conflicts and not skip_conflicts):
+            return [], conflicts
+
+        try:
+            # A savepoint, as in Booking.save()
+            with transaction.atomic():
+                bookings = Booking.objects.bulk_create(
+                    [
+                        Booking(field=field, user=user, start_time=start, end_time=end)
+                        for start, end in free
+                    ]
+                )
+        except IntegrityError as e:
+            # Only bookings made without the locks, e.g. in the admin, get here
+            if getattr(e.__cause__, "pgcode", None) != EXCLUSION_VIOLATION:
+                raise
+            raise ValidationError(OVERLAP_MESSAGE, code="overlap")
+
+        days = sorted({timezone.localdate(start) for start, _ in free})
+        transaction.on_commit(partial(result_cache.invalidate_days, days))
+        transaction.on_commit(partial(refresh_next_available, [field.id]))
+        transaction.on_commit(partial(_refresh_slot_index, field.id, days))
+        for start, end in free:
+            delta = live.booking_delta("booked", field, start, end)
+            transaction.on_commit(partial(live.publish_delta, delta))
+            transaction.on_commit(
+                partial(holds.release_user_holds, field.id, user.pk, start, end)
+            )
+    return bookings, conflicts
+
+
+def _refresh_slot_index(field_id, days):
+    try:
+        slot_index.refresh_field_days(field_id, days)
+    except redis.RedisError:
+        # The index is rebuilt by the rebuild_slot_index command
+        logger.exception("Could not update the slot index")
@@ -0,0 +1,194 @@
+import logging
+from functools import partial
+
+import redis
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from location.models import City, District, Region
+
+from . import autocomplete, live, result_cache, slot_index, sync
+from .availability import refresh_next_available
+from .models import Booking, FieldBlackout, FieldImage, FootballField
+from .tiles import invalidate_tiles
+
+logger = logging.getLogger(__name__)
+
+
+HOURS_FIELDS = ["opening_time", "closing_time", "weekly_hours", "min_booking_duration"]
+
+
+@receiver(pre_save, sender=FootballField)
+def remember_previous_values(sender, instance, **kwargs):
+    instance._previous_coordinates = None
+    instance._previous_hours = None
+    instance._previous_district_id = None
+    previous = None
+    if instance.pk:
+        previous = (
+            FootballField.objects.filter(pk=instance.pk)
+            .values_list("latitude", "longitude", "district_id", *HOURS_FIELDS)
+            .first()
+        )
+    if previous:
+        instance._previous_coordinates = previous[:2]
+        instance._previous_district_id = previous[2]
+        instance._previous_hours = previous[3:]
+
+
+@receiver(post_save, sender=FootballField)
+def invalidate_field_tiles_on_save(sender, instance, **kwargs):
+    coordinates = [(instance.latitude, instance.longitude)]
+    if getattr(instance, "_previous_coordinates", None):
+        coordinates.append(instance._previous_coordinates)
+    transaction.on_commit(partial(invalidate_tiles, coordinates))
+
+
+@receiver(post_delete, sender=FootballField)
+def invalidate_field_tiles_on_delete(sender, instance, **kwargs):
+    coordinates = [(instance.latitude, instance.longitude)]
+    transaction.on_commit(partial(invalidate_tiles, coordinates))
+
+
+@receiver(post_save, sender=FootballField)
+def refresh_availability_on_hours_change(sender, instance, created, **kwargs):
+    hours = tuple(getattr(instance, name) for name in HOURS_FIELDS)
+    if created or hours != getattr(instance, "_previous_hours", None):
+        transaction.on_commit(partial(refresh_next_available, [instance.pk]))
+    if not created and hours != getattr(instance, "_previous_hours", None):
+        # The slot grid moved, so every indexed day of the field is stale
+        transaction.on_commit(
+            partial(_update_slot_index, slot_index.refresh_field, instance.pk)
+        )
+
+
+@receiver(post_save, sender=FootballField)
+@receiver(post_delete, sender=FootballField)
+def invalidate_available_fields_on_field_change(sender, instance, **kwargs):
+    district_ids = [instance.district_id]
+    if getattr(instance, "_previous_district_id", None):
+        district_ids.append(instance._previous_district_id)
+    transaction.on_commit(partial(result_cache.invalidate_fields, district_ids))
+
+
+@receiver(post_save, sender=FieldBlackout)
+@receiver(post_delete, sender=FieldBlackout)
+def refresh_availability_on_blackout_change(sender, instance, **kwargs):
+    # Recurring blackouts span many days, so the whole district goes stale
+    district_ids = [instance.field.district_id]
+    transaction.on_commit(partial(result_cache.invalidate_fields, district_ids))
+    transaction.on_commit(partial(refresh_next_available, [instance.field_id]))
+
+
+@receiver(post_save, sender=District)
+def invalidate_available_fields_on_district_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(result_cache.invalidate_fields, [instance.pk]))
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def refresh_availability_on_booking_change(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(result_cache.invalidate_days, [timezone.localdate(instance.start_time)])
+    )
+    transaction.on_commit(partial(refresh_next_available, [instance.field_id]))
+    transaction.on_commit(
+        partial(
+            _update_slot_index,
+            slot_index.refresh_field_days,
+            instance.field_id,
+            [timezone.localdate(instance.start_time)],
+        )
+    )
+
+
+@receiver(post_save, sender=Booking)
+def publish_booked_slots(sender, instance, created, **kwargs):
+    if created:
+        delta = live.booking_delta(
+            "booked", instance.field, instance.start_time, instance.end_time
+        )
+        transaction.on_commit(partial(live.publish_delta, delta))
+
+
+@receiver(post_delete, sender=Booking)
+def publish_released_slots(sender, instance, **kwargs):
+    delta = live.booking_delta(
+        "released", instance.field, instance.start_time, instance.end_time
+    )
+    transaction.on_commit(partial(live.publish_delta, delta))
+
+
+def _update_slot_index(func, *args):
+    try:
+        func(*args)
+    except redis.RedisError:
+        # The index is rebuilt by the rebuild_slot_index command
+        logger.exception("Could not update the slot index")
+
+
+def refresh_search_documents(queryset):
+    fields = list(queryset.select_related("district__city"))
+    for field in fields:
+        field.search_document = field.build_search_document()
+    FootballField.objects.bulk_update(fields, ["search_document"], batch_size=1000)
+
+
+@receiver(post_save, sender=District)
+def refresh_district_search_documents(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(FootballField.objects.filter(district=instance))
+
+
+@receiver(post_save, sender=City)
+def refresh_city_search_documents(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(FootballField.objects.filter(district__city=instance))
+
+
+def _update_autocomplete(func, *args):
+    try:
+        func(*args)
+    except redis.RedisError:
+        # The index is rebuilt by the rebuild_autocomplete command
+        logger.exception("Could not update the autocomplete index")
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=District)
+@receiver(post_save, sender=FootballField)
+def index_autocomplete_entry(sender, instance, **kwargs):
+    kind = autocomplete.KINDS[sender]
+    transaction.on_commit(
+        partial(
+            _update_autocomplete,
+            autocomplete.index_entry,
+            kind,
+            instance.pk,
+            instance.name,
+        )
+    )
+
+
+@receiver(post_delete, sender=Region)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=District)
+@receiver(post_delete, sender=FootballField)
+def remove_autocomplete_entry(sender, instance, **kwargs):
+    kind = autocomplete.KINDS[sender]
+    transaction.on_commit(
+        partial(_update_autocomplete, autocomplete.remove_entry, kind, instance.pk)
+    )
+
+
+@receiver(post_delete, sender=Region)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=District)
+@receiver(post_delete, sender=FootballField)
+@receiver(post_delete, sender=FieldImage)
+def record_sync_tombstone(sender, instance, **kwargs):
+    # In the deleting transaction, so the tombstone commits with the delete
+    sync.record_tombstone(instance)
@@ -0,0 +1,389 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+from .availability import GRID_FIELDS, working_hours
+from .models import Booking, FootballField
+
+logger = logging.getLogger(__name__)
+
+redis_instance = redis.StrictRedis(
+    host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+)
+
+KEY_PREFIX = "slots"
+# "version last_day" of the index in use, which covers today to last_day and
+# whose keys are namespaced by version. Without it the index is not used.
+CURRENT_KEY = f"{KEY_PREFIX}:current"
+# "version last_day" of the index rebuild_index() is writing. Refreshes
+# update it as well as the one in use, and it replaces that one when done.
+BUILDING_KEY = f"{KEY_PREFIX}:building"
+# Seconds a refresh may hold its field's lock
+LOCK_TIMEOUT = 30
+# BITFIELD reads at most 63 unsigned bits at a time
+MAX_BITFIELD_BITS = 63
+# Above this many busy fields, excluding their ids costs more than the
+# database checking the bookings of each field itself
+MAX_EXCLUDED_FIELDS = 1000
+
+
+def day_key(version, field_id, day):
+    """Bitmap of the booked slots of one field on one day."""
+    return f"{KEY_PREFIX}:{version}:{day.isoformat()}:{field_id}"
+
+
+def day_grids_key(version, day):
+    """
+    Hash of the fields that have a bitmap for the day to their booking grid
+    that day, "opening closing step" in seconds, so that the bitmaps are
+    read without loading the fields.
+    """
+    return f"{KEY_PREFIX}:{version}:{day.isoformat()}:grids"
+
+
+def off_grid_key(version, day):
+    """Set of the ids of the fields with a booking off their grid that day."""
+    return f"{KEY_PREFIX}:{version}:{day.isoformat()}:off_grid"
+
+
+def dirty_key(version):
+    """Set of the ids of the fields refreshed while the version was built."""
+    return f"{KEY_PREFIX}:{version}:dirty"
+
+
+def lock_key(field_id):
+    return f"{KEY_PREFIX}:lock:{field_id}"
+
+
+def _parse_version(value):
+    if value is None:
+        return None
+    version, last_day = value.decode().split()
+    return version, date.fromisoformat(last_day)
+
+
+def _versions():
+    """(version, last_day) of the index in use and of the one being built."""
+    current, building = redis_instance.mget(CURRENT_KEY, BUILDING_KEY)
+    return _parse_version(current), _parse_version(building)
+
+
+def _expire_at(day):
+    # Keep each day until the day after it is over
+    return int(
+        timezone.make_aware(
+            datetime.combine(day + timedelta(days=2), time.min)
+        ).timestamp()
+    )
+
+
+def booking_grid(field, day):
+    """(opening, closing, step) of the field's booking grid on the day."""
+    opening, closing = working_hours(field, day)
+    return opening, closing, field.min_booking_duration
+
+
+def _encode_grid(grid):
+    opening, closing, step = grid
+    return f"{int(opening.timestamp())} {int(closing.timestamp())} {int(step.total_seconds())}"
+
+
+def _decode_grid(value):
+    opening, closing, step = (int(part) for part in value.split())
+    return (
+        datetime.fromtimestamp(opening, tz=dt_timezone.utc),
+        datetime.fromtimestamp(closing, tz=dt_timezone.utc),
+        timedelta(seconds=step),
+    )
+
+
+def grid_span(grid, start, end):
+    """
+    Return the (first, last) indexes of the slots of a booking grid that
+    overlap [start, end), or None. Slot i starts at opening + i * step.
+    """
+    opening, closing, step = grid
+    start = max(start, opening)
+    end = min(end, closing)
+    if end <= start:
+        return None
+    return (start - opening) // step, -(-(end - opening) // step) - 1
+
+
+def is_on_grid(grid, start, end):
+    """
+    Whether the part of [start, end) within the grid's hours starts and
+    ends on the grid, so that it covers whole slots.
+    """
+    opening, closing, step = grid
+    start = max(start, opening)
+    end = min(end, closing)
+    return end <= start or not ((start - opening) % step or (end - opening) % step)
+
+
+def slot_span(field, day, start, end):
+    """The slots of the field's booking grid on the day overlapping [start, end)."""
+    return grid_span(booking_grid(field, day), start, end)
+
+
+def on_grid(field, day, start, end):
+    """Whether [start, end) covers whole slots of the field's grid on the day."""
+    return is_on_grid(booking_grid(field, day), start, end)
+
+
+def build_bitmap(field, day, intervals):
+    """
+    Encode the booked intervals of a field on a day as a Redis bitmap, with
+    slot 0 as the most significant bit of the first byte. A booking that is
+    not aligned to the grid marks every slot it overlaps.
+    """
+    bits = bytearray()
+    for start, end in intervals:
+        span = slot_span(field, day, start, end)
+        if span is None:
+            continue
+        first, last = span
+        if last // 8 >= len(bits):
+            bits.extend(bytes(last // 8 + 1 - len(bits)))
+        for i in range(first, last + 1):
+            bits[i // 8] |= 0x80 >> (i % 8)
+    return bytes(bits)
+
+
+def _write_day(pipe, version, field, day, intervals):
+    bitmap = build_bitmap(field, day, intervals)
+    expire_at = _expire_at(day)
+    if bitmap.strip(b"\0"):
+        pipe.set(day_key(version, field.id, day), bitmap, exat=expire_at)
+        pipe.hset(
+            day_grids_key(version, day),
+            field.id,
+            _encode_grid(booking_grid(field, day)),
+        )
+        pipe.expireat(day_grids_key(version, day), expire_at)
+    else:
+        pipe.delete(day_key(version, field.id, day))
+        pipe.hdel(day_grids_key(version, day), field.id)
+    # Whole slots overstate those bookings, so the database answers for them
+    if any(not on_grid(field, day, start, end) for start, end in intervals):
+        pipe.sadd(off_grid_key(version, day), field.id)
+        pipe.expireat(off_grid_key(version, day), expire_at)
+    else:
+        pipe.srem(off_grid_key(version, day), field.id)
+
+
+def _group_by_day(intervals):
+    days = defaultdict(list)
+    for start, end in intervals:
+        days[timezone.localdate(start)].append((start, end))
+    return days
+
+
+def refresh_field_days(field_id, days):
+    """
+    Rewrite the bitmaps of one field on the given days from the database,
+    in the index in use and in the one being rebuilt.
+
+    Refreshes run after their transaction commits, in any order, so each
+    holds the field's lock from reading the bookings until its bitmaps are
+    written: the last refresh to read the database is the last to write.
+    """
+    days = sorted(set(days))
+    with redis_instance.lock(
+        lock_key(field_id), timeout=LOCK_TIMEOUT, blocking_timeout=LOCK_TIMEOUT
+    ):
+        current, building = _versions()
+        versions = [version for version, _ in filter(None, [current, building])]
+        if not versions:
+            return
+
+        field = FootballField.objects.filter(pk=field_id).only(*GRID_FIELDS).first()
+        by_day = defaultdict(list)
+        if field is None:
+            field = FootballField(id=field_id)
+        else:
+            start = timezone.make_aware(datetime.combine(days[0], time.min))
+            end = timezone.make_aware(
+                datetime.combine(days[-1] + timedelta(days=1), time.min)
+            )
+            by_day = _group_by_day(
+                Booking.objects.filter(
+                    field_id=field_id, period__overlap=(start, end)
+                ).values_list("start_time", "end_time")
+            )
+
+        pipe = redis_instance.pipeline()
+        for version in versions:
+            for day in days:
+                _write_day(pipe, version, field, day, by_day[day])
+        if building is not None:
+            pipe.sadd(dirty_key(building[0]), field_id)
+        pipe.execute()
+
+
+def refresh_field(field_id):
+    """Rewrite every indexed day of one field, e.g. after its hours changed."""
+    last_days = [version[1] for version in _versions() if version is not None]
+    if not last_days:
+        return
+    day = timezone.localdate()
+    days = [day + timedelta(days=i) for i in range((max(last_days) - day).days + 1)]
+    if days:
+        refresh_field_days(field_id, days)
+
+
+def _unlink_versions(keep):
+    """Drop the keys of every version of the index but those in keep."""
+    fixed = {CURRENT_KEY.encode(), BUILDING_KEY.encode()}
+    lock_prefix = lock_key("").encode()
+    pipe = redis_instance.pipeline(transaction=False)
+    for key in redis_instance.scan_iter(match=f"{KEY_PREFIX}:*", count=1000):
+        if key in fixed or key.startswith(lock_prefix):
+            continue
+        if key.split(b":")[1].decode() not in keep:
+            pipe.unlink(key)
+    pipe.execute()
+
+
+def rebuild_index(days_ahead, batch_size=1000):
+    """
+    Rebuild the bitmaps of every field from today until days_ahead days from
+    now into a new version of the index, and switch to it. Returns the
+    number of bitmaps written.
+
+    The index in use keeps answering meanwhile. Refreshes write to both
+    versions, and the fields they refreshed are read again once the bulk
+    write is done, since it may have overwritten them with older bookings.
+    The version replaced stays until the next rebuild, for the readers that
+    were still using it.
+    """
+    today = timezone.localdate()
+    last_day = today + timedelta(days=days_ahead)
+    start = timezone.make_aware(datetime.combine(today, time.min))
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+
+    current, _ = _versions()
+    version = uuid.uuid4().hex
+    _unlink_versions({version, current[0] if current else None})
+    redis_instance.set(BUILDING_KEY, f"{version} {last_day.isoformat()}")
+
+    bookings = (
+        Booking.objects.filter(period__overlap=(start, end))
+        .order_by("field_id", "start_time")
+        .values_list(
+            "field_id",
+            "field__opening_time",
+            "field__closing_time",
+            "field__weekly_hours",
+            "field__min_booking_duration",
+            "start_time",
+            "end_time",
+        )
+    )
+    written = 0
+    pipe = redis_instance.pipeline(transaction=False)
+
+    def write(field, intervals):
+        nonlocal written
+        for day, day_intervals in _group_by_day(intervals).items():
+            _write_day(pipe, version, field, day, day_intervals)
+            written += 1
+            if written % batch_size == 0:
+                pipe.execute()
+
+    field, intervals = None, []
+    for row in bookings.iterator(chunk_size=batch_size):
+        if field is None or field.id != row[0]:
+            if field is not None:
+                write(field, intervals)
+            field = FootballField(
+                id=row[0],
+                opening_time=row[1],
+                closing_time=row[2],
+                weekly_hours=row[3],
+                min_booking_duration=row[4],
+            )
+            intervals = []
+        intervals.append((row[5], row[6]))
+    if field is not None:
+        write(field, intervals)
+    pipe.execute()
+
+    days = [today + timedelta(days=i) for i in range(days_ahead + 1)]
+    for field_id in redis_instance.smembers(dirty_key(version)):
+        refresh_field_days(int(field_id), days)
+
+    swap = redis_instance.pipeline()
+    swap.set(CURRENT_KEY, f"{version} {last_day.isoformat()}")
+    swap.delete(BUILDING_KEY, dirty_key(version))
+    swap.execute()
+    return written
+
+
+def clear_index():
+    """Drop the whole index, so availability is read from the database."""
+    pipe = redis_instance.pipeline(transaction=False)
+    pipe.delete(CURRENT_KEY, BUILDING_KEY)
+    lock_prefix = lock_key("").encode()
+    for key in redis_instance.scan_iter(match=f"{KEY_PREFIX}:*", count=1000):
+        if not key.startswith(lock_prefix):
+            pipe.unlink(key)
+    pipe.execute()
+
+
+def busy_field_ids(start, end):
+    """
+    Return (busy, unchecked) for [start, end) from the bitmaps, read with
+    BITFIELD: the ids of the fields with a booking overlapping it, and of
+    those the bitmaps cannot answer for exactly, because the interval or
+    one of their bookings that day is off their booking grid. The database
+    has to check the unchecked ones.
+
+    Returns None when the index cannot answer at all: it was never built,
+    the day is past the rebuilt range, the interval spans several days, more
+    than MAX_EXCLUDED_FIELDS fields are busy or Redis is unavailable.
+    """
+    day = timezone.localdate(start)
+    if timezone.localdate(end - timedelta(microseconds=1)) != day:
+        return None
+    try:
+        current, _ = _versions()
+        if current is None or day > current[1]:
+            return None
+        version = current[0]
+        pipe = redis_instance.pipeline(transaction=False)
+        pipe.hgetall(day_grids_key(version, day))
+        pipe.smembers(off_grid_key(version, day))
+        grids, off_grid = pipe.execute()
+
+        unchecked = set()
+        queried = []
+        for field_id, value in grids.items():
+            grid = _decode_grid(value.decode())
+            if field_id in off_grid or not is_on_grid(grid, start, end):
+                unchecked.add(int(field_id))
+                continue
+            field_id = int(field_id)
+            span = grid_span(grid, start, end)
+            if span is None:
+                continue
+            args = []
+            for offset in range(span[0], span[1] + 1, MAX_BITFIELD_BITS):
+                width = min(MAX_BITFIELD_BITS, span[1] + 1 - offset)
+                args += ["GET", f"u{width}", offset]
+            pipe.execute_command("BITFIELD", day_key(version, field_id, day), *args)
+            queried.append(field_id)
+        results = pipe.execute() if queried else []
+    except redis.RedisError:
+        logger.exception("Could not read the slot index")
+        return None
+    busy = {field_id for field_id, values in zip(queried, results) if any(values)}
+    if len(busy) + len(unchecked) > MAX_EXCLUDED_FIELDS:
+        return None
+    return busy, unchecked
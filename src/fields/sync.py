@@ -0,0 +1,170 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from config.pagination import keyset_filter
+from location.models import City, District, Region
+from location.serializers import (
+    CitySyncSerializer,
+    DistrictSyncSerializer,
+    RegionSyncSerializer,
+)
+
+from .models import FieldImage, FootballField, Tombstone
+from .serializers import FieldImageSyncSerializer, FieldSyncSerializer
+
+# The synced collections, parents first, which is the order to apply them in
+COLLECTIONS = {
+    "regions": (Region, RegionSyncSerializer),
+    "cities": (City, CitySyncSerializer),
+    "districts": (District, DistrictSyncSerializer),
+    "fields": (FootballField, FieldSyncSerializer),
+    "images": (FieldImage, FieldImageSyncSerializer),
+}
+SYNCED_MODELS = [model for model, _ in COLLECTIONS.values()]
+
+
+def record_tombstone(instance):
+    Tombstone.objects.create(model=instance._meta.label_lower, object_id=instance.pk)
+
+
+def prune_tombstones():
+    """Delete the tombstones older than SYNC_TOMBSTONE_RETENTION."""
+    horizon = timezone.now() - settings.SYNC_TOMBSTONE_RETENTION
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=horizon).delete()
+    return deleted
+
+
+def _page(queryset, column, position, limit):
+    """
+    Up to limit rows of queryset after position in (column, id) order, and
+    the position of the last one, or None when no rows are left after them.
+    """
+    queryset = queryset.order_by(column, "id")
+    if position is not None:
+        queryset = queryset.filter(keyset_filter((column, "id"), position))
+    rows = list(queryset[: limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], (getattr(last, column), last.pk)
+
+
+def encode_page(state):
+    return urlsafe_b64encode(
+        json.dumps(
+            {
+                "since": state["since"] and state["since"].isoformat(),
+                "cursor": state["cursor"].isoformat(),
+                "full": state["full"],
+                "after": {
+                    name: position and [position[0].isoformat(), position[1]]
+                    for name, position in state["after"].items()
+                },
+            }
+        ).encode()
+    ).decode()
+
+
+def _parse_time(value):
+    value = datetime.fromisoformat(value)
+    if timezone.is_naive(value):
+        raise ValueError(value)
+    return value
+
+
+def decode_page(token):
+    """The sync state a next token holds. Raises ValueError if it is not one."""
+    try:
+        data = json.loads(urlsafe_b64decode(token.encode()))
+        after = {}
+        for name, position in data["after"].items():
+            if name not in COLLECTIONS and name != "deleted":
+                raise ValueError(name)
+            after[name] = position and (
+                _parse_time(position[0]),
+                int(position[1]),
+            )
+        return {
+            "since": data["since"] and _parse_time(data["since"]),
+            "cursor": _parse_time(data["cursor"]),
+            "full": bool(data["full"]),
+            "after": after,
+        }
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        raise ValueError("Invalid page token.")
+
+
+def changes_since(updated_since, page=None, limit=None):
+    """
+    The rows of every collection changed after updated_since and the ids
+    deleted since, with the cursor to pass as updated_since next time.
+
+    Without updated_since, or with one older than the tombstones kept, every
+    row is returned with full set, and the client replaces its copy.
+
+    Each collection and the deleted ids hold at most limit rows, in
+    (updated_at, id) order. While has_more is set, pass next as page to get
+    the rest; the cursor only applies once every page has been fetched.
+    """
+    limit = limit or settings.SYNC_PAGE_SIZE
+    if page is None:
+        now = timezone.now()
+        # updated_at is set before the saving transaction commits, so a row
+        # can turn up with an updated_at behind a cursor handed out
+        # meanwhile. The cursor trails the clock to catch those rows;
+        # clients upsert by id, so seeing a row twice is harmless.
+        full = (
+            updated_since is None
+            or updated_since < now - settings.SYNC_TOMBSTONE_RETENTION
+        )
+        names = [*COLLECTIONS] if full else [*COLLECTIONS, "deleted"]
+        page = {
+            "since": None if full else updated_since,
+            "cursor": now - timedelta(seconds=settings.SYNC_CURSOR_LAG_SECONDS),
+            "full": full,
+            "after": {name: None for name in names},
+        }
+    since, after = page["since"], page["after"]
+
+    changes = {
+        "cursor": serializers.DateTimeField().to_representation(page["cursor"]),
+        "full": page["full"],
+    }
+    # The collections with rows left after this page, and where they stop
+    following = {}
+    for name, (model, serializer_class) in COLLECTIONS.items():
+        rows = []
+        if name in after:
+            queryset = model.objects.all()
+            if since is not None:
+                queryset = queryset.filter(updated_at__gt=since)
+            rows, position = _page(queryset, "updated_at", after[name], limit)
+            if position is not None:
+                following[name] = position
+        changes[name] = serializer_class(rows, many=True).data
+
+    deleted = {name: [] for name in COLLECTIONS}
+    if "deleted" in after:
+        names = {
+            model._meta.label_lower: name for name, (model, _) in COLLECTIONS.items()
+        }
+        tombstones, position = _page(
+            Tombstone.objects.filter(deleted_at__gt=since).only("model", "object_id"),
+            "deleted_at",
+            after["deleted"],
+            limit,
+        )
+        for tombstone in tombstones:
+            deleted[names[tombstone.model]].append(tombstone.object_id)
+        if position is not None:
+            following["deleted"] = position
+    changes["deleted"] = deleted
+
+    changes["has_more"] = bool(following)
+    changes["next"] = encode_page({**page, "after": following}) if following else None
+    return changes
@@ -1,20 +1,50 @@
-from datetime import time, timedelta
+import io
+import json
+import math
+import threading
+import time as time_module
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest.mock import Mock, patch
 
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import QueryDict
+from django.test import TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 
+from location.boundaries import invalidate_district_index
 from location.models import City, District, Region
 
-from .models import Booking, FootballField
+from . import autocomplete, holds, idempotency, live, locks, result_cache, slot_index
+from .autocomplete import rebuild_index
+from .availability import suggest_alternatives
+from .geo import tile_for_point
+from .models import Booking, FieldBlackout, FootballField
+from .search import normalize_search_text
+from .serializers import FreeSlotSerializer
 
 User = get_user_model()
 
 
 class FieldsAppTests(APITestCase):
     def setUp(self):
+        cache.clear()
+        slot_index.clear_index()
+        holds.clear_holds()
+
         # Create a regular user
         self.user = User.objects.create_user(
             phone_number="+14155552671",
@@ -264,7 +294,7 @@ class FieldsAppTests(APITestCase):
         url = reverse("booking-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_owner_can_retrieve_bookings_for_their_fields(self):
         booking_start_time = (timezone.now() + timedelta(hours=3)).replace(
@@ -281,7 +311,7 @@ class FieldsAppTests(APITestCase):
         url = reverse("booking-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_user_cannot_delete_others_booking(self):
         other_user = User.objects.create_user(
@@ -363,8 +393,8 @@ class FieldsAppTests(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Only the second field should be available
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["name"], "Another Field")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], "Another Field")
 
     def test_get_available_fields_sorted_by_distance(self):
         """
@@ -394,10 +424,12 @@ class FieldsAppTests(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Check that fields are returned in order of proximity
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(response.data[0]["name"], "Test Field")  # Closest to New York
+        self.assertEqual(len(response.data["results"]), 2)
         self.assertEqual(
-            response.data[1]["name"], "Test Field 2"
+            response.data["results"][0]["name"], "Test Field"
+        )  # Closest to New York
+        self.assertEqual(
+            response.data["results"][1]["name"], "Test Field 2"
         )  # Farther in Los Angeles
 
     def test_get_available_fields_within_time_range(self):
@@ -442,8 +474,8 @@ class FieldsAppTests(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Only Field 2 should be available as Field 1 is booked
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["name"], "Test Field 2")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], "Test Field 2")
 
     def test_get_available_fields_near_given_location(self):
         """
@@ -477,6 +509,2305 @@ class FieldsAppTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # Check that fields are returned and sorted by proximity
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(response.data["results"][0]["name"], "Test Field")
+        self.assertEqual(response.data["results"][1]["name"], "Test Field 2")
+
+    def test_get_available_fields_within_radius(self):
+        """
+        Test that only fields within radius_km of the location are returned.
+        """
+        FootballField.objects.create(
+            owner=self.owner,
+            name="Test Field 2",
+            address="456 Soccer Ave.",
+            district=self.district,
+            contact="owner2@example.com",
+            hourly_rate="60.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=34.0522,
+            longitude=-118.2437,
+        )
+        url = reverse("available-fields")
+        response = self.client.get(
+            url,
+            {"latitude": 40.730610, "longitude": -73.935242, "radius_km": 10},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], "Test Field")
+
+    @override_settings(MAX_SEARCH_RADIUS_KM=5)
+    def test_available_fields_radius_is_capped(self):
+        url = reverse("available-fields")
+        # Test Field is about 6.3 km from this point
+        response = self.client.get(
+            url,
+            {"latitude": 40.730610, "longitude": -73.935242, "radius_km": 10000},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 0)
+
+    def test_field_radian_coordinates_follow_latitude_and_longitude(self):
+        self.field.latitude = Decimal("41.311081")
+        self.field.longitude = Decimal("69.240562")
+        self.field.save()
+        self.field.refresh_from_db()
+        self.assertAlmostEqual(self.field.lat_rad, math.radians(41.311081))
+        self.assertAlmostEqual(self.field.lon_rad, math.radians(69.240562))
+
+    def test_field_geohash_follows_latitude_and_longitude(self):
+        self.assertEqual(self.field.geohash[:5], "dr5re")
+        self.field.latitude = Decimal("41.311081")
+        self.field.longitude = Decimal("69.240562")
+        self.field.save()
+        self.field.refresh_from_db()
+        self.assertEqual(self.field.geohash[:5], "tx35p")
+
+    def test_field_tile_clusters_at_low_zoom(self):
+        FootballField.objects.create(
+            owner=self.owner,
+            name="Another Field",
+            address="789 Soccer Rd.",
+            district=self.district,
+            contact="owner@example.com",
+            hourly_rate="55.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.730610,
+            longitude=-73.935242,
+        )
+        x, y = tile_for_point(40.7128, -74.0060, 4)
+        url = reverse("field-tile", kwargs={"z": 4, "x": x, "y": y})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["clustered"])
+        self.assertEqual(len(response.data["clusters"]), 1)
+        self.assertEqual(response.data["clusters"][0]["count"], 2)
+
+    def test_field_tile_returns_points_at_high_zoom(self):
+        x, y = tile_for_point(40.7128, -74.0060, 16)
+        url = reverse("field-tile", kwargs={"z": 16, "x": x, "y": y})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["clustered"])
+        self.assertEqual(
+            [field["id"] for field in response.data["fields"]], [self.field.id]
+        )
+
+    def test_field_tile_cache_is_invalidated_on_update(self):
+        x, y = tile_for_point(40.7128, -74.0060, 16)
+        url = reverse("field-tile", kwargs={"z": 16, "x": x, "y": y})
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.field.name = "Renamed Field"
+            self.field.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data["fields"][0]["name"], "Renamed Field")
+
+    def test_field_tile_with_invalid_coordinates(self):
+        url = reverse("field-tile", kwargs={"z": 2, "x": 4, "y": 0})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_earliest_available_fields_skips_booked_slots(self):
+        day = (timezone.now() + timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=day.replace(hour=10),
+            end_time=day.replace(hour=12),
+        )
+        FootballField.objects.create(
+            owner=self.owner,
+            name="Far Field",
+            address="456 Soccer Ave.",
+            district=self.district,
+            contact="owner2@example.com",
+            hourly_rate="60.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=34.0522,
+            longitude=-118.2437,
+        )
+        url = reverse("available-fields-earliest")
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                url,
+                {
+                    "latitude": 40.7128,
+                    "longitude": -74.0060,
+                    "radius_km": 10,
+                    "duration": "02:00:00",
+                    "window_start": day.replace(hour=10, minute=30).isoformat(),
+                    "window_end": day.replace(hour=20).isoformat(),
+                },
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]["name"], "Test Field")
-        self.assertEqual(response.data[1]["name"], "Test Field 2")
+        self.assertEqual(
+            response.data[0]["earliest_start"],
+            day.replace(hour=12).isoformat().replace("+00:00", "Z"),
+        )
+
+    def test_earliest_available_fields_none_when_window_is_full(self):
+        day = (timezone.now() + timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=day.replace(hour=18),
+            end_time=day.replace(hour=22),
+        )
+        url = reverse("available-fields-earliest")
+        response = self.client.get(
+            url,
+            {
+                "latitude": 40.7128,
+                "longitude": -74.0060,
+                "radius_km": 10,
+                "duration": "01:00:00",
+                "window_start": day.replace(hour=18).isoformat(),
+                "window_end": day.replace(hour=23).isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_earliest_available_fields_invalid_window(self):
+        url = reverse("available-fields-earliest")
+        start = timezone.now() + timedelta(days=1)
+        response = self.client.get(
+            url,
+            {
+                "latitude": 40.7128,
+                "longitude": -74.0060,
+                "radius_km": 10,
+                "duration": "01:00:00",
+                "window_start": start.isoformat(),
+                "window_end": (start - timedelta(hours=1)).isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_field_list_is_cursor_paginated(self):
+        for i in range(4):
+            FootballField.objects.create(
+                owner=self.owner,
+                name=f"Paged Field {i}",
+                address="456 Soccer Ave.",
+                district=self.district,
+                contact="owner2@example.com",
+                hourly_rate="60.00",
+                opening_time=time(8, 0),
+                closing_time=time(22, 0),
+                min_booking_duration=timedelta(hours=1),
+                latitude=40.7128,
+                longitude=-74.0060,
+            )
+        url = reverse("field-list")
+        names = []
+        response = self.client.get(url, {"page_size": 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            names += [field["name"] for field in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(
+            names,
+            [f"Paged Field {i}" for i in reversed(range(4))] + ["Test Field"],
+        )
+        # Walk back from the last page
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [field["name"] for field in response.data["results"]],
+            ["Paged Field 1", "Paged Field 0"],
+        )
+
+    def test_available_fields_paginate_by_distance(self):
+        FootballField.objects.create(
+            owner=self.owner,
+            name="Test Field 2",
+            address="456 Soccer Ave.",
+            district=self.district,
+            contact="owner2@example.com",
+            hourly_rate="60.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=34.0522,
+            longitude=-118.2437,
+        )
+        url = reverse("available-fields")
+        params = {"latitude": 40.730610, "longitude": -73.935242, "page_size": 1}
+        response = self.client.get(url, params)
+        self.assertEqual(response.data["results"][0]["name"], "Test Field")
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"][0]["name"], "Test Field 2")
+        self.assertIsNone(response.data["next"])
+
+    def test_normalize_search_text_folds_cyrillic_and_latin(self):
+        self.assertEqual(normalize_search_text("Ўзбекистон"), "ozbekiston")
+        self.assertEqual(normalize_search_text("O‘zbekiston"), "ozbekiston")
+        self.assertEqual(normalize_search_text("Пахтакор"), "pahtakor")
+        self.assertEqual(normalize_search_text("Paxtakor"), "pahtakor")
+        self.assertEqual(normalize_search_text("  Chilonzor-9, "), "chilonzor 9")
+
+    def test_search_fields_matches_cyrillic_query(self):
+        FootballField.objects.create(
+            owner=self.owner,
+            name="Paxtakor Arena",
+            address="Navoiy ko‘chasi 1",
+            district=self.district,
+            contact="owner2@example.com",
+            hourly_rate="60.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=41.3111,
+            longitude=69.2797,
+        )
+        url = reverse("field-list")
+        response = self.client.get(url, {"q": "Пахтакор"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [field["name"] for field in response.data["results"]], ["Paxtakor Arena"]
+        )
+
+    def test_search_fields_tolerates_typos(self):
+        url = reverse("available-fields")
+        response = self.client.get(url, {"q": "test fild"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [field["name"] for field in response.data["results"]], ["Test Field"]
+        )
+
+    def test_search_fields_matches_district_name(self):
+        url = reverse("available-fields")
+        response = self.client.get(url, {"q": "test distr"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_autocomplete_after_rebuild(self):
+        rebuild_index()
+        url = reverse("autocomplete")
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"q": "Тест"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            {"type": "field", "id": self.field.id, "name": "Test Field"},
+            response.data,
+        )
+        self.assertIn(
+            {"type": "district", "id": self.district.id, "name": "Test District"},
+            response.data,
+        )
+
+    def test_autocomplete_rebuild_serves_and_keeps_concurrent_writes(self):
+        autocomplete.index_entry("field", 0, "Stale Arena")
+        swap = autocomplete.redis_instance.transaction
+
+        def write_then_swap(*args, **kwargs):
+            # The old index serves until the rebuilt one replaces it
+            self.assertEqual([e["id"] for e in autocomplete.complete("stale")], [0])
+            autocomplete.index_entry("field", self.field.id, "Renamed Arena")
+            autocomplete.remove_entry("district", self.district.id)
+            return swap(*args, **kwargs)
+
+        with patch.object(
+            autocomplete.redis_instance, "transaction", side_effect=write_then_swap
+        ):
+            rebuild_index()
+        self.assertEqual(autocomplete.complete("stale"), [])
+        self.assertEqual(autocomplete.complete("test field"), [])
+        self.assertEqual(autocomplete.complete("test distr"), [])
+        self.assertEqual(
+            autocomplete.complete("renamed"),
+            [{"type": "field", "id": self.field.id, "name": "Renamed Arena"}],
+        )
+        self.assertFalse(
+            autocomplete.redis_instance.exists(autocomplete.REBUILDING_KEY)
+        )
+
+    def test_autocomplete_follows_saves_and_deletes(self):
+        url = reverse("autocomplete")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.field.name = "Bunyodkor Arena"
+            self.field.save()
+        response = self.client.get(url, {"q": "aren"})
+        self.assertEqual(
+            [entry["id"] for entry in response.data if entry["type"] == "field"],
+            [self.field.id],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.field.delete()
+        response = self.client.get(url, {"q": "bunyodkor"})
+        self.assertEqual(response.data, [])
+
+    @override_settings(FIELD_PRICE_BUCKETS=[55, 100])
+    def test_available_fields_facet_counts(self):
+        other_district = District.objects.create(name="Other District", city=self.city)
+        FootballField.objects.create(
+            owner=self.owner,
+            name="Late Field",
+            address="789 Soccer Rd.",
+            district=other_district,
+            contact="owner@example.com",
+            hourly_rate="120.00",
+            opening_time=time(16, 0),
+            closing_time=time(23, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.730610,
+            longitude=-73.935242,
+        )
+        url = reverse("available-fields")
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url, {"facets": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        facets = response.data["facets"]
+        self.assertEqual(
+            {(d["name"], d["count"]) for d in facets["districts"]},
+            {("Test District", 1), ("Other District", 1)},
+        )
+        self.assertEqual(
+            facets["cities"], [{"id": self.city.id, "name": "Test City", "count": 2}]
+        )
+        self.assertEqual(
+            facets["price_buckets"],
+            [
+                {"range": "0-55", "count": 1},
+                {"range": "55-100", "count": 0},
+                {"range": "100+", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            facets["open_at"],
+            [
+                {"time": "07:00", "count": 0},
+                {"time": "12:00", "count": 1},
+                {"time": "18:00", "count": 2},
+                {"time": "22:00", "count": 1},
+            ],
+        )
+        # Unfiltered facets are served from the cache afterwards, even when
+        # the results themselves are recomputed
+        result_cache.invalidate_fields([])
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(url, {"facets": "true"})
+        self.assertEqual(len(second), len(first) - 1)
+
+    def test_filtered_facets_are_not_cached(self):
+        url = reverse("available-fields")
+        self.client.get(url, {"facets": "true", "q": "test"})
+        with self.captureOnCommitCallbacks(execute=True):
+            FootballField.objects.create(
+                owner=self.owner,
+                name="Test Field 2",
+                address="789 Soccer Rd.",
+                district=self.district,
+                contact="owner@example.com",
+                hourly_rate="55.00",
+                opening_time=time(8, 0),
+                closing_time=time(22, 0),
+                min_booking_duration=timedelta(hours=1),
+                latitude=40.730610,
+                longitude=-73.935242,
+            )
+        response = self.client.get(url, {"facets": "true", "q": "test"})
+        self.assertEqual(response.data["facets"]["districts"][0]["count"], 2)
+
+    def test_available_fields_price_range_and_sort(self):
+        for name, rate in [("Cheap Field", "30.00"), ("Pricey Field", "90.00")]:
+            FootballField.objects.create(
+                owner=self.owner,
+                name=name,
+                address="789 Soccer Rd.",
+                district=self.district,
+                contact="owner@example.com",
+                hourly_rate=rate,
+                opening_time=time(8, 0),
+                closing_time=time(22, 0),
+                min_booking_duration=timedelta(hours=1),
+                latitude=40.730610,
+                longitude=-73.935242,
+            )
+        url = reverse("available-fields")
+        response = self.client.get(url, {"ordering": "-price", "page_size": 2})
+        self.assertEqual(
+            [field["name"] for field in response.data["results"]],
+            ["Pricey Field", "Test Field"],
+        )
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [field["name"] for field in response.data["results"]], ["Cheap Field"]
+        )
+
+        response = self.client.get(
+            url,
+            {
+                "district_id": self.district.id,
+                "min_price": 40,
+                "max_price": 60,
+                "open_at": "09:00",
+            },
+        )
+        self.assertEqual(
+            [field["name"] for field in response.data["results"]], ["Test Field"]
+        )
+        response = self.client.get(url, {"min_price": 40, "open_at": "23:00"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_available_fields_invalid_price_is_rejected(self):
+        url = reverse("available-fields")
+        response = self.client.get(url, {"min_price": "cheap"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def set_boundary(self, district, min_lon, min_lat, size):
+        district.boundary = {
+            "type": "Polygon",
+            "coordinates": [
+                [
+                    [min_lon, min_lat],
+                    [min_lon + size, min_lat],
+                    [min_lon + size, min_lat + size],
+                    [min_lon, min_lat + size],
+                    [min_lon, min_lat],
+                ]
+            ],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            district.save()
+        self.addCleanup(invalidate_district_index)
+
+    def test_create_field_assigns_district_from_boundary(self):
+        other_district = District.objects.create(name="Other District", city=self.city)
+        self.set_boundary(other_district, -74.5, 40.5, 1.0)
+        self.client.force_authenticate(user=self.owner)
+        url = reverse("field-list")
+        data = {
+            "name": "Located Field",
+            "address": "456 Football Ave.",
+            "district_id": self.district.id,
+            "contact": "owner@example.com",
+            "hourly_rate": "60.00",
+            "opening_time": "09:00",
+            "closing_time": "21:00",
+            "min_booking_duration": "01:00:00",
+            "latitude": "40.7",
+            "longitude": "-74.0",
+        }
+        # A district_id other than the boundary's is rejected, not replaced
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("district_id", response.data)
+
+        del data["district_id"]
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["district"]["id"], other_district.id)
+        response = self.client.patch(
+            reverse("field-detail", args=[response.data["id"]]),
+            {"district_id": self.district.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Outside every boundary the district has to be given
+        data["latitude"] = "10.0"
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("district_id", response.data)
+
+    def test_assign_districts_command_moves_misplaced_fields(self):
+        other_district = District.objects.create(name="Other District", city=self.city)
+        self.set_boundary(other_district, -74.5, 40.5, 1.0)
+        call_command("assign_districts", stdout=io.StringIO())
+        self.field.refresh_from_db()
+        self.assertEqual(self.field.district, other_district)
+        self.assertIn("other district", self.field.search_document)
+
+    def test_next_available_start_follows_bookings(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            field = FootballField.objects.create(
+                owner=self.owner,
+                name="All Day Field",
+                address="789 Soccer Rd.",
+                district=self.district,
+                contact="owner@example.com",
+                hourly_rate="50.00",
+                opening_time=time(0, 0),
+                closing_time=time(23, 59),
+                min_booking_duration=timedelta(hours=1),
+                latitude=40.730610,
+                longitude=-73.935242,
+            )
+        field.refresh_from_db()
+        first_free = field.next_available_start
+        self.assertIsNotNone(first_free)
+        self.assertGreaterEqual(first_free, timezone.now())
+        self.assertEqual((first_free.minute, first_free.second), (0, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                field=field,
+                user=self.user,
+                start_time=first_free,
+                end_time=first_free + timedelta(hours=1),
+            )
+        field.refresh_from_db()
+        self.assertGreaterEqual(
+            field.next_available_start, first_free + timedelta(hours=1)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        field.refresh_from_db()
+        self.assertEqual(field.next_available_start, first_free)
+
+    def test_next_available_start_follows_opening_hours(self):
+        self.field.refresh_from_db()
+        self.field.opening_time = time(6, 0)
+        self.field.closing_time = time(7, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.field.save()
+        self.field.refresh_from_db()
+        self.assertEqual(
+            timezone.localtime(self.field.next_available_start).time(), time(6, 0)
+        )
+
+    def test_refresh_next_available_command_rolls_forward(self):
+        FootballField.objects.filter(pk=self.field.pk).update(
+            next_available_start=timezone.now() - timedelta(days=1)
+        )
+        call_command("refresh_next_available", stdout=io.StringIO())
+        self.field.refresh_from_db()
+        self.assertGreaterEqual(self.field.next_available_start, timezone.now())
+
+    def test_available_fields_ordered_by_soonest(self):
+        now = timezone.now()
+        later = FootballField.objects.create(
+            owner=self.owner,
+            name="Later Field",
+            address="789 Soccer Rd.",
+            district=self.district,
+            contact="owner@example.com",
+            hourly_rate="50.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.730610,
+            longitude=-73.935242,
+        )
+        full = FootballField.objects.create(
+            owner=self.owner,
+            name="Fully Booked Field",
+            address="789 Soccer Rd.",
+            district=self.district,
+            contact="owner@example.com",
+            hourly_rate="50.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.730610,
+            longitude=-73.935242,
+        )
+        FootballField.objects.filter(pk=self.field.pk).update(
+            next_available_start=now + timedelta(hours=1)
+        )
+        FootballField.objects.filter(pk=later.pk).update(
+            next_available_start=now + timedelta(hours=3)
+        )
+        FootballField.objects.filter(pk=full.pk).update(next_available_start=None)
+
+        response = self.client.get(reverse("field-list"), {"ordering": "soonest"})
+        self.assertEqual(
+            [field["name"] for field in response.data["results"]],
+            ["Test Field", "Later Field"],
+        )
+
+    def tomorrow_at(self, hour):
+        day = timezone.localdate() + timedelta(days=1)
+        return timezone.make_aware(datetime.combine(day, time(hour, 0)))
+
+    def test_slot_index_answers_available_fields(self):
+        slot_index.rebuild_index(days_ahead=14)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                field=self.field,
+                user=self.user,
+                start_time=self.tomorrow_at(10),
+                end_time=self.tomorrow_at(12),
+            )
+        url = reverse("available-fields")
+        params = {
+            "start_time": self.tomorrow_at(11).isoformat(),
+            "end_time": self.tomorrow_at(13).isoformat(),
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.data["results"], [])
+        # The bookings were read from Redis, not with NOT EXISTS
+        self.assertFalse(any("fields_booking" in query["sql"] for query in queries))
+
+        params["start_time"] = self.tomorrow_at(12).isoformat()
+        response = self.client.get(url, params)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        # The grids are stored with the bitmaps, so the fields are not loaded
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                slot_index.busy_field_ids(self.tomorrow_at(11), self.tomorrow_at(13)),
+                ({self.field.id}, set()),
+            )
+        # Too many busy fields are left to NOT EXISTS
+        with patch.object(slot_index, "MAX_EXCLUDED_FIELDS", 0):
+            self.assertIsNone(
+                slot_index.busy_field_ids(self.tomorrow_at(11), self.tomorrow_at(13))
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        self.assertEqual(
+            slot_index.busy_field_ids(self.tomorrow_at(8), self.tomorrow_at(22)),
+            (set(), set()),
+        )
+
+    def test_slot_index_leaves_off_grid_bookings_to_the_database(self):
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(10) + timedelta(minutes=30),
+            end_time=self.tomorrow_at(11) + timedelta(minutes=30),
+        )
+        slot_index.rebuild_index(days_ahead=14)
+        # The bitmap marks 10:00 to 12:00, which the booking only half covers
+        self.assertEqual(
+            slot_index.busy_field_ids(
+                self.tomorrow_at(11) + timedelta(minutes=30), self.tomorrow_at(13)
+            ),
+            (set(), {self.field.id}),
+        )
+        url = reverse("available-fields")
+        for start, end, count in [
+            (self.tomorrow_at(11) + timedelta(minutes=30), self.tomorrow_at(13), 1),
+            (self.tomorrow_at(11), self.tomorrow_at(12), 0),
+        ]:
+            response = self.client.get(
+                url, {"start_time": start.isoformat(), "end_time": end.isoformat()}
+            )
+            self.assertEqual(len(response.data["results"]), count)
+
+    def test_slot_index_rebuild_keeps_bookings_refreshed_meanwhile(self):
+        slot_index.rebuild_index(days_ahead=14)
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(10),
+            end_time=self.tomorrow_at(11),
+        )
+        write_day = slot_index._write_day
+        booked = []
+
+        def book_then_write(*args):
+            # A booking commits after the rebuild read the bookings, and its
+            # refresh lands before the rebuild writes the older bitmap
+            if not booked:
+                booked.append(True)
+                with self.captureOnCommitCallbacks(execute=True):
+                    Booking.objects.create(
+                        field=self.field,
+                        user=self.user,
+                        start_time=self.tomorrow_at(18),
+                        end_time=self.tomorrow_at(19),
+                    )
+                # The index in use answered for it all along
+                self.assertEqual(
+                    slot_index.busy_field_ids(
+                        self.tomorrow_at(18), self.tomorrow_at(19)
+                    ),
+                    ({self.field.id}, set()),
+                )
+            write_day(*args)
+
+        with patch.object(slot_index, "_write_day", book_then_write):
+            slot_index.rebuild_index(days_ahead=14)
+        self.assertTrue(booked)
+        for hour in (10, 18):
+            self.assertEqual(
+                slot_index.busy_field_ids(
+                    self.tomorrow_at(hour), self.tomorrow_at(hour + 1)
+                ),
+                ({self.field.id}, set()),
+            )
+
+    def test_rebuild_slot_index_from_database(self):
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(18),
+            end_time=self.tomorrow_at(19),
+        )
+        # Nothing is read from Redis before the index is built
+        self.assertIsNone(
+            slot_index.busy_field_ids(self.tomorrow_at(18), self.tomorrow_at(20))
+        )
+        call_command("rebuild_slot_index", stdout=io.StringIO())
+        self.assertEqual(
+            slot_index.busy_field_ids(self.tomorrow_at(18), self.tomorrow_at(20)),
+            ({self.field.id}, set()),
+        )
+        self.assertEqual(
+            slot_index.busy_field_ids(self.tomorrow_at(19), self.tomorrow_at(21)),
+            (set(), set()),
+        )
+
+    def test_field_slots_calendar(self):
+        for start, end in [(10, 12), (15, 16)]:
+            Booking.objects.create(
+                field=self.field,
+                user=self.user,
+                start_time=self.tomorrow_at(start),
+                end_time=self.tomorrow_at(end),
+            )
+        # Off the grid: blocks 16:00-17:00 and 17:00-18:00 as well
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(16) + timedelta(minutes=30),
+            end_time=self.tomorrow_at(17) + timedelta(minutes=30),
+        )
+        url = reverse("field-slots", kwargs={"pk": self.field.pk})
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                url,
+                {
+                    "from": self.tomorrow_at(0).isoformat(),
+                    "to": self.tomorrow_at(23).isoformat(),
+                },
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (parse_datetime(slot["start"]), parse_datetime(slot["end"]))
+                for slot in response.data
+            ],
+            [
+                (self.tomorrow_at(a), self.tomorrow_at(b))
+                for a, b in [(8, 10), (12, 15), (18, 22)]
+            ],
+        )
+        self.assertEqual(
+            response.data,
+            FreeSlotSerializer(
+                [
+                    {
+                        "start": parse_datetime(slot["start"]),
+                        "end": parse_datetime(slot["end"]),
+                    }
+                    for slot in response.data
+                ],
+                many=True,
+            ).data,
+        )
+
+    def test_field_slots_calendar_validation(self):
+        url = reverse("field-slots", kwargs={"pk": self.field.pk})
+        response = self.client.get(
+            url,
+            {
+                "from": self.tomorrow_at(0).isoformat(),
+                "to": (self.tomorrow_at(0) + timedelta(days=40)).isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse("field-slots", kwargs={"pk": 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Defaults to the next seven days: from midday the last day's morning
+        # is in the window too, from late evening only whole days are
+        for now, days in [
+            (timezone.make_aware(datetime(2030, 1, 7, 12, 30)), 8),
+            (timezone.make_aware(datetime(2030, 1, 7, 23, 0)), 7),
+        ]:
+            with patch("django.utils.timezone.now", return_value=now):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data), days)
+
+    def test_availability_matrix(self):
+        other = FootballField.objects.create(
+            owner=self.owner,
+            name="Evening Field",
+            address="789 Soccer Rd.",
+            district=self.district,
+            contact="owner@example.com",
+            hourly_rate="50.00",
+            opening_time=time(18, 0),
+            closing_time=time(23, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.730610,
+            longitude=-73.935242,
+        )
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(10),
+            end_time=self.tomorrow_at(12),
+        )
+        Booking.objects.create(
+            field=other,
+            user=self.user,
+            start_time=self.tomorrow_at(20),
+            end_time=self.tomorrow_at(21),
+        )
+        url = reverse("availability-matrix")
+        params = {
+            "district_id": self.district.id,
+            "date": timezone.localdate(self.tomorrow_at(10)).isoformat(),
+            "slot_minutes": 60,
+        }
+        with self.assertNumQueries(3):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["slots"], 24)
+        rows = {row["name"]: row["free"] for row in response.data["fields"]}
+        self.assertEqual(rows["Test Field"], "0" * 8 + "11" + "00" + "1" * 10 + "00")
+        self.assertEqual(rows["Evening Field"], "0" * 18 + "11" + "0" + "11" + "0")
+
+        params["slot_minutes"] = 15
+        response = self.client.get(url, params)
+        self.assertEqual(len(response.data["fields"][0]["free"]), 96)
+
+        params["slot_minutes"] = 7
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_availability_check_batch(self):
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(10),
+            end_time=self.tomorrow_at(12),
+        )
+        candidates = [
+            (self.field.id, self.tomorrow_at(12), self.tomorrow_at(14)),
+            (self.field.id, self.tomorrow_at(11), self.tomorrow_at(13)),
+            (self.field.id, self.tomorrow_at(6), self.tomorrow_at(7)),
+            (
+                self.field.id,
+                self.tomorrow_at(14),
+                self.tomorrow_at(14) + timedelta(minutes=90),
+            ),
+            (self.field.id, timezone.now() - timedelta(hours=1), timezone.now()),
+            (0, self.tomorrow_at(12), self.tomorrow_at(14)),
+        ]
+        data = {
+            "items": [
+                {
+                    "field_id": field_id,
+                    "start_time": start.isoformat(),
+                    "end_time": end.isoformat(),
+                }
+                for field_id, start, end in candidates
+            ]
+        }
+        url = reverse("availability-check")
+        with self.assertNumQueries(3):
+            response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item["available"], item["code"]) for item in response.data],
+            [
+                (True, None),
+                (False, "overlap"),
+                (False, "working_hours"),
+                (False, "duration"),
+                (False, "past"),
+                (False, "not_found"),
+            ],
+        )
+        self.assertEqual(
+            response.data[1]["reason"],
+            "This field is already booked for the given time.",
+        )
+
+    def test_availability_check_limits_batch_size(self):
+        item = {
+            "field_id": self.field.id,
+            "start_time": self.tomorrow_at(12).isoformat(),
+            "end_time": self.tomorrow_at(13).isoformat(),
+        }
+        url = reverse("availability-check")
+        response = self.client.post(url, {"items": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        items = [item] * (settings.MAX_AVAILABILITY_CHECK_ITEMS + 1)
+        response = self.client.post(url, {"items": items}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.assertNumQueries(3):
+            response = self.client.post(url, {"items": items[:-1]}, format="json")
+        self.assertTrue(all(verdict["available"] for verdict in response.data))
+
+    def test_booking_conflict_suggests_alternatives(self):
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(10),
+            end_time=self.tomorrow_at(12),
+        )
+        nearby = FootballField.objects.create(
+            owner=self.owner,
+            name="Nearby Field",
+            address="125 Soccer St.",
+            district=self.district,
+            contact="owner@example.com",
+            hourly_rate="60.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.7138,
+            longitude=-74.0060,
+        )
+        other_district = District.objects.create(name="Far District", city=self.city)
+        FootballField.objects.create(
+            owner=self.owner,
+            name="Far Field",
+            address="1 Far St.",
+            district=other_district,
+            contact="owner@example.com",
+            hourly_rate="60.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.7129,
+            longitude=-74.0060,
+        )
+        Booking.objects.create(
+            field=nearby,
+            user=self.user,
+            start_time=self.tomorrow_at(11),
+            end_time=self.tomorrow_at(12),
+        )
+
+        self.client.force_authenticate(user=self.user)
+        data = {
+            "field": self.field.id,
+            "start_time": self.tomorrow_at(11).isoformat(),
+            "end_time": self.tomorrow_at(12).isoformat(),
+        }
+        # The alternatives are loaded after the booking transaction, whose
+        # locks hold up the other bookings of the field that day
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def suggest(*args):
+            depths.append(len(connection.atomic_blocks))
+            return suggest_alternatives(*args)
+
+        with patch("fields.views.suggest_alternatives", side_effect=suggest):
+            response = self.client.post(reverse("booking-list"), data, format="json")
+        self.assertEqual(depths, [depth])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(
+            "This field is already booked for the given time.",
+            response.data["non_field_errors"][0],
+        )
+        alternatives = response.data["alternatives"]
+        self.assertEqual(
+            [parse_datetime(slot["start"]) for slot in alternatives["same_field"]],
+            [self.tomorrow_at(12), self.tomorrow_at(9), self.tomorrow_at(13)],
+        )
+        self.assertEqual(len(alternatives["nearby_fields"]), 1)
+        suggestion = alternatives["nearby_fields"][0]
+        self.assertEqual(suggestion["field_id"], nearby.id)
+        self.assertEqual(parse_datetime(suggestion["start"]), self.tomorrow_at(10))
+        self.assertEqual(parse_datetime(suggestion["end"]), self.tomorrow_at(11))
+
+    def test_booking_conflict_alternatives_skip_blackouts_and_holds(self):
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(10),
+            end_time=self.tomorrow_at(12),
+        )
+        FieldBlackout.objects.create(
+            field=self.field,
+            start_time=self.tomorrow_at(12),
+            end_time=self.tomorrow_at(13),
+        )
+        nearby = FootballField.objects.create(
+            owner=self.owner,
+            name="Nearby Field",
+            address="125 Soccer St.",
+            district=self.district,
+            contact="owner@example.com",
+            hourly_rate="60.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.7138,
+            longitude=-74.0060,
+        )
+        holds.place_hold(
+            nearby.id, self.admin.pk, self.tomorrow_at(10), self.tomorrow_at(12)
+        )
+
+        self.client.force_authenticate(user=self.user)
+        data = {
+            "field": self.field.id,
+            "start_time": self.tomorrow_at(11).isoformat(),
+            "end_time": self.tomorrow_at(12).isoformat(),
+        }
+        response = self.client.post(reverse("booking-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        alternatives = response.data["alternatives"]
+        self.assertEqual(
+            [parse_datetime(slot["start"]) for slot in alternatives["same_field"]],
+            [self.tomorrow_at(9), self.tomorrow_at(13), self.tomorrow_at(8)],
+        )
+        self.assertEqual(
+            [parse_datetime(slot["start"]) for slot in alternatives["nearby_fields"]],
+            [self.tomorrow_at(12)],
+        )
+
+    def test_booking_lock_statistics_do_not_fail_bookings(self):
+        self.client.force_authenticate(user=self.user)
+        data = {
+            "field": self.field.id,
+            "start_time": self.tomorrow_at(11).isoformat(),
+            "end_time": self.tomorrow_at(12).isoformat(),
+        }
+        with patch.object(locks, "_incr", side_effect=redis.ConnectionError):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                response = self.client.post(
+                    reverse("booking-list"), data, format="json"
+                )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(
+            locks.record, [getattr(callback, "func", None) for callback in callbacks]
+        )
+
+    def test_available_fields_cache_outage_fails_no_request(self):
+        down = Mock()
+        down.configure_mock(
+            **{
+                f"{name}.side_effect": redis.ConnectionError
+                for name in ("get", "get_many", "set", "add", "incr", "delete")
+            }
+        )
+        self.client.force_authenticate(user=self.user)
+        data = {
+            "field": self.field.id,
+            "start_time": self.tomorrow_at(11).isoformat(),
+            "end_time": self.tomorrow_at(12).isoformat(),
+        }
+        with patch.object(result_cache, "cache", down), self.assertLogs(
+            "fields.result_cache", "ERROR"
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("booking-list"), data, format="json"
+                )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            response = self.client.get(
+                reverse("available-fields"),
+                {"start_time": data["start_time"], "end_time": data["end_time"]},
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+        self.assertNotIn("X-Cache", response)
+
+    def test_booking_without_conflict_has_no_alternatives(self):
+        self.client.force_authenticate(user=self.user)
+        data = {
+            "field": self.field.id,
+            "start_time": self.tomorrow_at(11).isoformat(),
+            "end_time": self.tomorrow_at(12).isoformat(),
+        }
+        response = self.client.post(reverse("booking-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("alternatives", response.data)
+
+    def test_recurring_blackout_overlap(self):
+        FieldBlackout.objects.create(
+            field=self.field,
+            start_time=self.tomorrow_at(12),
+            end_time=self.tomorrow_at(13),
+            repeat_every=timedelta(days=1),
+            repeat_until=self.tomorrow_at(12) + timedelta(days=2),
+        )
+        blackouts = FieldBlackout.objects.filter(field=self.field)
+
+        def overlaps(day, start_hour, end_hour):
+            start = self.tomorrow_at(start_hour) + timedelta(days=day)
+            end = self.tomorrow_at(end_hour) + timedelta(days=day)
+            return blackouts.overlapping(start, end).exists()
+
+        self.assertTrue(overlaps(0, 11, 13))
+        self.assertTrue(overlaps(1, 12, 13))
+        self.assertTrue(overlaps(1, 10, 14))
+        self.assertFalse(overlaps(1, 13, 14))
+        self.assertFalse(overlaps(1, 10, 12))
+        # The third occurrence would start at repeat_until
+        self.assertFalse(overlaps(2, 12, 13))
+
+    def test_blackout_blocks_bookings_and_available_fields(self):
+        FieldBlackout.objects.create(
+            field=self.field,
+            start_time=self.tomorrow_at(10),
+            end_time=self.tomorrow_at(12),
+            reason="Turf replacement",
+        )
+        self.client.force_authenticate(user=self.user)
+        data = {
+            "field": self.field.id,
+            "start_time": self.tomorrow_at(11).isoformat(),
+            "end_time": self.tomorrow_at(12).isoformat(),
+        }
+        response = self.client.post(reverse("booking-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(
+            "This field is closed for maintenance at the given time.",
+            response.data["non_field_errors"][0],
+        )
+        # A booking checks the blackouts once, when it is saved
+        data["start_time"] = self.tomorrow_at(20).isoformat()
+        data["end_time"] = self.tomorrow_at(21).isoformat()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("booking-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            len([q for q in queries if 'FROM "fields_fieldblackout"' in q["sql"]]), 1
+        )
+
+        url = reverse("available-fields")
+        response = self.client.get(
+            url,
+            {
+                "start_time": self.tomorrow_at(11).isoformat(),
+                "end_time": self.tomorrow_at(12).isoformat(),
+            },
+        )
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(
+            url,
+            {
+                "start_time": self.tomorrow_at(12).isoformat(),
+                "end_time": self.tomorrow_at(13).isoformat(),
+            },
+        )
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_blackouts_are_busy_on_every_availability_surface(self):
+        self.field.opening_time = time(0, 0)
+        self.field.closing_time = time(23, 0)
+        self.field.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            # Every hour on the hour, for the first half hour
+            FieldBlackout.objects.create(
+                field=self.field,
+                start_time=self.tomorrow_at(0) - timedelta(days=1),
+                end_time=self.tomorrow_at(0) - timedelta(days=1, minutes=-30),
+                repeat_every=timedelta(hours=1),
+                repeat_until=self.tomorrow_at(12),
+            )
+        self.field.refresh_from_db()
+        self.assertEqual(self.field.next_available_start, self.tomorrow_at(12))
+
+        response = self.client.get(
+            reverse("field-slots", kwargs={"pk": self.field.pk}),
+            {
+                "from": self.tomorrow_at(0).isoformat(),
+                "to": self.tomorrow_at(23).isoformat(),
+            },
+        )
+        self.assertEqual(
+            [parse_datetime(slot["start"]) for slot in response.data],
+            [self.tomorrow_at(12)],
+        )
+
+        response = self.client.post(
+            reverse("availability-check"),
+            {
+                "items": [
+                    {
+                        "field_id": self.field.id,
+                        "start_time": self.tomorrow_at(hour).isoformat(),
+                        "end_time": self.tomorrow_at(hour + 1).isoformat(),
+                    }
+                    for hour in (11, 12)
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(
+            [(item["available"], item["code"]) for item in response.data],
+            [(False, "blackout"), (True, None)],
+        )
+
+        response = self.client.get(
+            reverse("availability-matrix"),
+            {
+                "district_id": self.district.id,
+                "date": timezone.localdate(self.tomorrow_at(0)).isoformat(),
+                "slot_minutes": 30,
+            },
+        )
+        free = response.data["fields"][0]["free"]
+        self.assertEqual(free, "01" * 12 + "1" * 22 + "00")
+
+    def test_owner_bulk_updates_fields_and_adds_blackouts(self):
+        second = FootballField.objects.create(
+            owner=self.owner,
+            name="Second Field",
+            address="456 Soccer St.",
+            district=self.district,
+            contact="owner@example.com",
+            hourly_rate="70.00",
+            opening_time=time(9, 0),
+            closing_time=time(21, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.7138,
+            longitude=-74.0060,
+        )
+        url = reverse("field-bulk")
+        data = {
+            "field_ids": [self.field.id, second.id],
+            "hourly_rate": "80.00",
+            "closing_time": "20:00",
+            "blackouts": [
+                {
+                    "start_time": self.tomorrow_at(8).isoformat(),
+                    "end_time": self.tomorrow_at(10).isoformat(),
+                    "repeat_every": "7 00:00:00",
+                    "reason": "Weekly maintenance",
+                }
+            ],
+        }
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(len(response.data["blackouts"]), 2)
+        self.assertEqual(
+            set(FootballField.objects.values_list("hourly_rate", "closing_time")),
+            {(Decimal("80.00"), time(20, 0))},
+        )
+        next_week = self.tomorrow_at(9) + timedelta(days=7)
+        self.assertEqual(
+            FieldBlackout.objects.overlapping(
+                next_week, next_week + timedelta(hours=1)
+            ).count(),
+            2,
+        )
+
+        other_owner = User.objects.create_user(
+            phone_number="+14155552674",
+            first_name="Other",
+            last_name="Owner",
+            password="OwnerPassword123",
+            role="owner",
+        )
+        self.client.force_authenticate(user=other_owner)
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("field_ids", response.data)
+
+    def test_bulk_update_rejects_invalid_changes(self):
+        url = reverse("field-bulk")
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.post(url, {"field_ids": [self.field.id]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            url,
+            {"field_ids": [self.field.id], "opening_time": "23:00"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            url,
+            {
+                "field_ids": [self.field.id],
+                "blackouts": [
+                    {
+                        "start_time": self.tomorrow_at(8).isoformat(),
+                        "end_time": self.tomorrow_at(10).isoformat(),
+                        "repeat_every": "01:00:00",
+                    }
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(FieldBlackout.objects.exists())
+
+    def test_weekday_hours_are_checked_with_the_mask(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        day_after = tomorrow + timedelta(days=1)
+        self.field.weekly_hours = {
+            str(tomorrow.weekday()): ["10:00", "14:00"],
+            str(day_after.weekday()): None,
+        }
+        self.field.save()
+        self.field.refresh_from_db()
+        self.assertEqual(
+            self.field.hours_mask[tomorrow.weekday()], ((1 << 28) - 1) ^ ((1 << 20) - 1)
+        )
+        self.assertEqual(self.field.hours_mask[day_after.weekday()], 0)
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse("booking-list")
+        for start_hour, expected in [
+            (9, status.HTTP_400_BAD_REQUEST),
+            (14, status.HTTP_400_BAD_REQUEST),
+            (13, status.HTTP_201_CREATED),
+        ]:
+            data = {
+                "field": self.field.id,
+                "start_time": self.tomorrow_at(start_hour).isoformat(),
+                "end_time": self.tomorrow_at(start_hour + 1).isoformat(),
+            }
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, expected)
+
+        params = {
+            "start_time": self.tomorrow_at(10).isoformat(),
+            "end_time": self.tomorrow_at(12).isoformat(),
+        }
+        response = self.client.get(reverse("available-fields"), params)
+        self.assertEqual(len(response.data["results"]), 1)
+        params = {
+            "start_time": (self.tomorrow_at(10) + timedelta(days=1)).isoformat(),
+            "end_time": (self.tomorrow_at(12) + timedelta(days=1)).isoformat(),
+        }
+        response = self.client.get(reverse("available-fields"), params)
+        self.assertEqual(response.data["results"], [])
+        # Evening slots are past the 32nd bit of the mask
+        params = {
+            "start_time": (self.tomorrow_at(20) + timedelta(days=2)).isoformat(),
+            "end_time": (self.tomorrow_at(21) + timedelta(days=2)).isoformat(),
+        }
+        response = self.client.get(reverse("available-fields"), params)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        response = self.client.get(
+            reverse("field-slots", args=[self.field.id]),
+            {
+                "from": self.tomorrow_at(0).isoformat(),
+                "to": (self.tomorrow_at(0) + timedelta(days=2)).isoformat(),
+            },
+        )
+        self.assertEqual(
+            [
+                (parse_datetime(slot["start"]), parse_datetime(slot["end"]))
+                for slot in response.data
+            ],
+            [(self.tomorrow_at(10), self.tomorrow_at(13))],
+        )
+
+    def test_opening_hours_must_be_on_the_half_hour_grid(self):
+        self.client.force_authenticate(user=self.owner)
+        url = reverse("field-detail", args=[self.field.id])
+        response = self.client.patch(url, {"opening_time": "08:15"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(
+            url, {"weekly_hours": {"7": ["10:00", "12:00"]}}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(
+            url, {"weekly_hours": {"5": ["12:00", "10:00"]}}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(
+            url, {"weekly_hours": {"5": ["10:30", "23:30"], "6": None}}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["weekly_hours"]["6"], None)
+
+        # Fields saved with off-grid hours before the grid existed can
+        # still be edited without touching their hours
+        FootballField.objects.filter(pk=self.field.pk).update(opening_time=time(9, 15))
+        response = self.client.patch(url, {"name": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(url, {"closing_time": "08:00"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_available_fields_results_are_cached_per_normalised_query(self):
+        url = reverse("available-fields")
+        params = {
+            "start_time": self.tomorrow_at(18).isoformat(),
+            "end_time": self.tomorrow_at(19).isoformat(),
+            "latitude": "40.71281",
+            "longitude": "-74.00602",
+        }
+        result_cache.reset_stats()
+        response = self.client.get(url, params)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 1)
+
+        # The same place and times written differently, with the parameters
+        # in another order, is the same query
+        offset = timezone.get_fixed_timezone(300)
+        same = {
+            "longitude": "-74.006020",
+            "latitude": "40.71281",
+            "end_time": self.tomorrow_at(19).astimezone(offset).isoformat(),
+            "start_time": self.tomorrow_at(18).astimezone(offset).isoformat(),
+            "radius_km": "",
+        }
+        with self.assertNumQueries(0):
+            response = self.client.get(url, same)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(len(response.data["results"]), 1)
+
+        # Bookings on another day leave the entry alone
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                field=self.field,
+                user=self.user,
+                start_time=self.tomorrow_at(18) + timedelta(days=1),
+                end_time=self.tomorrow_at(19) + timedelta(days=1),
+            )
+        self.assertEqual(self.client.get(url, params)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                field=self.field,
+                user=self.user,
+                start_time=self.tomorrow_at(18),
+                end_time=self.tomorrow_at(19),
+            )
+        response = self.client.get(url, params)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"], [])
+        # Each miss also missed the candidates of the proximity search
+        self.assertEqual(result_cache.get_stats(), {"hit": 2, "miss": 4, "early": 0})
+
+    def test_nearby_searches_share_candidates_and_keep_exact_distances(self):
+        # About 445 m north of the test field
+        FootballField.objects.create(
+            owner=self.owner,
+            name="North Field",
+            address="1 North St.",
+            district=self.district,
+            contact="owner@example.com",
+            hourly_rate="50.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            min_booking_duration=timedelta(hours=1),
+            latitude=40.7168,
+            longitude=-74.0060,
+        )
+        url = reverse("available-fields")
+        params = {
+            "start_time": self.tomorrow_at(18).isoformat(),
+            "end_time": self.tomorrow_at(19).isoformat(),
+            "latitude": "40.71281",
+            "longitude": "-74.00602",
+            "radius_km": "0.4",
+        }
+        result_cache.reset_stats()
+        response = self.client.get(url, params)
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], [self.field.id]
+        )
+
+        # Ten metres away the exact results differ, but the fields free in
+        # the window are the cached ones
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {**params, "latitude": "40.7129"})
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], [self.field.id]
+        )
+        self.assertFalse([query for query in queries if '"period" &&' in query["sql"]])
+        self.assertEqual(result_cache.get_stats(), {"hit": 1, "miss": 3, "early": 0})
+
+    def test_cache_miss_is_computed_by_one_reader(self):
+        key = f"{result_cache.KEY_PREFIX}:result:single-flight"
+        self.addCleanup(cache.delete_many, [key, f"{key}:lock"])
+        # Another reader holds the lock and stores the value meanwhile
+        cache.add(f"{key}:lock", 1)
+
+        def store(seconds):
+            cache.set(key, ("theirs", 0.1, time_module.time() + 60), 60)
+
+        with patch.object(result_cache.time, "sleep", side_effect=store):
+            value, outcome = result_cache.fetch(key, lambda: "ours", 60)
+        self.assertEqual((value, outcome), ("theirs", "hit"))
+
+        cache.delete_many([key, f"{key}:lock"])
+        value, outcome = result_cache.fetch(key, lambda: "ours", 60)
+        self.assertEqual((value, outcome), ("ours", "miss"))
+        self.assertIsNone(cache.get(f"{key}:lock"))
+
+    def test_field_changes_invalidate_cached_results_of_their_district(self):
+        other_district = District.objects.create(name="Other District", city=self.city)
+        url = reverse("available-fields")
+        self.client.get(url, {"district_id": self.district.id})
+        self.client.get(url, {"district_id": other_district.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.field.hourly_rate = Decimal("65.00")
+            self.field.save()
+        response = self.client.get(url, {"district_id": self.district.id})
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["hourly_rate"], "65.00")
+        response = self.client.get(url, {"district_id": other_district.id})
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_normalize_query_keeps_exact_times_and_coordinates(self):
+        params = QueryDict(
+            "start_time=2030-01-01T23:05:00%2B05:00&end_time=2030-01-01T18:40:00Z"
+            "&latitude=40.712810&radius_km=&district_id=3&district_id=4"
+        )
+        self.assertEqual(
+            result_cache.normalize_query(params).urlencode(safe=":+"),
+            "district_id=4&end_time=2030-01-01T18:40:00+00:00&latitude=40.71281"
+            "&start_time=2030-01-01T18:05:00+00:00",
+        )
+
+    def test_cached_results_match_off_grid_windows_exactly(self):
+        # Bookings need not start on the half hour
+        Booking.objects.create(
+            field=self.field,
+            user=self.user,
+            start_time=self.tomorrow_at(11) + timedelta(minutes=15),
+            end_time=self.tomorrow_at(12) + timedelta(minutes=15),
+        )
+        url = reverse("available-fields")
+        before = {
+            "start_time": (self.tomorrow_at(10) + timedelta(minutes=15)).isoformat(),
+            "end_time": (self.tomorrow_at(11) + timedelta(minutes=15)).isoformat(),
+        }
+        widened = {
+            "start_time": self.tomorrow_at(10).isoformat(),
+            "end_time": (self.tomorrow_at(11) + timedelta(minutes=30)).isoformat(),
+        }
+        for _ in range(2):
+            self.assertEqual(len(self.client.get(url, before).data["results"]), 1)
+            self.assertEqual(self.client.get(url, widened).data["results"], [])
+        self.assertEqual(result_cache.get_stats()["hit"], 2)
+
+    def test_booking_changes_publish_slot_deltas(self):
+        pubsub = live.redis_instance.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(live.district_channel(self.district.id))
+        pubsub.get_message(timeout=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                field=self.field,
+                user=self.user,
+                start_time=self.tomorrow_at(10),
+                end_time=self.tomorrow_at(12),
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+
+        events = [pubsub.get_message(timeout=1) for _ in range(2)]
+        pubsub.close()
+        deltas = [json.loads(event["data"]) for event in events]
+        self.assertEqual([delta["event"] for delta in deltas], ["booked", "released"])
+        self.assertEqual(deltas[0]["field_id"], self.field.id)
+        self.assertEqual(
+            [parse_datetime(slot["start"]) for slot in deltas[0]["slots"]],
+            [self.tomorrow_at(10), self.tomorrow_at(11)],
+        )
+
+    async def test_live_availability_streams_deltas(self):
+        url = reverse("availability-live")
+        response = await self.async_client.get(url, {"field_id": self.field.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+
+        delta = live.booking_delta(
+            "booked", self.field, self.tomorrow_at(10), self.tomorrow_at(11)
+        )
+        await sync_to_async(live.publish_delta)(delta)
+        event = (await anext(stream)).decode()
+        await stream.aclose()
+        self.assertTrue(event.startswith("event: booked\ndata: "), event)
+        data = json.loads(event.split("data: ", 1)[1])
+        self.assertEqual(data["field_id"], self.field.id)
+        self.assertEqual(len(data["slots"]), 1)
+
+    async def test_live_availability_validates_the_subscription(self):
+        url = reverse("availability-live")
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.async_client.get(url, {"field_id": 0})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_sync_without_cursor_returns_everything(self):
+        response = self.client.get(reverse("sync"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["full"])
+        self.assertEqual(
+            [row["id"] for row in response.data["regions"]], [self.region.id]
+        )
+        self.assertEqual(
+            [(row["id"], row["district_id"]) for row in response.data["fields"]],
+            [(self.field.id, self.district.id)],
+        )
+        self.assertNotIn("next_available_start", response.data["fields"][0])
+        self.assertEqual(response.data["deleted"]["fields"], [])
+
+        response = self.client.get(reverse("sync"), {"updated_since": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_returns_changes_and_deletes_since_cursor(self):
+        other = FootballField.objects.create(
+            owner=self.owner,
+            name="Other Field",
+            address="Other Address",
+            district=self.district,
+            contact="1234567890",
+            hourly_rate=Decimal("100.00"),
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            latitude=Decimal("41.300000"),
+            longitude=Decimal("69.250000"),
+        )
+        since = timezone.now()
+        self.field.hourly_rate = Decimal("150.00")
+        self.field.save()
+        other_id = other.id
+        other.delete()
+        self.city.name = "Renamed City"
+        self.city.save()
+
+        response = self.client.get(
+            reverse("sync"), {"updated_since": since.isoformat()}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["full"])
+        self.assertEqual(response.data["regions"], [])
+        self.assertEqual(
+            [row["name"] for row in response.data["cities"]], ["Renamed City"]
+        )
+        self.assertEqual(
+            [(row["id"], row["hourly_rate"]) for row in response.data["fields"]],
+            [(self.field.id, "150.00")],
+        )
+        self.assertEqual(response.data["deleted"]["fields"], [other_id])
+        # The cursor trails the clock, so the next sync overlaps this one
+        cursor = parse_datetime(response.data["cursor"])
+        self.assertLessEqual(
+            cursor, timezone.now() - timedelta(seconds=settings.SYNC_CURSOR_LAG_SECONDS)
+        )
+
+    def test_sync_cursor_older_than_tombstones_is_a_full_sync(self):
+        since = timezone.now() - settings.SYNC_TOMBSTONE_RETENTION - timedelta(days=1)
+        response = self.client.get(
+            reverse("sync"), {"updated_since": since.isoformat()}
+        )
+        self.assertTrue(response.data["full"])
+        self.assertEqual(len(response.data["fields"]), 1)
+
+    def test_sync_pages_through_every_collection(self):
+        since = timezone.now()
+        for i in range(4):
+            FootballField.objects.create(
+                owner=self.owner,
+                name=f"Paged Field {i}",
+                address="Paged Address",
+                district=self.district,
+                contact="1234567890",
+                hourly_rate=Decimal("100.00"),
+                opening_time=time(8, 0),
+                closing_time=time(22, 0),
+                latitude=Decimal("41.300000"),
+                longitude=Decimal("69.250000"),
+            ).delete()
+
+        pages = []
+        params = {"limit": 3}
+        while True:
+            response = self.client.get(reverse("sync"), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            if not response.data["has_more"]:
+                break
+            params = {"limit": 3, "page": response.data["next"]}
+        self.assertEqual(len(pages), 1)
+        self.assertIsNone(pages[0]["next"])
+
+        pages = []
+        params = {"updated_since": since.isoformat(), "limit": 3}
+        while True:
+            response = self.client.get(reverse("sync"), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            if not response.data["has_more"]:
+                break
+            params = {"limit": 3, "page": response.data["next"]}
+        self.assertEqual(len(pages), 2)
+        self.assertEqual({page["cursor"] for page in pages}, {pages[0]["cursor"]})
+        self.assertFalse(any(page["full"] for page in pages))
+        deleted = [i for page in pages for i in page["deleted"]["fields"]]
+        self.assertEqual(len(deleted), 4)
+        self.assertEqual(len(set(deleted)), 4)
+        self.assertEqual(pages[1]["cities"], [])
+
+        response = self.client.get(reverse("sync"), {"page": "not-a-page"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_marks_fields_updated(self):
+        before = self.field.updated_at
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.post(
+            reverse("field-bulk"),
+            {"field_ids": [self.field.id], "hourly_rate": "120.00"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.field.refresh_from_db()
+        self.assertGreater(self.field.updated_at, before)
+
+    def test_overlap_constraint_rejects_overlapping_bookings(self):
+        def booking(start_hour, end_hour):
+            return Booking(
+                field=self.field,
+                user=self.user,
+                start_time=self.tomorrow_at(start_hour),
+                end_time=self.tomorrow_at(end_hour),
+            )
+
+        # bulk_create() skips Booking.save(), so only the constraint checks it
+        Booking.objects.bulk_create([booking(10, 12), booking(12, 13)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Booking.objects.bulk_create([booking(11, 12)])
+
+        # save() reports it as a validation error, in a savepoint
+        with self.assertRaises(ValidationError) as raised:
+            booking(9, 11).save()
+        self.assertEqual(raised.exception.code, "overlap")
+        self.assertEqual(Booking.objects.filter(field=self.field).count(), 2)
+        self.assertTrue(
+            Booking.objects.filter(
+                period__overlap=(self.tomorrow_at(11), self.tomorrow_at(12))
+            ).exists()
+        )
+
+    def hold(self, user, start_hour, end_hour):
+        self.client.force_authenticate(user=user)
+        return self.client.post(
+            reverse("hold-list"),
+            {
+                "field": self.field.id,
+                "start_time": self.tomorrow_at(start_hour).isoformat(),
+                "end_time": self.tomorrow_at(end_hour).isoformat(),
+            },
+            format="json",
+        )
+
+    def test_slot_hold_blocks_other_users(self):
+        response = self.hold(self.user, 10, 12)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        hold_id = response.data["id"]
+        self.assertIsNotNone(parse_datetime(response.data["expires_at"]))
+
+        # Another user can neither hold nor book an overlapping slot
+        response = self.hold(self.admin, 11, 13)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["non_field_errors"], [holds.HELD_MESSAGE])
+        response = self.client.post(
+            reverse("booking-list"),
+            {
+                "field": self.field.id,
+                "start_time": self.tomorrow_at(11).isoformat(),
+                "end_time": self.tomorrow_at(12).isoformat(),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.hold(self.admin, 12, 13).status_code, status.HTTP_201_CREATED
+        )
+
+        # Nor release it
+        url = reverse("hold-detail", args=[hold_id])
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(
+            self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT
+        )
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            self.hold(self.admin, 10, 11).status_code, status.HTTP_201_CREATED
+        )
+
+    def test_booking_a_held_slot_releases_the_hold(self):
+        self.assertEqual(
+            self.hold(self.user, 10, 12).status_code, status.HTTP_201_CREATED
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("booking-list"),
+                {
+                    "field": self.field.id,
+                    "start_time": self.tomorrow_at(10).isoformat(),
+                    "end_time": self.tomorrow_at(12).isoformat(),
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(
+            holds.is_held(self.field.id, self.tomorrow_at(10), self.tomorrow_at(12))
+        )
+
+    def test_available_fields_leave_out_held_fields(self):
+        url = reverse("available-fields")
+        params = {
+            "start_time": self.tomorrow_at(10).isoformat(),
+            "end_time": self.tomorrow_at(11).isoformat(),
+        }
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url, params)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        self.assertEqual(
+            self.hold(self.admin, 10, 12).status_code, status.HTTP_201_CREATED
+        )
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url, params)
+        self.assertEqual(response.data["results"], [])
+        # Held fields are kept per day
+        self.assertEqual(
+            holds.held_field_ids(
+                self.tomorrow_at(10) + timedelta(days=1),
+                self.tomorrow_at(11) + timedelta(days=1),
+            ),
+            set(),
+        )
+
+    @override_settings(SLOT_HOLD_MAX_ACTIVE=2, SLOT_HOLDS_PER_HOUR=3)
+    def test_slot_holds_are_limited_per_user(self):
+        first = self.hold(self.user, 10, 11)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.hold(self.user, 12, 13).status_code, status.HTTP_201_CREATED
+        )
+        response = self.hold(self.user, 14, 15)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        # Other users are not limited by this user's holds
+        self.assertEqual(
+            self.hold(self.admin, 14, 15).status_code, status.HTTP_201_CREATED
+        )
+
+        self.client.force_authenticate(user=self.user)
+        self.client.delete(reverse("hold-detail", args=[first.data["id"]]))
+        response = self.hold(self.user, 16, 17)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.delete(reverse("hold-detail", args=[response.data["id"]]))
+        # Released holds still count towards the hourly limit
+        response = self.hold(self.user, 18, 19)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        with patch.object(holds, "PLACE_SCRIPT", side_effect=redis.ConnectionError):
+            response = self.hold(self.admin, 18, 19)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def post_booking(self, key, start_hour):
+        self.client.force_authenticate(user=self.user)
+        return self.client.post(
+            reverse("booking-list"),
+            {
+                "field": self.field.id,
+                "start_time": self.tomorrow_at(start_hour).isoformat(),
+                "end_time": self.tomorrow_at(start_hour + 1).isoformat(),
+            },
+            format="json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def test_booking_retry_with_idempotency_key_is_replayed(self):
+        key = uuid.uuid4().hex
+        first = self.post_booking(key, 10)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", first)
+
+        # force_authenticate() skips the user lookup of a token
+        with self.assertNumQueries(0):
+            retry = self.post_booking(key, 10)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(Booking.objects.filter(field=self.field).count(), 1)
+
+        response = self.post_booking(key, 12)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        # Without a key the same booking is a conflict
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.post_booking("", 10).status_code, 400)
+
+    def test_concurrent_duplicate_waits_for_the_first_response(self):
+        key = uuid.uuid4().hex
+        fingerprint = idempotency._fingerprint(
+            {
+                "field": self.field.id,
+                "start_time": self.tomorrow_at(10).isoformat(),
+                "end_time": self.tomorrow_at(11).isoformat(),
+            }
+        )
+        redis_key = idempotency._key(self.user.pk, key)
+        idempotency.redis_instance.set(
+            redis_key, json.dumps({"state": "pending", "fingerprint": fingerprint})
+        )
+
+        with override_settings(IDEMPOTENCY_WAIT_SECONDS=0):
+            response = self.post_booking(key, 10)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        done = {
+            "state": "done",
+            "fingerprint": fingerprint,
+            "status": 201,
+            "data": {"id": 42},
+        }
+        finish = threading.Timer(
+            0.2, idempotency.redis_instance.set, [redis_key, json.dumps(done)]
+        )
+        finish.start()
+        response = self.post_booking(key, 10)
+        finish.join()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"id": 42})
+        self.assertFalse(Booking.objects.exists())
+
+    def post_series(self, **data):
+        self.client.force_authenticate(user=self.user)
+        return self.client.post(
+            reverse("booking-series"),
+            {
+                "field": self.field.id,
+                "start_time": self.tomorrow_at(18).isoformat(),
+                "end_time": self.tomorrow_at(20).isoformat(),
+                "frequency": "weekly",
+                **data,
+            },
+            format="json",
+        )
+
+    def test_booking_series_modes(self):
+        week = timedelta(days=7)
+        Booking.objects.create(
+            field=self.field,
+            user=self.admin,
+            start_time=self.tomorrow_at(19) + 2 * week,
+            end_time=self.tomorrow_at(20) + 2 * week,
+        )
+
+        response = self.post_series(count=4)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [
+                (parse_datetime(c["start_time"]), c["code"])
+                for c in response.data["conflicts"]
+            ],
+            [(self.tomorrow_at(18) + 2 * week, "overlap")],
+        )
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_series(count=4, mode="skip_conflicts")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [parse_datetime(b["start_time"]) for b in response.data["bookings"]],
+            [self.tomorrow_at(18) + i * week for i in (0, 1, 3)],
+        )
+        self.assertEqual(len(response.data["conflicts"]), 1)
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 3)
+
+    def test_booking_series_reads_bookings_once(self):
+        def booking_queries(count, week_offset):
+            start = self.tomorrow_at(10) + timedelta(days=7 * week_offset)
+            with CaptureQueriesContext(connection) as context:
+                response = self.post_series(
+                    count=count,
+                    start_time=start.isoformat(),
+                    end_time=(start + timedelta(hours=1)).isoformat(),
+                )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(response.data["bookings"]), count)
+            return [
+                query["sql"].split()[0]
+                for query in context.captured_queries
+                if '"fields_booking"' in query["sql"]
+            ]
+
+        # One range query for the conflicts and one insert, however long
+        self.assertEqual(booking_queries(2, 0), ["SELECT", "INSERT"])
+        self.assertEqual(booking_queries(10, 2), ["SELECT", "INSERT"])
+
+    def test_booking_series_skips_blackouts_and_validates_the_range(self):
+        FieldBlackout.objects.create(
+            field=self.field,
+            start_time=self.tomorrow_at(17) + timedelta(days=1),
+            end_time=self.tomorrow_at(19) + timedelta(days=1),
+            repeat_every=timedelta(days=3),
+        )
+        response = self.post_series(
+            frequency="daily",
+            until=(self.tomorrow_at(18) + timedelta(days=5)).isoformat(),
+            mode="skip_conflicts",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["bookings"]), 3)
+        self.assertEqual(
+            [c["code"] for c in response.data["conflicts"]], ["blackout", "blackout"]
+        )
+
+        response = self.post_series(count=2, until=self.tomorrow_at(20).isoformat())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post_series(
+            frequency="daily",
+            until=(self.tomorrow_at(18) + timedelta(days=365)).isoformat(),
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@tag("slow")
+class FieldSearchPlanTests(APITestCase):
+    """
+    The combined search must be answered from indexes at catalogue scale:
+    EXPLAIN of every query the endpoint runs has no sequential scan on the
+    field or booking tables. Seeding the catalogue is slow, so these only
+    run with `manage.py test --tag slow`.
+    """
+
+    FIELD_COUNT = 100_000
+    DISTRICT_COUNT = 50
+
+    def setUp(self):
+        cache.clear()
+        slot_index.clear_index()
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(
+            phone_number="+14155552674", password="OwnerPassword123", role="owner"
+        )
+        region = Region.objects.create(name="Plan Region")
+        city = City.objects.create(name="Plan City", region=region)
+        cls.districts = District.objects.bulk_create(
+            District(name=f"Plan District {i}", city=city)
+            for i in range(cls.DISTRICT_COUNT)
+        )
+        fields = []
+        for i in range(1, cls.FIELD_COUNT + 1):
+            field = FootballField(
+                owner=owner,
+                name=f"Field {i}",
+                address=f"Street {i}",
+                district=cls.districts[i % cls.DISTRICT_COUNT],
+                contact="owner@example.com",
+                hourly_rate=Decimal(20000 + (i * 7919) % 400000),
+                opening_time=time(6 + i % 6),
+                closing_time=time(23),
+                min_booking_duration=timedelta(hours=1),
+                latitude=Decimal(f"{41 + (i % 1000) / 1000:.6f}"),
+                longitude=Decimal(f"{69 + (i // 1000) / 200:.6f}"),
+            )
+            # bulk_create() skips save(), so derived columns are filled in here
+            field.refresh_derived_fields()
+            fields.append(field)
+        fields = FootballField.objects.bulk_create(fields, batch_size=5_000)
+        # One booking tomorrow morning on every tenth field
+        start = timezone.now().replace(hour=9, minute=0) + timedelta(days=1)
+        Booking.objects.bulk_create(
+            (
+                Booking(
+                    field=field,
+                    user=owner,
+                    start_time=start,
+                    end_time=start + timedelta(hours=1),
+                )
+                for field in fields[9::10]
+            ),
+            batch_size=5_000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE fields_footballfield, fields_booking")
+
+    def assertNoSeqScans(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("available-fields"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["results"])
+
+        statements = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT")
+            and 'FROM "fields_footballfield"' in query["sql"]
+        ]
+        self.assertTrue(statements)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(f"EXPLAIN {sql}")
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                for table in ("fields_footballfield", "fields_booking"):
+                    self.assertNotIn(f"Seq Scan on {table}", plan, msg=plan)
+
+    def test_district_and_price_range_sorted_by_price(self):
+        self.assertNoSeqScans(
+            {
+                "district_id": self.districts[7].pk,
+                "min_price": 100000,
+                "max_price": 150000,
+                "ordering": "price",
+            }
+        )
+
+    def test_price_range_sorted_by_price_descending(self):
+        self.assertNoSeqScans(
+            {"min_price": 300000, "max_price": 350000, "ordering": "-price"}
+        )
+
+    def test_district_open_and_free_in_time_window(self):
+        start = timezone.now().replace(hour=9, minute=0) + timedelta(days=1)
+        self.assertNoSeqScans(
+            {
+                "district_id": self.districts[3].pk,
+                "open_at": "07:30",
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(hours=1)).isoformat(),
+            }
+        )
+
+    def test_nearby_within_budget_sorted_by_distance(self):
+        self.assertNoSeqScans(
+            {
+                "latitude": 41.5,
+                "longitude": 69.25,
+                "radius_km": 2,
+                "max_price": 200000,
+                "ordering": "distance",
+            }
+        )
+
+    def test_sorted_by_creation_time(self):
+        self.assertNoSeqScans({"ordering": "created_at"})
+
+
+class BookingLockTests(TransactionTestCase):
+    """
+    Bookings of a field are serialised per day: committing transactions in
+    threads, one day's bookings wait for each other while another day's go
+    ahead.
+    """
+
+    def setUp(self):
+        cache.clear()
+        slot_index.clear_index()
+        locks.reset_stats()
+        owner = User.objects.create_user(
+            phone_number="+14155552672", password="OwnerPassword123", role="owner"
+        )
+        self.user = User.objects.create_user(
+            phone_number="+14155552671", password="UserPassword123", role="user"
+        )
+        region = Region.objects.create(name="Lock Region")
+        city = City.objects.create(name="Lock City", region=region)
+        district = District.objects.create(name="Lock District", city=city)
+        self.field = FootballField.objects.create(
+            owner=owner,
+            name="Lock Field",
+            address="1 Lock St.",
+            district=district,
+            contact="owner@example.com",
+            hourly_rate="50.00",
+            opening_time=time(8, 0),
+            closing_time=time(22, 0),
+            latitude=41.3,
+            longitude=69.2,
+        )
+
+    def at(self, days, hour):
+        day = timezone.localdate() + timedelta(days=days)
+        return timezone.make_aware(datetime.combine(day, time(hour, 0)))
+
+    def book(self, days, hour, results):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        try:
+            response = client.post(
+                reverse("booking-list"),
+                {
+                    "field": self.field.id,
+                    "start_time": self.at(days, hour).isoformat(),
+                    "end_time": self.at(days, hour + 1).isoformat(),
+                },
+                format="json",
+            )
+            results.append(response.status_code)
+        finally:
+            connection.close()
+
+    def hold_day(self, days, held, release):
+        try:
+            with transaction.atomic():
+                locks.lock_field_days(
+                    [(self.field.id, self.at(days, 10), self.at(days, 11))]
+                )
+                held.set()
+                release.wait(10)
+        finally:
+            connection.close()
+
+    def test_bookings_wait_only_for_the_same_day(self):
+        held, release = threading.Event(), threading.Event()
+        holder = threading.Thread(target=self.hold_day, args=(1, held, release))
+        holder.start()
+        self.assertTrue(held.wait(10))
+
+        # Another day is not blocked by the held one
+        results = []
+        other_day = threading.Thread(target=self.book, args=(2, 10, results))
+        other_day.start()
+        other_day.join(10)
+        self.assertFalse(other_day.is_alive())
+        self.assertEqual(results, [status.HTTP_201_CREATED])
+
+        # The same day waits until the holder commits
+        same_day = threading.Thread(target=self.book, args=(1, 12, results))
+        same_day.start()
+        same_day.join(0.5)
+        self.assertTrue(same_day.is_alive())
+        release.set()
+        holder.join(10)
+        same_day.join(10)
+        self.assertEqual(results, [status.HTTP_201_CREATED, status.HTTP_201_CREATED])
+
+        stats = locks.get_stats()
+        self.assertEqual(stats["acquired"], 3)
+        self.assertEqual(stats["contended"], 1)
+        self.assertGreaterEqual(stats["wait_ms"], 400)
+
+    def test_spanned_days_lock_keys_are_distinct(self):
+        start = self.at(1, 22)
+        days = locks.spanned_days(start, start + timedelta(hours=3))
+        self.assertEqual(len(days), 2)
+        self.assertEqual(len({locks.lock_key(self.field.id, day) for day in days}), 2)
+        self.assertEqual(locks.spanned_days(start, self.at(2, 0)), days[:1])
@@ -0,0 +1,108 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count
+from django.db.models.functions import Substr
+
+from .geo import GEOHASH_PRECISION, geohash_cell_width, tile_bounds, tile_for_point
+from .models import FootballField
+
+MAX_TILE_ZOOM = 20
+# Tiles up to this zoom return clustered marker counts instead of fields
+CLUSTER_MAX_ZOOM = 13
+# Roughly how many geohash cells span the width of a clustered tile
+CLUSTER_CELLS_PER_TILE = 8
+
+
+def tile_cache_key(z, x, y):
+    return f"field_tile:{z}:{x}:{y}"
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def cluster_precision(z):
+    """Length of the geohash prefix used to cluster fields at zoom z."""
+    tile_width = 360.0 / 2**z
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        if geohash_cell_width(precision) <= tile_width / CLUSTER_CELLS_PER_TILE:
+            return precision
+    return GEOHASH_PRECISION
+
+
+def tile_queryset(z, x, y):
+    min_lat, max_lat, min_lon, max_lon = tile_bounds(z, x, y)
+    return FootballField.objects.filter(
+        lat_rad__gte=math.radians(min_lat),
+        lat_rad__lt=math.radians(max_lat),
+        lon_rad__gte=math.radians(min_lon),
+        lon_rad__lt=math.radians(max_lon),
+    )
+
+
+def build_tile(z, x, y):
+    queryset = tile_queryset(z, x, y)
+
+    if z <= CLUSTER_MAX_ZOOM:
+        clusters = (
+            queryset.annotate(cell=Substr("geohash", 1, cluster_precision(z)))
+            .values("cell")
+            .annotate(count=Count("id"), lat_rad=Avg("lat_rad"), lon_rad=Avg("lon_rad"))
+            .order_by("cell")
+        )
+        return {
+            "z": z,
+            "x": x,
+            "y": y,
+            "clustered": True,
+            "clusters": [
+                {
+                    "geohash": cluster["cell"],
+                    "count": cluster["count"],
+                    "latitude": round(math.degrees(cluster["lat_rad"]), 6),
+                    "longitude": round(math.degrees(cluster["lon_rad"]), 6),
+                }
+                for cluster in clusters
+            ],
+        }
+
+    fields = queryset.order_by("id").values(
+        "id", "name", "latitude", "longitude", "hourly_rate"
+    )
+    return {
+        "z": z,
+        "x": x,
+        "y": y,
+        "clustered": False,
+        "fields": [
+            {
+                "id": field["id"],
+                "name": field["name"],
+                "latitude": float(field["latitude"]),
+                "longitude": float(field["longitude"]),
+                "hourly_rate": str(field["hourly_rate"]),
+            }
+            for field in fields
+        ],
+    }
+
+
+def get_tile(z, x, y):
+    key = tile_cache_key(z, x, y)
+    tile = cache.get(key)
+    if tile is None:
+        tile = build_tile(z, x, y)
+        cache.set(key, tile, settings.FIELD_TILE_CACHE_TIMEOUT)
+    return tile
+
+
+def invalidate_tiles(coordinates):
+    """Drop the cached tiles, at every zoom, containing the given locations."""
+    keys = {
+        tile_cache_key(z, *tile_for_point(latitude, longitude, z))
+        for latitude, longitude in coordinates
+        for z in range(MAX_TILE_ZOOM + 1)
+    }
+    cache.delete_many(list(keys))
@@ -1,19 +1,63 @@
 from django.urls import path
 
 from .views import (
+    AutocompleteView,
+    AvailabilityCheckView,
+    AvailabilityMatrixView,
     AvailableFieldsListView,
     BookingDetailView,
     BookingListCreateView,
+    BookingSeriesCreateView,
+    EarliestAvailableFieldsView,
+    FieldBulkUpdateView,
+    FieldSlotsView,
+    FieldTileView,
     FootballFieldDetailView,
     FootballFieldListCreateView,
+    LiveAvailabilityView,
+    SlotHoldCreateView,
+    SlotHoldDetailView,
+    SyncView,
 )
 
 urlpatterns = [
+    path("autocomplete/", AutocompleteView.as_view(), name="autocomplete"),
     path("fields/", FootballFieldListCreateView.as_view(), name="field-list"),
     path("fields/<int:pk>/", FootballFieldDetailView.as_view(), name="field-detail"),
+    path("fields/bulk/", FieldBulkUpdateView.as_view(), name="field-bulk"),
+    path(
+        "fields/availability/check/",
+        AvailabilityCheckView.as_view(),
+        name="availability-check",
+    ),
+    path(
+        "fields/availability/matrix/",
+        AvailabilityMatrixView.as_view(),
+        name="availability-matrix",
+    ),
+    path(
+        "fields/availability/live/",
+        LiveAvailabilityView.as_view(),
+        name="availability-live",
+    ),
+    path("fields/<int:pk>/slots/", FieldSlotsView.as_view(), name="field-slots"),
+    path(
+        "fields/tiles/<int:z>/<int:x>/<int:y>/",
+        FieldTileView.as_view(),
+        name="field-tile",
+    ),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("holds/", SlotHoldCreateView.as_view(), name="hold-list"),
+    path("holds/<str:hold_id>/", SlotHoldDetailView.as_view(), name="hold-detail"),
     path("bookings/", BookingListCreateView.as_view(), name="booking-list"),
+    path("bookings/series/", BookingSeriesCreateView.as_view(), name="booking-series"),
     path("bookings/<int:pk>/", BookingDetailView.as_view(), name="booking-detail"),
     path(
         "available-fields/", AvailableFieldsListView.as_view(), name="available-fields"
     ),
+    path(
+        "available-fields/earliest/",
+        EarliestAvailableFieldsView.as_view(),
+        name="available-fields-earliest",
+    ),
 ]
@@ -1,23 +1,87 @@
+import logging
+from datetime import timedelta
+from functools import partial
+
+import redis
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
-from django.db.models import ExpressionWrapper, F, FloatField, Q
-from django.db.models.functions import ACos, Cos, Radians, Sin
+from django.db.models import Exists, OuterRef, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import dateparse, timezone
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import generics, permissions
-
-from accounts.permissions import IsOwnerRoleOrReadOnly
-
-from .models import Booking, FootballField
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import HasOwnerRole, IsOwnerRoleOrReadOnly
+from location.models import District
+
+from . import holds
+from .autocomplete import complete
+from .availability import (
+    GRID_FIELDS,
+    check_availability,
+    earliest_fit,
+    free_intervals,
+    load_busy_intervals,
+    suggest_alternatives,
+)
+from .bulk import BULK_UPDATE_FIELDS, apply_to_fields
+from .facets import FacetedListMixin
+from .filters import AvailableFieldFilter, FieldSearchFilter
+from .geo import filter_nearby
+from .hours import open_during
+from .idempotency import IdempotentPostMixin
+from .live import district_channel, field_channel, stream_deltas
+from .locks import lock_field_days
+from .matrix import district_availability
+from .models import Booking, FieldBlackout, FootballField
+from .pagination import (
+    FIELD_ORDERINGS,
+    BookingCursorPagination,
+    FootballFieldCursorPagination,
+)
 from .permissions import IsOwner, IsOwnerOrReadOnly
-from .serializers import BookingSerializer, FootballFieldSerializer
-
-
-class FootballFieldListCreateView(generics.ListCreateAPIView):
+from .result_cache import CachedListMixin
+from .serializers import (
+    AlternativesSerializer,
+    AutocompleteQuerySerializer,
+    AvailabilityCheckSerializer,
+    AvailabilityMatrixQuerySerializer,
+    AvailabilityVerdictSerializer,
+    BookingConflictSerializer,
+    BookingSerializer,
+    BookingSeriesSerializer,
+    EarliestFitFieldSerializer,
+    EarliestFitQuerySerializer,
+    FieldBlackoutSerializer,
+    FieldBulkUpdateSerializer,
+    FootballFieldSerializer,
+    FreeSlotSerializer,
+    LiveAvailabilityQuerySerializer,
+    SlotCalendarQuerySerializer,
+    SlotHoldSerializer,
+    SyncQuerySerializer,
+)
+from .series import create_series
+from .slot_index import busy_field_ids
+from .sync import changes_since, decode_page
+from .tiles import get_tile, is_valid_tile
+
+logger = logging.getLogger(__name__)
+
+
+class FootballFieldListCreateView(FacetedListMixin, generics.ListCreateAPIView):
     """
     get:
-    List all football fields. Filter by name or address if needed.
+    List all football fields. Filter by name or address, search with q, or sort with ordering.
+    Add facets=true for counts per district, city, price bucket and opening time.
 
     post:
     Create a new football field. Only owners can create fields.
@@ -28,7 +92,8 @@ class FootballFieldListCreateView(generics.ListCreateAPIView):
     ).prefetch_related("images")
     serializer_class = FootballFieldSerializer
     permission_classes = [IsOwnerRoleOrReadOnly]
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = FootballFieldCursorPagination
+    filter_backends = [DjangoFilterBackend, FieldSearchFilter]
     filterset_fields = ["name", "address"]
 
     @swagger_auto_schema(
@@ -56,6 +121,13 @@ class FootballFieldListCreateView(generics.ListCreateAPIView):
         else:
             return FootballField.objects.all()
 
+    def get_facets_cache_scope(self):
+        # Owners only see their own fields
+        user = self.request.user
+        if user.is_authenticated and user.role == "owner":
+            return f"{super().get_facets_cache_scope()}:owner={user.pk}"
+        return super().get_facets_cache_scope()
+
 
 class FootballFieldDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -97,33 +169,136 @@ class FootballFieldDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
-class BookingListCreateView(generics.ListCreateAPIView):
+class FieldBulkUpdateView(APIView):
+    """
+    post:
+    Apply the same change to many of the owner's fields at once: set the
+    hourly rate or opening hours, and add maintenance blackouts, single or
+    recurring, during which the fields cannot be booked.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, HasOwnerRole]
+
+    @swagger_auto_schema(
+        operation_description="Update the rate or hours and add blackouts on many fields",
+        request_body=FieldBulkUpdateSerializer,
+        responses={
+            200: "Number of updated fields and the created blackouts",
+            400: "Invalid input",
+            403: "Forbidden",
+        },
+    )
+    def post(self, request):
+        serializer = FieldBulkUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        field_ids = set(data["field_ids"])
+        fields = list(
+            FootballField.objects.filter(owner=request.user, pk__in=field_ids).only(
+                "id", "district_id", "opening_time", "closing_time", "weekly_hours"
+            )
+        )
+        missing = field_ids - {field.pk for field in fields}
+        if missing:
+            return Response(
+                {"field_ids": [f"Unknown fields: {sorted(missing)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        changes = {name: data[name] for name in BULK_UPDATE_FIELDS if name in data}
+        closed = [
+            field.pk
+            for field in fields
+            if changes.get("opening_time", field.opening_time)
+            >= changes.get("closing_time", field.closing_time)
+        ]
+        if closed:
+            return Response(
+                {
+                    "non_field_errors": [
+                        f"Opening time must be before closing time on fields {closed}."
+                    ]
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        blackouts = apply_to_fields(fields, changes, data.get("blackouts", []))
+        return Response(
+            {
+                "updated": len(fields) if changes else 0,
+                "blackouts": FieldBlackoutSerializer(blackouts, many=True).data,
+            }
+        )
+
+
+class BookingListCreateView(IdempotentPostMixin, generics.ListCreateAPIView):
     """
     get:
     List bookings for the authenticated user (or the owner’s fields).
 
     post:
-    Create a new booking for a field.
+    Create a new booking for a field. Send an Idempotency-Key header to make
+    retries safe: a retry with the same key returns the first response.
     """
 
     queryset = Booking.objects.select_related("user", "field__owner", "field__district")
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookingCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["field__name", "start_time", "end_time"]
 
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+            self.perform_create(serializer)
+        except ValidationError as e:
+            errors = dict(e.detail)
+            # A conflicting request gets the nearest free slots to retry with.
+            # Only conflicts pay for loading the day, and only after the
+            # booking transaction released the locks other bookings wait on.
+            if serializer.conflict:
+                data = serializer.validated_data
+                errors["alternatives"] = AlternativesSerializer(
+                    suggest_alternatives(
+                        data["field"],
+                        data["start_time"],
+                        data["end_time"],
+                        request.user.pk,
+                    )
+                ).data
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+        )
+
     @swagger_auto_schema(
         operation_description="Create a new booking",
         responses={201: BookingSerializer, 400: "Invalid input", 403: "Forbidden"},
     )
     def perform_create(self, serializer):
-        # Lock the field and start a transaction to prevent race conditions
+        # Bookings of the field on the same day wait for each other, so
+        # Booking.save() checks this one against them once they committed.
+        # Other days and owner edits of the field are not blocked, and the
+        # booking_no_overlap constraint still backs the check.
+        data = serializer.validated_data
         with transaction.atomic():
-            FootballField.objects.select_for_update().get(
-                pk=serializer.validated_data["field"].id
-            )
-            # Check for overlapping bookings and other validation logic
+            lock_field_days([(data["field"].id, data["start_time"], data["end_time"])])
             serializer.save(user=self.request.user)
+            # The holds the user placed for this booking have done their job
+            transaction.on_commit(
+                partial(
+                    holds.release_user_holds,
+                    data["field"].id,
+                    self.request.user.pk,
+                    data["start_time"],
+                    data["end_time"],
+                )
+            )
 
     @swagger_auto_schema(
         operation_description="List all bookings for the authenticated user or owner's fields",
@@ -141,6 +316,59 @@ class BookingListCreateView(generics.ListCreateAPIView):
             return Booking.objects.none()
 
 
+class BookingSeriesCreateView(IdempotentPostMixin, generics.CreateAPIView):
+    """
+    post:
+    Book the same slot every day or week, for count occurrences or until a
+    date. all_or_nothing books nothing when any occurrence conflicts, while
+    skip_conflicts books the others. Conflicts are listed with their reason.
+    Honours an Idempotency-Key header like single bookings.
+    """
+
+    serializer_class = BookingSeriesSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Create a series of bookings",
+        responses={
+            201: "The created bookings and the skipped conflicts",
+            400: "Invalid input, or conflicts in all_or_nothing mode",
+        },
+    )
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            bookings, conflicts = create_series(
+                data["field"],
+                request.user,
+                data["occurrences"],
+                skip_conflicts=data["mode"] == "skip_conflicts",
+            )
+        except DjangoValidationError as e:
+            return Response(
+                {"non_field_errors": e.messages}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        conflicts = BookingConflictSerializer(conflicts, many=True).data
+        if not bookings:
+            return Response(
+                {
+                    "non_field_errors": ["No occurrence of the series was booked."],
+                    "conflicts": conflicts,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {
+                "bookings": BookingSerializer(bookings, many=True).data,
+                "conflicts": conflicts,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class BookingDetailView(generics.RetrieveDestroyAPIView):
     """
     get:
@@ -170,10 +398,95 @@ class BookingDetailView(generics.RetrieveDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
-class AvailableFieldsListView(generics.ListAPIView):
+class SlotHoldCreateView(APIView):
+    """
+    post:
+    Hold a slot of a field for SLOT_HOLD_SECONDS while the user confirms the
+    booking. Other users can neither hold nor book an overlapping slot, and
+    the field is left out of available fields, until the hold is booked,
+    released or expires. A user can have SLOT_HOLD_MAX_ACTIVE holds at once
+    and place SLOT_HOLDS_PER_HOUR an hour.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Hold a slot while confirming a booking",
+        request_body=SlotHoldSerializer,
+        responses={
+            201: SlotHoldSerializer,
+            400: "Invalid input or held slot",
+            429: "Too many holds",
+            503: "Holds unavailable",
+        },
+    )
+    def post(self, request):
+        serializer = SlotHoldSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            hold = holds.place_hold(
+                data["field"].id,
+                request.user.pk,
+                data["start_time"],
+                data["end_time"],
+            )
+        except holds.HoldLimitReached as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        except redis.RedisError:
+            # Booking without a hold still works
+            logger.exception("Could not place a slot hold")
+            return Response(
+                {"detail": "Slot holds are unavailable, book directly."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        if hold is None:
+            return Response(
+                {"non_field_errors": [holds.HELD_MESSAGE]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            SlotHoldSerializer({**hold, "field": data["field"]}).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class SlotHoldDetailView(APIView):
+    """
+    delete:
+    Release one of the user's holds, e.g. when they leave the confirmation.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Release a slot hold",
+        responses={204: "No Content", 403: "Forbidden", 404: "Not Found"},
+    )
+    def delete(self, request, hold_id):
+        try:
+            holds.release_hold(hold_id, request.user.pk)
+        except holds.HoldNotFound:
+            raise NotFound("Hold not found or expired.")
+        except holds.HoldForbidden:
+            raise PermissionDenied("This hold belongs to another user.")
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AvailableFieldsListView(CachedListMixin, FacetedListMixin, generics.ListAPIView):
     """
     get:
-    List available football fields. Can filter by district, time range, and proximity to a location.
+    List available football fields. Can filter by district, price range, opening hours, time range,
+    and proximity to a location, and sort by price, creation time or distance.
+    Add facets=true for counts per district, city, price bucket and opening time.
+    Results are cached per query, whatever the order of its parameters.
+    Proximity searches also share the fields matching their other filters
+    with searches from nearby locations.
     """
 
     queryset = FootballField.objects.select_related("district").prefetch_related(
@@ -181,18 +494,43 @@ class AvailableFieldsListView(generics.ListAPIView):
     )
     serializer_class = FootballFieldSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["name", "address"]
+    pagination_class = FootballFieldCursorPagination
+    filter_backends = [DjangoFilterBackend, FieldSearchFilter]
+    filterset_class = AvailableFieldFilter
 
     @swagger_auto_schema(
         operation_description="List available football fields, filterable by district, time range, and location",
         manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="Fuzzy search on name, address, district and city",
+                type=openapi.TYPE_STRING,
+            ),
             openapi.Parameter(
                 "district_id",
                 openapi.IN_QUERY,
                 description="Filter by district ID",
                 type=openapi.TYPE_INTEGER,
             ),
+            openapi.Parameter(
+                "min_price",
+                openapi.IN_QUERY,
+                description="Minimum hourly rate",
+                type=openapi.TYPE_NUMBER,
+            ),
+            openapi.Parameter(
+                "max_price",
+                openapi.IN_QUERY,
+                description="Maximum hourly rate",
+                type=openapi.TYPE_NUMBER,
+            ),
+            openapi.Parameter(
+                "open_at",
+                openapi.IN_QUERY,
+                description="Only fields open at this time of day (HH:MM)",
+                type=openapi.TYPE_STRING,
+            ),
             openapi.Parameter(
                 "start_time",
                 openapi.IN_QUERY,
@@ -217,15 +555,45 @@ class AvailableFieldsListView(generics.ListAPIView):
                 description="Filter by proximity (longitude)",
                 type=openapi.TYPE_NUMBER,
             ),
+            openapi.Parameter(
+                "ordering",
+                openapi.IN_QUERY,
+                description="Sort by price, -price, created_at, -created_at, distance or soonest",
+                type=openapi.TYPE_STRING,
+                enum=list(FIELD_ORDERINGS),
+            ),
+            openapi.Parameter(
+                "facets",
+                openapi.IN_QUERY,
+                description="Include facet counts when true",
+                type=openapi.TYPE_BOOLEAN,
+            ),
+            openapi.Parameter(
+                "radius_km",
+                openapi.IN_QUERY,
+                description="Only return fields within this distance (km) of the location",
+                type=openapi.TYPE_NUMBER,
+            ),
         ],
         responses={200: FootballFieldSerializer(many=True), 400: "Invalid input"},
     )
     def get_queryset(self):
+        # District, price and opening hour filters come from the filterset.
+        # They are index conditions, so the planner narrows the fields with
+        # them before running the per-field booking check below.
         queryset = super().get_queryset()
 
-        district_id = self.request.query_params.get("district_id")
-        if district_id:
-            queryset = queryset.filter(district__id=district_id)
+        proximity = self.get_proximity()
+        if self.candidate_area is not None:
+            proximity = self.candidate_area
+        elif proximity is not None:
+            # The fields matching every other filter are cached for nearby
+            # locations, and only the exact distance is left to apply
+            candidate_ids = self.cached_candidate_ids(*proximity)
+            if candidate_ids is not None:
+                return filter_nearby(
+                    queryset.filter(pk__in=candidate_ids), *proximity
+                ).order_by("distance")
 
         start_time_str = self.request.query_params.get("start_time")
         end_time_str = self.request.query_params.get("end_time")
@@ -247,48 +615,341 @@ class AvailableFieldsListView(generics.ListAPIView):
             except (ValueError, TypeError):
                 return queryset.none()
 
-            # Exclude fields that are booked during the given time interval
-            queryset = queryset.exclude(
-                Q(bookings__start_time__lt=end_time)
-                & Q(bookings__end_time__gt=start_time)
+            # Exclude fields that are booked during the given time interval,
+            # from the Redis slot index when it covers the interval. Otherwise
+            # a correlated NOT EXISTS probes the (field, period) GiST index
+            # once per remaining field instead of joining every booking.
+            overlapping = Booking.objects.filter(
+                field=OuterRef("pk"), period__overlap=(start_time, end_time)
             )
+            index = busy_field_ids(start_time, end_time)
+            if index is None:
+                queryset = queryset.exclude(Exists(overlapping))
+            else:
+                busy_ids, unchecked_ids = index
+                if busy_ids:
+                    queryset = queryset.exclude(pk__in=busy_ids)
+                if unchecked_ids:
+                    # Off the grid, only the bookings themselves can tell
+                    queryset = queryset.exclude(
+                        Q(pk__in=unchecked_ids) & Exists(overlapping)
+                    )
 
-            # Filter fields that are open during the requested time
-            # Adjusting times to compare time parts only
-            requested_start_time = start_time.time()
-            requested_end_time = end_time.time()
+            # Fields someone is confirming a booking of are not offered
+            held_ids = holds.held_field_ids(start_time, end_time)
+            if held_ids:
+                queryset = queryset.exclude(pk__in=held_ids)
 
-            # Filter fields where the opening time is before or equal to the requested start time
-            # and the closing time is after or equal to the requested end time
-            queryset = queryset.filter(
-                opening_time__lte=requested_start_time,
-                closing_time__gte=requested_end_time,
+            # Blackouts are not in the slot index, and are probed the same way
+            blackouts = FieldBlackout.objects.filter(field=OuterRef("pk")).overlapping(
+                start_time, end_time
             )
+            queryset = queryset.exclude(Exists(blackouts))
 
+            # Filter fields that are open during the requested time, with a
+            # bit test on the weekday's opening hours mask
+            queryset = open_during(queryset, start_time, end_time)
+
+        if proximity is not None:
+            queryset = filter_nearby(queryset, *proximity).order_by("distance")
+
+        return queryset
+
+    def get_proximity(self):
+        """(latitude, longitude, radius_km or None) of a proximity search."""
         latitude = self.request.query_params.get("latitude")
         longitude = self.request.query_params.get("longitude")
+        if not latitude or not longitude:
+            return None
+        try:
+            latitude = float(latitude)
+            longitude = float(longitude)
+        except ValueError:
+            return None
+
+        radius_km = self.request.query_params.get("radius_km")
+        try:
+            radius_km = float(radius_km) if radius_km else None
+        except ValueError:
+            radius_km = None
+        if radius_km is not None:
+            # Ignore non-positive values and cap the search radius
+            radius_km = (
+                min(radius_km, settings.MAX_SEARCH_RADIUS_KM) if radius_km > 0 else None
+            )
+        return latitude, longitude, radius_km
 
-        if latitude and longitude:
-            try:
-                latitude = float(latitude)
-                longitude = float(longitude)
-            except ValueError:
-                return queryset
-
-            # Haversine formula
-            distance_expression = ExpressionWrapper(
-                ACos(
-                    Sin(Radians(F("latitude"))) * Sin(Radians(latitude))
-                    + Cos(Radians(F("latitude")))
-                    * Cos(Radians(latitude))
-                    * Cos(Radians(F("longitude")) - Radians(longitude))
-                )
-                * 6371,  # Radius of Earth in kilometers
-                output_field=FloatField(),
+
+class EarliestAvailableFieldsView(APIView):
+    """
+    get:
+    Find football fields near a location that are free for a given duration
+    within a time window, with the earliest start at which each one fits.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Earliest free start per field within a radius and time window",
+        query_serializer=EarliestFitQuerySerializer,
+        responses={200: EarliestFitFieldSerializer(many=True), 400: "Invalid input"},
+    )
+    def get(self, request):
+        query = EarliestFitQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        window_start = max(params["window_start"], timezone.now())
+        window_end = params["window_end"]
+
+        fields = list(
+            filter_nearby(
+                FootballField.objects.select_related(
+                    "owner", "district__city__region"
+                ).prefetch_related("images"),
+                params["latitude"],
+                params["longitude"],
+                radius_km=params["radius_km"],
+            )
+        )
+        busy = load_busy_intervals(
+            [field.id for field in fields], window_start, window_end
+        )
+
+        results = []
+        for field in fields:
+            start = earliest_fit(
+                field, busy[field.id], params["duration"], window_start, window_end
             )
+            if start is not None:
+                field.earliest_start = start
+                field.earliest_end = start + params["duration"]
+                results.append(field)
+
+        results.sort(key=lambda field: (field.earliest_start, field.distance))
+        serializer = EarliestFitFieldSerializer(
+            results[: params["limit"]], many=True, context={"request": request}
+        )
+        return Response(serializer.data)
+
+
+class FieldSlotsView(APIView):
+    """
+    get:
+    Free slots of a football field between from and to (at most a month),
+    aligned to the field's booking grid. Defaults to the next seven days.
+    """
+
+    permission_classes = [permissions.AllowAny]
 
-            queryset = queryset.annotate(distance=distance_expression).order_by(
-                "distance"
+    @swagger_auto_schema(
+        operation_description="Free booking intervals of a field within a window",
+        query_serializer=SlotCalendarQuerySerializer,
+        responses={
+            200: FreeSlotSerializer(many=True),
+            400: "Invalid input",
+            404: "Not Found",
+        },
+    )
+    def get(self, request, pk):
+        query = SlotCalendarQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        start, end = query.validated_data["from"], query.validated_data["to"]
+
+        field = FootballField.objects.filter(pk=pk).only(*GRID_FIELDS).first()
+        if field is None:
+            raise NotFound("Football field not found.")
+        busy = load_busy_intervals([field.id], start, end)[field.id]
+        slots = free_intervals(field, busy, start, end)
+        return Response(FreeSlotSerializer.serialize_many(slots))
+
+
+class AvailabilityCheckView(APIView):
+    """
+    post:
+    Check many (field_id, start_time, end_time) candidates at once. Each gets
+    a verdict with the reason it cannot be booked, in the order given.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Check the availability of many booking candidates",
+        request_body=AvailabilityCheckSerializer,
+        responses={
+            200: AvailabilityVerdictSerializer(many=True),
+            400: "Invalid input",
+        },
+    )
+    def post(self, request):
+        serializer = AvailabilityCheckSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        items = serializer.validated_data["items"]
+        verdicts = check_availability(
+            [(item["field_id"], item["start_time"], item["end_time"]) for item in items]
+        )
+        return Response(
+            AvailabilityVerdictSerializer(
+                [{**item, **verdict} for item, verdict in zip(items, verdicts)],
+                many=True,
+            ).data
+        )
+
+
+class AvailabilityMatrixView(APIView):
+    """
+    get:
+    Free slots of every field of a district on a date. Each field's row is a
+    string with one character per slot of the day, 1 when free and 0 when
+    closed or booked.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Fields x slots availability grid of a district",
+        query_serializer=AvailabilityMatrixQuerySerializer,
+        responses={200: "Grid of {id, name, free} rows", 400: "Invalid input"},
+    )
+    def get(self, request):
+        query = AvailabilityMatrixQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        return Response(
+            district_availability(
+                params["district_id"],
+                params["date"],
+                timedelta(minutes=params["slot_minutes"]),
             )
+        )
 
-        return queryset
+
+class FieldTileView(APIView):
+    """
+    get:
+    Map tile of football fields. Low zoom levels return clustered marker
+    counts, high zoom levels return compact field points.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Retrieve the football fields inside a z/x/y map tile",
+        responses={200: "Tile payload", 404: "Not Found"},
+    )
+    def get(self, request, z, x, y):
+        if not is_valid_tile(z, x, y):
+            raise NotFound("Invalid tile coordinates.")
+        return Response(get_tile(z, x, y))
+
+
+class AutocompleteView(APIView):
+    """
+    get:
+    Complete a partial name of a football field, region, city or district.
+    Served from the Redis prefix index without touching the database.
+    """
+
+    # Anonymous on purpose: authenticating a token would need a user lookup
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Autocomplete field, region, city and district names",
+        query_serializer=AutocompleteQuerySerializer,
+        responses={200: "List of {type, id, name} entries", 400: "Invalid input"},
+    )
+    def get(self, request):
+        query = AutocompleteQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            complete(query.validated_data["q"], query.validated_data["limit"])
+        )
+
+
+class SyncView(APIView):
+    """
+    get:
+    Regions, cities, districts, football fields and field images changed
+    since updated_since, and the ids of those deleted since, at most limit
+    of each per page. While has_more is true, pass next as page for the
+    rest. Then pass the cursor as updated_since next time. Without
+    updated_since, or when full is true, the pages hold everything and
+    replace the client's copy.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Catalogue changes since a cursor",
+        query_serializer=SyncQuerySerializer,
+        responses={
+            200: "cursor, full, one list per collection, deleted ids, has_more "
+            "and next",
+            400: "Invalid input",
+        },
+    )
+    def get(self, request):
+        query = SyncQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        page = None
+        if "page" in params:
+            try:
+                page = decode_page(params["page"])
+            except ValueError as e:
+                return Response({"page": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            changes_since(params.get("updated_since"), page, params.get("limit"))
+        )
+
+
+class LiveAvailabilityView(View):
+    """
+    get:
+    Server-Sent Events stream of the slots booked and released on a field, on
+    every field of a district, or both, as bookings are created and deleted.
+    Each event is "booked" or "released" with {field_id, district_id, slots}.
+    Only served by the ASGI application, config.asgi.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"detail": "Live availability is only served over ASGI."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        query = LiveAvailabilityQuerySerializer(data=request.GET)
+        if not query.is_valid():
+            return JsonResponse(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        channels = []
+        if "field_id" in params:
+            if not await FootballField.objects.filter(pk=params["field_id"]).aexists():
+                return JsonResponse(
+                    {"detail": "Football field not found."},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            channels.append(field_channel(params["field_id"]))
+        if "district_id" in params:
+            if not await District.objects.filter(pk=params["district_id"]).aexists():
+                return JsonResponse(
+                    {"detail": "District not found."},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            channels.append(district_channel(params["district_id"]))
+
+        response = StreamingHttpResponse(
+            stream_deltas(channels), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Tells nginx not to buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,138 @@
+import math
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .models import District
+
+# Side of the grid cells the boundary bounding boxes are bucketed into
+GRID_CELL_DEGREES = 0.05
+# Changed whenever a boundary changes, so every process rebuilds its index
+VERSION_CACHE_KEY = "district_boundaries:version"
+
+
+def boundary_polygons(geometry):
+    """
+    Return the polygons of a GeoJSON Polygon or MultiPolygon geometry, each
+    as a list of rings of [longitude, latitude] points, outer ring first.
+    """
+    if not isinstance(geometry, dict):
+        raise ValueError("Boundary must be a GeoJSON geometry object.")
+    if geometry.get("type") == "Polygon":
+        polygons = [geometry.get("coordinates")]
+    elif geometry.get("type") == "MultiPolygon":
+        polygons = geometry.get("coordinates")
+    else:
+        raise ValueError("Boundary must be a Polygon or MultiPolygon.")
+
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError("Boundary has no coordinates.")
+    for rings in polygons:
+        if not isinstance(rings, list) or not rings:
+            raise ValueError("Boundary polygon has no rings.")
+        for ring in rings:
+            if not isinstance(ring, list) or len(ring) < 4:
+                raise ValueError("Boundary rings need at least four points.")
+    return polygons
+
+
+def point_in_rings(longitude, latitude, rings):
+    """
+    Even-odd ray casting test of a point against the rings of one polygon,
+    so points inside a hole are outside the polygon.
+    """
+    inside = False
+    for ring in rings:
+        x1, y1 = ring[-1][0], ring[-1][1]
+        for point in ring:
+            x2, y2 = point[0], point[1]
+            if (y1 > latitude) != (y2 > latitude) and longitude < (x2 - x1) * (
+                latitude - y1
+            ) / (y2 - y1) + x1:
+                inside = not inside
+            x1, y1 = x2, y2
+    return inside
+
+
+class DistrictIndex:
+    """
+    In-memory point-in-polygon index of district boundaries. Polygon
+    bounding boxes are bucketed into a fixed grid, so a lookup only runs the
+    exact test against the few polygons whose box covers the point's cell.
+    """
+
+    def __init__(self, boundaries, cell_degrees=GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.polygons = []
+        self.cells = defaultdict(list)
+        # Lower ids win where boundaries overlap
+        for district_id, geometry in sorted(boundaries, key=lambda item: item[0]):
+            for rings in boundary_polygons(geometry):
+                self._add(district_id, rings)
+
+    def _cell(self, longitude, latitude):
+        return (
+            math.floor(longitude / self.cell_degrees),
+            math.floor(latitude / self.cell_degrees),
+        )
+
+    def _add(self, district_id, rings):
+        longitudes = [point[0] for point in rings[0]]
+        latitudes = [point[1] for point in rings[0]]
+        bbox = (min(longitudes), min(latitudes), max(longitudes), max(latitudes))
+        position = len(self.polygons)
+        self.polygons.append((district_id, bbox, rings))
+
+        min_x, min_y = self._cell(bbox[0], bbox[1])
+        max_x, max_y = self._cell(bbox[2], bbox[3])
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                self.cells[(x, y)].append(position)
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def lookup(self, latitude, longitude):
+        """Return the id of the district containing the point, or None."""
+        latitude = float(latitude)
+        longitude = float(longitude)
+        for position in self.cells.get(self._cell(longitude, latitude), ()):
+            district_id, bbox, rings = self.polygons[position]
+            if (
+                bbox[0] <= longitude <= bbox[2]
+                and bbox[1] <= latitude <= bbox[3]
+                and point_in_rings(longitude, latitude, rings)
+            ):
+                return district_id
+        return None
+
+
+_index = None
+_index_version = None
+
+
+def get_district_index():
+    """
+    Return this process's index of the district boundaries, rebuilt when
+    any process has changed a boundary since it was built.
+    """
+    global _index, _index_version
+    version = cache.get(VERSION_CACHE_KEY)
+    if _index is None or version != _index_version:
+        boundaries = District.objects.exclude(boundary=None).values_list(
+            "id", "boundary"
+        )
+        _index = DistrictIndex(boundaries)
+        _index_version = version
+    return _index
+
+
+def invalidate_district_index():
+    global _index
+    _index = None
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def resolve_district_id(latitude, longitude):
+    return get_district_index().lookup(latitude, longitude)
@@ -0,0 +1,79 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from location.boundaries import boundary_polygons, invalidate_district_index
+from location.models import District
+
+
+class Command(BaseCommand):
+    help = (
+        "Load district boundary polygons from a GeoJSON FeatureCollection. "
+        "Features are matched to districts by id or by name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="GeoJSON FeatureCollection file")
+        parser.add_argument(
+            "--name-property",
+            default="name",
+            help="Feature property holding the district name",
+        )
+        parser.add_argument(
+            "--id-property",
+            help="Feature property holding the district id, instead of the name",
+        )
+        parser.add_argument(
+            "--city", type=int, help="Only match districts of this city id"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], encoding="utf-8") as file:
+                collection = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+        if collection.get("type") != "FeatureCollection":
+            raise CommandError("The file must contain a GeoJSON FeatureCollection.")
+
+        districts = District.objects.all()
+        if options["city"]:
+            districts = districts.filter(city_id=options["city"])
+        by_id = {district.id: district for district in districts}
+        by_name = {}
+        for district in by_id.values():
+            by_name.setdefault(district.name.casefold(), []).append(district)
+
+        matched = {}
+        for number, feature in enumerate(collection.get("features", []), start=1):
+            properties = feature.get("properties") or {}
+            if options["id_property"]:
+                key = properties.get(options["id_property"])
+                candidates = [by_id[key]] if key in by_id else []
+            else:
+                key = properties.get(options["name_property"])
+                candidates = by_name.get(str(key).casefold(), [])
+
+            if len(candidates) != 1:
+                reason = "no district" if not candidates else "several districts"
+                self.stderr.write(f"Feature {number} ({key!r}) matches {reason}.")
+                continue
+            try:
+                boundary_polygons(feature.get("geometry"))
+            except ValueError as e:
+                self.stderr.write(f"Feature {number} ({key!r}): {e}")
+                continue
+
+            district = candidates[0]
+            district.boundary = feature["geometry"]
+            matched[district.id] = district
+
+        with transaction.atomic():
+            District.objects.bulk_update(matched.values(), ["boundary"])
+            # bulk_update() sends no signals
+            transaction.on_commit(invalidate_district_index)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded boundaries of {len(matched)} districts.")
+        )
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("location", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="city",
+            index=models.Index(fields=["name", "id"], name="city_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="district",
+            index=models.Index(fields=["name", "id"], name="district_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="region",
+            index=models.Index(fields=["name", "id"], name="region_name_idx"),
+        ),
+    ]
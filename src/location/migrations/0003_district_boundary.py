@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("location", "0002_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="district",
+            name="boundary",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("location", "0003_district_boundary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="city",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="district",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="region",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="city",
+            index=models.Index(fields=["updated_at"], name="city_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="district",
+            index=models.Index(fields=["updated_at"], name="district_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="region",
+            index=models.Index(fields=["updated_at"], name="region_updated_idx"),
+        ),
+    ]
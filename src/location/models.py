@@ -3,11 +3,16 @@ from django.db import models
 
 class Region(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Region"
         verbose_name_plural = "Regions"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name", "id"], name="region_name_idx"),
+            models.Index(fields=["updated_at"], name="region_updated_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -16,12 +21,17 @@ class Region(models.Model):
 class City(models.Model):
     region = models.ForeignKey(Region, related_name="cities", on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("region", "name")
         verbose_name = "City"
         verbose_name_plural = "Cities"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name", "id"], name="city_name_idx"),
+            models.Index(fields=["updated_at"], name="city_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name}, {self.region.name}"
@@ -30,12 +40,19 @@ class City(models.Model):
 class District(models.Model):
     city = models.ForeignKey(City, related_name="districts", on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
+    # GeoJSON Polygon or MultiPolygon geometry, loaded with load_district_boundaries
+    boundary = models.JSONField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("city", "name")
         verbose_name = "District"
         verbose_name_plural = "Districts"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name", "id"], name="district_name_idx"),
+            models.Index(fields=["updated_at"], name="district_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name}, {self.city.name}"
@@ -0,0 +1,5 @@
+from config.pagination import KeysetCursorPagination
+
+
+class NameCursorPagination(KeysetCursorPagination):
+    ordering = ("name", "id")
@@ -29,3 +29,25 @@ class DistrictSerializer(serializers.ModelSerializer):
     class Meta:
         model = District
         fields = ["id", "name", "city", "city_id"]
+
+
+class RegionSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Region
+        fields = ["id", "name", "updated_at"]
+
+
+class CitySyncSerializer(serializers.ModelSerializer):
+    region_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = City
+        fields = ["id", "name", "region_id", "updated_at"]
+
+
+class DistrictSyncSerializer(serializers.ModelSerializer):
+    city_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = District
+        fields = ["id", "name", "city_id", "updated_at"]
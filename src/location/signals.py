@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .boundaries import invalidate_district_index
+from .models import District
+
+
+@receiver(post_save, sender=District)
+def invalidate_boundaries_on_save(sender, instance, created, **kwargs):
+    if not created or instance.boundary is not None:
+        transaction.on_commit(invalidate_district_index)
+
+
+@receiver(post_delete, sender=District)
+def invalidate_boundaries_on_delete(sender, instance, **kwargs):
+    if instance.boundary is not None:
+        transaction.on_commit(invalidate_district_index)
@@ -1,8 +1,14 @@
+import io
+import json
+import tempfile
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from .boundaries import DistrictIndex, get_district_index, invalidate_district_index
 from .models import City, District, Region
 
 User = get_user_model()
@@ -47,7 +53,7 @@ class LocationTests(APITestCase):
         url = reverse("region-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_anonymous_user_cannot_create_region(self):
         self.client.logout()
@@ -83,3 +89,92 @@ class LocationTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["name"], self.region.name)
+
+
+def square(min_lon, min_lat, size):
+    return [
+        [min_lon, min_lat],
+        [min_lon + size, min_lat],
+        [min_lon + size, min_lat + size],
+        [min_lon, min_lat + size],
+        [min_lon, min_lat],
+    ]
+
+
+class DistrictBoundaryTests(APITestCase):
+    def setUp(self):
+        self.region = Region.objects.create(name="Test Region")
+        self.city = City.objects.create(name="Test City", region=self.region)
+        self.district = District.objects.create(name="Chilonzor", city=self.city)
+        self.other = District.objects.create(name="Yunusobod", city=self.city)
+        self.addCleanup(invalidate_district_index)
+
+    def test_index_resolves_points_to_districts(self):
+        index = DistrictIndex(
+            [
+                (
+                    self.district.id,
+                    {
+                        "type": "Polygon",
+                        # A square with a square hole in the middle
+                        "coordinates": [
+                            square(69.0, 41.0, 1.0),
+                            square(69.4, 41.4, 0.2),
+                        ],
+                    },
+                ),
+                (
+                    self.other.id,
+                    {
+                        "type": "MultiPolygon",
+                        "coordinates": [
+                            [square(69.45, 41.45, 0.1)],
+                            [square(71.0, 41.0, 0.5)],
+                        ],
+                    },
+                ),
+            ]
+        )
+        self.assertEqual(index.lookup(41.1, 69.1), self.district.id)
+        self.assertEqual(index.lookup(41.42, 69.42), None)
+        self.assertEqual(index.lookup(41.5, 69.5), self.other.id)
+        self.assertEqual(index.lookup(41.2, 71.2), self.other.id)
+        self.assertEqual(index.lookup(40.9, 69.5), None)
+
+    def test_load_district_boundaries_command(self):
+        collection = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "properties": {"name": "chilonzor"},
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [square(69.0, 41.0, 1.0)],
+                    },
+                },
+                {
+                    "type": "Feature",
+                    "properties": {"name": "Unknown"},
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [square(70.0, 41.0, 1.0)],
+                    },
+                },
+            ],
+        }
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson") as file:
+            json.dump(collection, file)
+            file.flush()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command(
+                    "load_district_boundaries",
+                    file.name,
+                    stdout=io.StringIO(),
+                    stderr=io.StringIO(),
+                )
+
+        self.district.refresh_from_db()
+        self.assertEqual(self.district.boundary["type"], "Polygon")
+        self.assertIsNone(District.objects.get(pk=self.other.pk).boundary)
+        self.assertEqual(get_district_index().lookup(41.5, 69.5), self.district.id)
@@ -2,6 +2,7 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets
 
 from .models import City, District, Region
+from .pagination import NameCursorPagination
 from .permissions import IsAdminOrReadOnly
 from .serializers import CitySerializer, DistrictSerializer, RegionSerializer
 
@@ -24,6 +25,7 @@ class RegionViewSet(viewsets.ModelViewSet):
     queryset = Region.objects.all()
     serializer_class = RegionSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = NameCursorPagination
 
     @swagger_auto_schema(
         operation_description="Retrieve the list of all regions",
@@ -79,6 +81,7 @@ class CityViewSet(viewsets.ModelViewSet):
     queryset = City.objects.all()
     serializer_class = CitySerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = NameCursorPagination
 
     @swagger_auto_schema(
         operation_description="Retrieve the list of all cities",
@@ -134,6 +137,7 @@ class DistrictViewSet(viewsets.ModelViewSet):
     queryset = District.objects.all()
     serializer_class = DistrictSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = NameCursorPagination
 
     @swagger_auto_schema(
         operation_description="Retrieve the list of all districts",